@@ -0,0 +1,117 @@
+import cv2
+import numpy as np
+
+from color_lut import THRESHOLD
+
+# 雙色對比模式的二值化方式：global 為固定門檻（color_lut.THRESHOLD）
+THRESHOLD_MODES = ['global', 'mean', 'sauvola']
+
+
+def _odd(value):
+    """不小於 3 的奇數（濾波視窗大小）"""
+    value = max(3, int(round(value)))
+    return value if value % 2 else value + 1
+
+
+class AdaptiveThreshold:
+    """雙色對比模式的局部門檻
+
+    門檻只在低解析度下計算：灰階影像先以整數倍 INTER_AREA 縮小到短邊約 stat_size，
+    以 boxFilter 求局部平均與標準差（視窗為短邊的 window 倍），得到的門檻圖
+    放大回原尺寸後逐像素比較，因此 1080p 的成本約為一次縮小、一次放大與一次比較。
+    - mean：門檻為局部平均，對亮字暗底與暗字亮底都適用
+    - sauvola：T = m * (1 + k * (s / 128 - 1))，適合白紙黑字，對雜訊較不敏感
+    局部對比低於 min_contrast 的區域（空白紙面或放大後的粗筆畫內部）的平均
+    幾乎等於像素本身，以平均為門檻只會把攝影機雜訊放大成斑點；這些區域的門檻
+    改由附近有對比的區域內插（normalized convolution，視窗為短邊的 coarse_window 倍），
+    整個視窗都沒有對比時使用整張影像的平均中點（完全沒有對比時使用固定門檻）。
+
+    門檻圖在影格間逐步更新：檢視範圍不變時每 update_interval 張影格才重新統計一次，
+    並以指數平均併入，畫面不會因攝影機雜訊閃爍；檢視範圍改變（縮放、平移、轉向）
+    時以 key 判斷並立即重新計算。
+    """
+
+    def __init__(self, mode='mean', stat_size=128, window=0.125, coarse_window=1.0,
+                 min_contrast=10.0, sauvola_k=0.2, smoothing=0.3, update_interval=3):
+        self.mode = mode
+        self.stat_size = stat_size
+        self.window = window
+        self.coarse_window = coarse_window
+        self.min_contrast = min_contrast
+        self.sauvola_k = sauvola_k
+        self.smoothing = smoothing
+        self.update_interval = update_interval
+        self.resets = 0
+        self._age = 0  # 距離上次統計的影格數
+        self._key = None
+        self._threshold = None  # 低解析度門檻圖（float32）
+        self._buffers = {}
+
+    def _buffer(self, name, shape, dtype=np.uint8):
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer
+
+    def reset(self):
+        """捨棄累積的門檻圖，下一張影格重新計算"""
+        self._key = None
+        self._threshold = None
+
+    def _statistics(self, small):
+        """由縮小的灰階影像計算門檻圖"""
+        values = small.astype(np.float32)
+        height, width = values.shape
+        size = _odd(min(height, width) * self.window)
+        mean = cv2.boxFilter(values, -1, (size, size), borderType=cv2.BORDER_REFLECT)
+        square = cv2.boxFilter(values * values, -1, (size, size), borderType=cv2.BORDER_REFLECT)
+        std = np.sqrt(np.maximum(square - mean * mean, 0))
+        if self.mode == 'sauvola':
+            local = mean * (1.0 + self.sauvola_k * (std / 128.0 - 1.0))
+        else:
+            local = mean
+        coarse_size = _odd(min(height, width) * self.coarse_window)
+        # 內插的是局部最亮與最暗值的中點（Bernsen）：平均偏向佔多數的紙面，
+        # 內插到光線漸暗的空白處時會把紙面判為暗
+        kernel = np.ones((size, size), np.uint8)
+        middle = (cv2.dilate(values, kernel, borderType=cv2.BORDER_REFLECT) +
+                  cv2.erode(values, kernel, borderType=cv2.BORDER_REFLECT)) * 0.5
+        confident = (std >= self.min_contrast).astype(np.float32)
+        weight = cv2.boxFilter(confident, -1, (coarse_size, coarse_size), borderType=cv2.BORDER_REFLECT)
+        total = cv2.boxFilter(middle * confident, -1, (coarse_size, coarse_size),
+                              borderType=cv2.BORDER_REFLECT)
+        count = confident.sum()
+        fallback = float((middle * confident).sum() / count) if count else float(THRESHOLD)
+        surface = np.where(weight > 1e-3, total / np.maximum(weight, 1e-3), fallback)
+        return np.where(confident > 0, local, surface)
+
+    def apply(self, gray, key=None, offset=0.0, dst=None):
+        """將灰階影像二值化，回傳 0 / 255 的遮罩（大於門檻為 255）
+
+        key 描述檢視範圍，與上一張影格不同時重新開始累積；
+        offset 加在門檻上（負值使更多像素成為前景）。
+        """
+        height, width = gray.shape
+        factor = max(1, min(height, width) // self.stat_size)
+        small_height, small_width = height // factor, width // factor
+        changed = (key != self._key or self._threshold is None or
+                   self._threshold.shape != (small_height, small_width))
+        self._age += 1
+        if changed or self._age >= self.update_interval:
+            small = cv2.resize(gray[:small_height * factor, :small_width * factor],
+                               (small_width, small_height),
+                               dst=self._buffer('small', (small_height, small_width)),
+                               interpolation=cv2.INTER_AREA)
+            threshold = self._statistics(small)
+            if changed:
+                self._threshold = threshold.astype(np.float32)
+                self._key = key
+                self.resets += 1
+            else:
+                cv2.accumulateWeighted(threshold, self._threshold, self.smoothing)
+            self._age = 0
+        levels = np.clip(self._threshold + offset, 0, 255).astype(np.uint8)
+        full = cv2.resize(levels, (width, height), dst=self._buffer('threshold', (height, width)),
+                          interpolation=cv2.INTER_LINEAR)
+        return cv2.compare(gray, full, cv2.CMP_GT, dst=dst)
@@ -0,0 +1,250 @@
+"""ImageProcessor 效能測試
+
+不需要攝影機與視窗，可在一般 Linux 主機上執行。以合成文字頁面或影片檔為輸入，
+依解析度、縮放倍率、放大插值方式、顏色模式、濾鏡與遮罩/輔助線組合逐一執行 process_frame，
+輸出 FPS、每張影格延遲百分位數與最高 RSS（JSON）。
+
+範例：
+    python benchmark.py --quick
+    python benchmark.py --resolutions 720p,1080p --output result.json
+    python benchmark.py --video sample.mp4 --compare baseline.json
+    python benchmark.py --zooms 1.5,2,3,4,8 --interpolations all --filter-modes normal
+
+高對比濾鏡新舊流程比較（--lab-high-contrast 使用原本的 LAB 流程）：
+    python benchmark.py --resolutions 720p,1080p --zooms 1 --color-modes normal \
+        --filter-modes high_contrast --overlays off --frames 60 --output luma.json
+    python benchmark.py --resolutions 720p,1080p --zooms 1 --color-modes normal \
+        --filter-modes high_contrast --overlays off --frames 60 --lab-high-contrast \
+        --compare luma.json
+"""
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from image_processor import (ImageProcessor, COLOR_MODES, FILTER_MODES, INTERPOLATION_MODES)
+from frame_source import VideoFileSource, make_text_page
+
+RESOLUTIONS = {
+    '480p': (640, 480),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+    '1440p': (2560, 1440),
+    '4k': (3840, 2160),
+}
+
+
+def peak_rss_mb():
+    """目前行程的最高 RSS（MB），不支援的平台回傳 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 為單位，macOS 以 byte 為單位
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def load_inputs(args, width, height):
+    """準備輸入影格"""
+    if args.video:
+        source = VideoFileSource(args.video, pacing='fast', loop=False)
+        frames = []
+        if source.open():
+            while len(frames) < args.input_frames:
+                ret, frame, _ = source.read()
+                if not ret:
+                    break
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                frames.append(frame if args.bgr else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            source.release()
+        if not frames:
+            raise SystemExit(f'無法從影片讀取影格: {args.video}')
+        return frames
+    frames = [make_text_page(width, height, seed) for seed in range(args.input_frames)]
+    if args.bgr:
+        frames = [cv2.cvtColor(frame, cv2.COLOR_RGB2BGR) for frame in frames]
+    return frames
+
+
+def run_case(frames, config, args):
+    """執行單一組合，回傳結果"""
+    processor = ImageProcessor()
+    processor.crop_first = not args.legacy_order
+    processor.adaptive_resolution = not args.no_adaptive
+    processor.set_channel_order('BGR' if args.bgr else 'RGB')
+    processor.high_contrast.luma_only = not args.lab_high_contrast
+    if args.output_size:
+        processor.set_output_size(*args.output_size)
+    processor.zoom_factor = config['zoom']
+    processor.interpolation_mode = config['interpolation']
+    processor.color_mode = config['color_mode']
+    processor.filter_mode = config['filter_mode']
+    processor.show_mask = config['overlays']
+    processor.show_guide_line = config['overlays']
+
+    for i in range(args.warmup):
+        processor.process_frame(frames[i % len(frames)])
+
+    latencies = np.empty(args.frames)
+    start = time.perf_counter()
+    for i in range(args.frames):
+        t0 = time.perf_counter()
+        processor.process_frame(frames[i % len(frames)])
+        latencies[i] = time.perf_counter() - t0
+    total = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(latencies * 1000, [50, 95, 99])
+    result = dict(config)
+    result.update({
+        'fps': args.frames / total,
+        'mean_ms': float(latencies.mean() * 1000),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'peak_rss_mb': peak_rss_mb(),
+    })
+    if config['interpolation'] == 'text':
+        # 超出時間預算而改用線性插值的影格數
+        result['text_fallbacks'] = processor.text_upscaler.fallbacks
+    return result
+
+
+def case_key(result):
+    """比較不同版本結果時用來對應同一組合的鍵值"""
+    return (result['resolution'], result['zoom'], result.get('interpolation', 'auto'),
+            result['color_mode'], result['filter_mode'], result['overlays'])
+
+
+def compare(results, baseline_path, threshold):
+    """與先前的結果比較，回傳變慢超過門檻的組合"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {case_key(r): r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        old = baseline.get(case_key(result))
+        if old is None:
+            continue
+        ratio = result['p50_ms'] / old['p50_ms'] if old['p50_ms'] else 1.0
+        result['baseline_p50_ms'] = old['p50_ms']
+        result['p50_ratio'] = ratio
+        if ratio > 1 + threshold:
+            regressions.append(result)
+    return regressions
+
+
+def parse_list(value, choices, name):
+    """解析以逗號分隔的清單，'all' 表示全部"""
+    if value == 'all':
+        return list(choices)
+    items = [item.strip() for item in value.split(',') if item.strip()]
+    for item in items:
+        if item not in choices:
+            raise SystemExit(f'未知的{name}: {item}（可用：{", ".join(map(str, choices))}）')
+    return items
+
+
+def main(argv=None):
+    default_zooms = ','.join(str(z) for z in ImageProcessor().zoom_factors)
+    parser = argparse.ArgumentParser(description='ImageProcessor 效能測試')
+    parser.add_argument('--resolutions', default='all',
+                        help=f'解析度清單（{",".join(RESOLUTIONS)}），預設 all')
+    parser.add_argument('--zooms', default=default_zooms, help='縮放倍率清單')
+    parser.add_argument('--interpolations', default='auto',
+                        help='放大插值方式清單（auto、linear、cubic、text 或 all），預設 auto')
+    parser.add_argument('--color-modes', default='all', help='顏色模式清單，預設 all')
+    parser.add_argument('--filter-modes', default='all', help='濾鏡清單，預設 all')
+    parser.add_argument('--overlays', default='off,on', help='遮罩與輔助線：off、on 或 off,on')
+    parser.add_argument('--frames', type=int, default=20, help='每個組合計時的影格數')
+    parser.add_argument('--warmup', type=int, default=3, help='每個組合的暖身影格數')
+    parser.add_argument('--input-frames', type=int, default=4, help='輸入影格數量（輪流使用）')
+    parser.add_argument('--video', help='以影片檔取代合成文字頁面')
+    parser.add_argument('--output-size', type=lambda v: tuple(int(x) for x in v.split('x')),
+                        help='輸出（顯示）大小，例如 1280x720，預設與輸入相同')
+    parser.add_argument('--legacy-order', action='store_true', help='使用舊的處理順序')
+    parser.add_argument('--no-adaptive', action='store_true',
+                        help='停用解析度自適應（固定內插方式，不先縮小再處理）')
+    parser.add_argument('--bgr', action='store_true', help='以 BGR 影格執行（擷取端不轉換色彩順序）')
+    parser.add_argument('--lab-high-contrast', action='store_true',
+                        help='高對比濾鏡使用原本的 LAB 流程（預設只處理亮度）')
+    parser.add_argument('--quick', action='store_true',
+                        help='快速模式：720p/1080p、1x/2x/4x、較少模式組合')
+    parser.add_argument('--output', help='將 JSON 結果寫入檔案（預設輸出到 stdout）')
+    parser.add_argument('--compare', help='與先前的 JSON 結果比較')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='p50 變慢超過此比例視為退步（預設 0.15）')
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.resolutions = '720p,1080p'
+        args.zooms = '1.0,2.0,4.0'
+        if args.color_modes == 'all':
+            args.color_modes = 'normal,yellow_on_blue'
+        if args.filter_modes == 'all':
+            args.filter_modes = 'normal,high_contrast'
+
+    resolutions = parse_list(args.resolutions, RESOLUTIONS, '解析度')
+    zooms = [float(z) for z in args.zooms.split(',')]
+    interpolations = parse_list(args.interpolations, INTERPOLATION_MODES, '插值方式')
+    color_modes = parse_list(args.color_modes, COLOR_MODES, '顏色模式')
+    filter_modes = parse_list(args.filter_modes, FILTER_MODES, '濾鏡')
+    overlays = [value == 'on' for value in parse_list(args.overlays, ['off', 'on'], '遮罩設定')]
+
+    results = []
+    for resolution in resolutions:
+        width, height = RESOLUTIONS[resolution]
+        frames = load_inputs(args, width, height)
+        for zoom, interpolation, color_mode, filter_mode, overlay in itertools.product(
+                zooms, interpolations, color_modes, filter_modes, overlays):
+            config = {'resolution': resolution, 'width': width, 'height': height,
+                      'zoom': zoom, 'interpolation': interpolation, 'color_mode': color_mode,
+                      'filter_mode': filter_mode, 'overlays': overlay}
+            result = run_case(frames, config, args)
+            results.append(result)
+            print(f"{resolution:>6} {zoom:4.1f}x {interpolation:<6} {color_mode:<16} {filter_mode:<14} "
+                  f"{'overlay' if overlay else '-':<8} {result['fps']:7.1f} fps  "
+                  f"p50 {result['p50_ms']:7.2f}  p95 {result['p95_ms']:7.2f}  "
+                  f"p99 {result['p99_ms']:7.2f} ms", file=sys.stderr)
+
+    regressions = compare(results, args.compare, args.threshold) if args.compare else []
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'input': args.video or 'synthetic_text',
+            'frames_per_case': args.frames,
+            'crop_first': not args.legacy_order,
+            'adaptive_resolution': not args.no_adaptive,
+            'channel_order': 'BGR' if args.bgr else 'RGB',
+            'high_contrast': 'lab' if args.lab_high_contrast else 'luma',
+            'output_size': args.output_size,
+            'peak_rss_mb': peak_rss_mb(),
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if regressions:
+        print(f'{len(regressions)} 個組合變慢超過 {args.threshold:.0%}：', file=sys.stderr)
+        for result in regressions:
+            print(f"  {case_key(result)}: {result['baseline_p50_ms']:.2f} -> "
+                  f"{result['p50_ms']:.2f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
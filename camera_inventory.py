@@ -0,0 +1,178 @@
+import threading
+import time
+
+import cv2
+
+from frame_source import fourcc_to_str, open_capture
+
+# 探測攝影機能力時嘗試的解析度
+PROBE_RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080), (2560, 1440), (3840, 2160)]
+
+
+def probe_capabilities(capture, resolutions=PROBE_RESOLUTIONS):
+    """讀取已開啟攝影機支援的解析度、幀率與格式
+
+    依序設定每個解析度並讀回實際值，驅動不支援時會回報最接近的解析度，
+    因此結果去除重複後即為裝置可用的解析度。
+    """
+    supported = []
+    for width, height in resolutions:
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        actual = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                  int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                  capture.get(cv2.CAP_PROP_FPS))
+        if actual[0] > 0 and actual not in supported:
+            supported.append(actual)
+    return {
+        'resolutions': [(w, h) for w, h, _ in supported],
+        'fps': {f'{w}x{h}': fps for w, h, fps in supported},
+        'fourcc': fourcc_to_str(capture.get(cv2.CAP_PROP_FOURCC)),
+    }
+
+
+class CameraInventory:
+    """攝影機清單服務
+
+    每個編號在獨立的背景執行緒中探測（開啟失敗的編號在部分驅動下會卡住數秒），
+    scan() 最多等待 timeout 秒，逾時的編號視為暫時無法使用，下次掃描再重試；
+    仍在執行中的探測不會重複啟動。結果連同能力資訊快取 ttl 秒，
+    開啟失敗時以 mark_failed() 作廢，或以 invalidate() / scan(force=True) 重新探測。
+    目前使用中的攝影機以 register() 記錄，不會被重複開啟探測。
+    """
+
+    def __init__(self, max_index=10, timeout=3.0, ttl=300.0,
+                 resolutions=PROBE_RESOLUTIONS, opener=open_capture):
+        self.max_index = max_index
+        self.timeout = timeout
+        self.ttl = ttl
+        self.resolutions = resolutions
+        self.opener = opener
+        self.lock = threading.Lock()
+        self._entries = {}  # 編號 -> {'available', 'checked', 'capabilities'}
+        self._probes = {}   # 編號 -> (探測中的執行緒, 開始時間)
+        self._in_use = set()
+
+    def _fresh(self, entry, now):
+        return entry is not None and now - entry['checked'] <= self.ttl
+
+    def _store(self, index, available, capabilities=None):
+        with self.lock:
+            self._entries[index] = {
+                'available': available,
+                'checked': time.monotonic(),
+                'capabilities': capabilities or {},
+            }
+
+    def _probe(self, index):
+        """探測單一編號（在背景執行緒中執行）"""
+        capabilities = None
+        try:
+            capture = self.opener(index)
+            if capture is not None:
+                try:
+                    capabilities = probe_capabilities(capture, self.resolutions)
+                finally:
+                    capture.release()
+        except Exception as e:
+            print(f"探測攝影機 {index} 時發生錯誤: {str(e)}")
+        self._store(index, capabilities is not None, capabilities)
+        with self.lock:
+            self._probes.pop(index, None)
+
+    def scan(self, indices=None, force=False, wait=True, timeout=None):
+        """平行探測攝影機，回傳可用的編號（已排序）
+
+        indices 預設為 0 到 max_index - 1；force 為 True 時忽略快取；
+        wait 為 False 時只啟動背景探測並立即以目前的快取回傳。
+        """
+        if indices is None:
+            indices = range(self.max_index)
+        indices = list(indices)
+        now = time.monotonic()
+        started = []
+        created = []
+        with self.lock:
+            for index in indices:
+                if index in self._in_use:
+                    continue
+                if not force and self._fresh(self._entries.get(index), now):
+                    continue
+                if index in self._probes:
+                    started.append(self._probes[index])
+                    continue
+                thread = threading.Thread(target=self._probe, args=(index,),
+                                          name=f'camera-probe-{index}', daemon=True)
+                self._probes[index] = (thread, now)
+                started.append((thread, now))
+                created.append(thread)
+        for thread in created:
+            thread.start()
+
+        if wait and started:
+            # 每個探測最多等到它開始後 timeout 秒，先前掃描留下、已逾時的探測不再等待
+            limit = self.timeout if timeout is None else timeout
+            for thread, started_at in started:
+                thread.join(max(0.0, started_at + limit - time.monotonic()))
+            with self.lock:
+                for index in indices:
+                    # 逾時：暫時視為無法使用，但不快取，下次掃描時重試
+                    if index in self._probes:
+                        print(f"探測攝影機 {index} 逾時")
+        return self.available(indices)
+
+    def pending(self, indices=None):
+        """回傳仍在探測中（尚未逾時）的編號"""
+        now = time.monotonic()
+        with self.lock:
+            result = {index for index, (_, started_at) in self._probes.items()
+                      if now - started_at < self.timeout}
+        if indices is not None:
+            result &= set(indices)
+        return sorted(result)
+
+    def available(self, indices=None):
+        """回傳快取中可用（或使用中）的編號"""
+        now = time.monotonic()
+        with self.lock:
+            result = set(self._in_use)
+            for index, entry in self._entries.items():
+                if entry['available'] and self._fresh(entry, now):
+                    result.add(index)
+        if indices is not None:
+            result &= set(indices)
+        return sorted(result)
+
+    def get(self, index):
+        """回傳指定編號的快取資訊，沒有或已過期時回傳 None"""
+        with self.lock:
+            entry = self._entries.get(index)
+            if self._fresh(entry, time.monotonic()):
+                return dict(entry)
+        return None
+
+    def register(self, index, capabilities=None):
+        """記錄使用中的攝影機（已被開啟，不再探測）"""
+        with self.lock:
+            self._in_use.add(index)
+        if capabilities is not None or self.get(index) is None:
+            self._store(index, True, capabilities)
+
+    def unregister(self, index):
+        """攝影機不再使用"""
+        with self.lock:
+            self._in_use.discard(index)
+
+    def mark_failed(self, index):
+        """開啟失敗：作廢快取的結果，下次掃描時重新探測"""
+        with self.lock:
+            self._in_use.discard(index)
+            self._entries.pop(index, None)
+
+    def invalidate(self, index=None):
+        """作廢快取（index 為 None 時作廢全部）"""
+        with self.lock:
+            if index is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(index, None)
@@ -1,86 +1,163 @@
 import cv2
-import numpy as np
+import math
 from PyQt5.QtCore import QThread, pyqtSignal
 import time
+from frame_buffer import FrameField, FrameSlot
+from frame_profiler import FrameProfiler
+from frame_source import CameraSource
 
 class CameraModule(QThread):
-    frame_ready = pyqtSignal(np.ndarray)
+    """攝影機擷取引擎
+
+    只有擷取執行緒會讀取攝影機，讀到的影格放入 frame_slot（只保留最新一張），
+    顯示、錄影與截圖都從 frame_slot 取用，不會再從其他執行緒讀取裝置；
+    擷取中變更格式、解析度與對焦時也只記錄要求，由擷取執行緒在兩次讀取之間套用。
+    影格來源可替換為影片檔、圖片資料夾或合成影像（見 frame_source），
+    方便在沒有攝影機的環境下測試整個流程。
+
+    freeze() 暫停擷取（可先以最高解析度擷取一張靜態影像，由 still_captured 送出），
+    暫停期間攝影機會被釋放，CPU 與 USB 負載降到接近零；resume() 重新開啟並繼續擷取。
+
+    request_crop() 指定只需要的視野（放大時的 ROI 加上餘裕）：來源支援數位變焦時
+    由裝置只送出涵蓋該視野的範圍，裝置做不到的部分（不支援、只能以中心變焦或
+    超過最大倍率）在色彩轉換前以軟體裁剪，只轉換需要的部分。影格的視野隨封包送出
+    （FramePacket.field），處理器據此換算 ROI，畫面不變。
+    """
     
-    def __init__(self, camera_id=0):
+    still_captured = pyqtSignal(object)  # 靜態影像（通道順序與 channel_order 相同）
+    
+    def __init__(self, camera_id=0, source=None, width=1920, height=1080,
+                 fourcc='auto', fps=30, buffer_size=1, channel_order='RGB'):
         super().__init__()
         self.camera_id = camera_id
+        self.source = source  # 影格來源，None 時使用攝影機 camera_id
         self.camera = None
         self.running = False
-        self.frame_width = 1920
-        self.frame_height = 1080
+        self.frame_width = width
+        self.frame_height = height
+        # 擷取格式：FOURCC（'auto' 表示依序嘗試 MJPG、YUY2）、幀率、驅動緩衝影格數
+        self.fourcc = fourcc
+        self.target_fps = fps
+        self.buffer_size = buffer_size
+        self.capture_format = None  # 協商後裝置實際送出的格式
+        self._format_pending = False
+        self._resize_pending = False  # 只改變解析度（依縮放調整），不重新協商格式
+        # 'RGB'：擷取後轉為 RGB；'BGR'：保留裝置的 BGR，直到顯示時才由 Qt 處理
+        self.channel_order = channel_order
         self.autofocus = True
         self.focus_value = 0
+        self._focus_pending = False
         self.current_frame = None
+        self.frame_slot = FrameSlot()
+        self.measured_fps = 0.0  # 實際擷取幀率（指數移動平均）
+        self._last_timestamp = None
+        self.profiler = FrameProfiler()  # 由主視窗替換為共用的計時器
+        self.paused = False
+        self.release_on_pause = True  # 暫停時釋放攝影機（其他來源只停止讀取）
+        self._still_requested = False
+        # 擷取端裁剪：要求的視野、目前的方式（'device'、'software' 或 None）與裝置送出的視野
+        self.crop_request = None
+        self.crop_mode = None
+        self.field = None
+        self._crop_rect = None  # 軟體裁剪的範圍（裝置送出影像的 0-1 座標，只在擷取執行緒中變更）
+        self._crop_pending = False
+        self._settle = 0  # 裝置變更視野後仍要丟棄的影格數（驅動緩衝區中的舊視野影格）
         
         # 初始化攝影機
         self.init_camera()
     
     def init_camera(self):
-        """初始化攝影機，如果指定的攝影機無法開啟，則嘗試其他可用的攝影機"""
-        print(f"嘗試開啟攝影機 {self.camera_id}...")
-        
-        # 首先嘗試使用 DirectShow
-        self.camera = cv2.VideoCapture(self.camera_id, cv2.CAP_DSHOW)
-        if not self.camera.isOpened():
-            print("使用 DirectShow 開啟失敗，嘗試其他方式...")
-            self.camera = cv2.VideoCapture(self.camera_id)
-        
-        # 如果仍然無法開啟，嘗試其他攝影機
-        if not self.camera.isOpened():
-            print("嘗試尋找可用的攝影機...")
-            for i in range(5):  # 嘗試前5個攝影機
-                if i == self.camera_id:
-                    continue
-                print(f"嘗試攝影機 {i}...")
-                self.camera = cv2.VideoCapture(i, cv2.CAP_DSHOW)
-                if self.camera.isOpened():
-                    self.camera_id = i
-                    print(f"成功開啟攝影機 {i}")
-                    break
-                self.camera = cv2.VideoCapture(i)
-                if self.camera.isOpened():
-                    self.camera_id = i
-                    print(f"成功開啟攝影機 {i}")
-                    break
-        
-        if not self.camera.isOpened():
-            raise Exception("無法開啟任何攝影機，請確認攝影機是否正確連接")
-        
-        # 設定攝影機參數
-        self.set_camera_properties()
+        """開啟影格來源，攝影機來源無法開啟指定的攝影機時會嘗試其他可用的攝影機"""
+        if self.source is None:
+            self.source = CameraSource(self.camera_id)
+        if not self.source.open():
+            raise Exception(f"無法開啟影格來源（{self.source.describe()}），請確認攝影機是否正確連接")
+        self.camera = self.source
+        if isinstance(self.source, CameraSource):
+            self.camera_id = self.source.camera_id
+            # 設定攝影機參數
+            self.set_camera_properties()
+        else:
+            print(f"使用影格來源: {self.source.describe()}")
+        # 重新開啟的裝置回到完整視野，再次套用要求的視野
+        self.crop_mode = None
+        self.field = None
+        self._crop_pending = self.crop_request is not None
     
     def set_camera_properties(self):
         """設定攝影機屬性"""
         try:
-            # 設定解析度
-            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_width)
-            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_height)
-            
-            # 設定自動對焦
-            self.camera.set(cv2.CAP_PROP_AUTOFOCUS, 1 if self.autofocus else 0)
+            # 協商擷取格式（FOURCC、解析度、幀率、緩衝區）
+            self.negotiate_format()
             
-            # 如果是手動對焦，設定對焦值
-            if not self.autofocus:
-                self.camera.set(cv2.CAP_PROP_FOCUS, self.focus_value)
-            
-            # 獲取實際設定的解析度
-            actual_width = self.camera.get(cv2.CAP_PROP_FRAME_WIDTH)
-            actual_height = self.camera.get(cv2.CAP_PROP_FRAME_HEIGHT)
-            print(f"攝影機實際解析度: {actual_width}x{actual_height}")
+            # 設定對焦
+            self.apply_focus()
             
         except Exception as e:
             print(f"設定攝影機屬性時發生錯誤: {str(e)}")
     
+    def negotiate_format(self):
+        """協商擷取格式並記錄裝置實際送出的格式（擷取中只能由擷取執行緒呼叫）"""
+        self._format_pending = False
+        self._resize_pending = False
+        if not isinstance(self.camera, CameraSource):
+            return None
+        result = self.camera.negotiate(self.frame_width, self.frame_height,
+                                       self.fourcc, self.target_fps, self.buffer_size)
+        if result is None:
+            return None
+        self.capture_format = result
+        print(f"攝影機實際格式: {result['fourcc'] or '未知'} {result['width']}x{result['height']} "
+              f"回報 {result['reported_fps']:.1f}fps，實測 {result['measured_fps']:.1f}fps")
+        if (self.target_fps and result['measured_fps'] and
+                result['measured_fps'] < self.target_fps / 2):
+            print("攝影機實際幀率遠低於設定，可嘗試改用 MJPG 或降低解析度")
+        return result
+    
+    def resize_capture(self):
+        """只把擷取解析度改為 frame_width x frame_height（擷取中只能由擷取執行緒呼叫）
+
+        不重新協商也不量測幀率，擷取不會中斷；實際幀率由 measured_fps 從之後的影格量測。
+        """
+        self._resize_pending = False
+        if not isinstance(self.camera, CameraSource):
+            return None
+        size = self.camera.set_resolution(self.frame_width, self.frame_height)
+        if size is None:
+            return None
+        # 切換解析度時的停頓不計入幀率
+        self._last_timestamp = None
+        if self.capture_format is not None:
+            self.capture_format = dict(self.capture_format, width=size[0], height=size[1],
+                                       measured_fps=self.measured_fps)
+        return size
+    
+    def apply_focus(self):
+        """套用自動對焦或手動對焦值（擷取中只能由擷取執行緒呼叫）"""
+        self._focus_pending = False
+        if self.camera is None or not self.camera.is_opened():
+            return
+        # 設定自動對焦
+        self.camera.set(cv2.CAP_PROP_AUTOFOCUS, 1 if self.autofocus else 0)
+        
+        # 如果是手動對焦，設定對焦值
+        if not self.autofocus:
+            self.camera.set(cv2.CAP_PROP_FOCUS, self.focus_value)
+    
     def run(self):
         """執行攝影機擷取執行緒"""
         self.running = True
         while self.running:
-            if self.camera is None or not self.camera.isOpened():
+            if self._still_requested:
+                self._capture_still()
+            if self.paused:
+                if (self.release_on_pause and isinstance(self.camera, CameraSource) and
+                        self.camera.is_opened()):
+                    self.camera.release()
+                time.sleep(0.05)
+                continue
+            
+            if self.camera is None or not self.camera.is_opened():
                 print("攝影機未開啟，嘗試重新初始化...")
                 try:
                     self.init_camera()
@@ -89,55 +166,233 @@ class CameraModule(QThread):
                     time.sleep(1)
                     continue
             
-            ret, frame = self.camera.read()
+            if self._format_pending:
+                # 格式變更在擷取執行緒中套用，避免與 read() 同時操作裝置
+                self.negotiate_format()
+            elif self._resize_pending:
+                self.resize_capture()
+            if self._focus_pending:
+                self.apply_focus()
+            if self._crop_pending:
+                self._apply_crop()
+            
+            ret, frame, timestamp = self.camera.read()
             if ret:
-                # 轉換為 RGB 格式
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                self._update_measured_fps(timestamp)
+                self.profiler.tick('capture', timestamp)
+                if self._settle:
+                    self._settle -= 1
+                    continue
+                field = None
+                if self.crop_mode is not None:
+                    frame, field = self._crop_frame(frame)
+                if self.channel_order == 'RGB':
+                    # 轉換為 RGB 格式
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 self.current_frame = frame
-                self.frame_ready.emit(frame)
+                self.frame_slot.put(frame, timestamp, field)
+            elif self.camera.exhausted:
+                print(f"影格來源已播放完畢: {self.camera.describe()}")
+                break
             else:
                 print("讀取影格失敗")
                 time.sleep(0.1)
     
+    def request_crop(self, rect):
+        """要求只擷取 rect（0-1 的原始影像座標 (x, y, w, h)）涵蓋的視野，None 表示完整畫面
+
+        可從任何執行緒呼叫，在擷取執行緒中套用。與目前的要求相差不多時（大小與中心的
+        變化都小於 10%）不變更，避免平移時反覆調整裝置。
+        """
+        current = self.crop_request
+        if rect is None or current is None:
+            if rect == current:
+                return
+        elif (abs(rect[2] / current[2] - 1) < 0.1 and abs(rect[3] / current[3] - 1) < 0.1 and
+              abs(rect[0] + rect[2] / 2 - current[0] - current[2] / 2) < 0.1 * current[2] and
+              abs(rect[1] + rect[3] / 2 - current[1] - current[3] / 2) < 0.1 * current[3]):
+            return
+        self.crop_request = rect
+        self._crop_pending = True
+    
+    def _apply_crop(self):
+        """套用要求的視野（在擷取執行緒中呼叫）
+
+        先交給裝置的數位變焦，再把要求的視野換算到裝置送出的影像中，
+        剩下的部分以軟體裁剪；幾乎是整張影像時不裁剪。
+        """
+        self._crop_pending = False
+        rect = self.crop_request
+        field = None
+        try:
+            if self.camera.supports_device_crop():
+                field = self.camera.set_device_crop(rect)
+        except Exception as e:
+            print(f"設定攝影機數位變焦時發生錯誤: {str(e)}")
+        if field != self.field:
+            # 驅動緩衝區中仍有舊視野的影格，丟棄後才以新視野標記
+            self._settle = self.buffer_size + 1 if isinstance(self.camera, CameraSource) else 0
+        self.field = field
+        crop = None
+        if rect is not None:
+            field_x, field_y, field_width, field_height = field or (0.0, 0.0, 1.0, 1.0)
+            x0 = max(0.0, (rect[0] - field_x) / field_width)
+            y0 = max(0.0, (rect[1] - field_y) / field_height)
+            x1 = min(1.0, (rect[0] + rect[2] - field_x) / field_width)
+            y1 = min(1.0, (rect[1] + rect[3] - field_y) / field_height)
+            if x1 > x0 and y1 > y0 and (x1 - x0) * (y1 - y0) < 0.9:
+                crop = (x0, y0, x1 - x0, y1 - y0)
+        self._crop_rect = crop
+        if field is not None:
+            self.crop_mode = 'device'
+        else:
+            self.crop_mode = 'software' if crop is not None else None
+    
+    def _crop_frame(self, frame):
+        """在色彩轉換前以軟體裁剪（取整到像素），回傳 (影像, FrameField)"""
+        height, width = frame.shape[:2]
+        field_x, field_y, field_width, field_height = self.field or (0.0, 0.0, 1.0, 1.0)
+        if self._crop_rect is not None:
+            x, y, w, h = self._crop_rect
+            x0, y0 = max(0, int(x * width)), max(0, int(y * height))
+            x1 = min(width, int(math.ceil((x + w) * width)))
+            y1 = min(height, int(math.ceil((y + h) * height)))
+            frame = frame[y0:y1, x0:x1]
+            if self.field is None:
+                # 只有軟體裁剪：視野直接以像素計算，不累積浮點誤差
+                field_x, field_y = x0 / width, y0 / height
+                field_width, field_height = (x1 - x0) / width, (y1 - y0) / height
+            else:
+                field_x += x0 / width * field_width
+                field_y += y0 / height * field_height
+                field_width *= (x1 - x0) / width
+                field_height *= (y1 - y0) / height
+        if frame.shape[:2] == (height, width) and self.field is None:
+            return frame, None
+        return frame, FrameField(field_x, field_y, field_width, field_height, width, height)
+    
+    def full_frame_size(self, size):
+        """軟體裁剪時，把裁剪後影格所需的大小換算為裝置送出影格（擷取解析度）的大小"""
+        crop = self._crop_rect if self.crop_mode is not None else None
+        if size is None or crop is None:
+            return size
+        return math.ceil(size[0] / crop[2]), math.ceil(size[1] / crop[3])
+    
+    def _update_measured_fps(self, timestamp):
+        """以影格間隔更新實際擷取幀率"""
+        if self._last_timestamp is not None:
+            interval = timestamp - self._last_timestamp
+            if interval > 0:
+                fps = 1.0 / interval
+                if self.measured_fps == 0:
+                    self.measured_fps = fps
+                else:
+                    self.measured_fps += 0.1 * (fps - self.measured_fps)
+        self._last_timestamp = timestamp
+    
+    def freeze(self, high_resolution=False):
+        """暫停擷取；high_resolution 為 True 時先以最高解析度擷取一張靜態影像"""
+        self._still_requested = high_resolution
+        self.paused = True
+    
+    def resume(self):
+        """繼續擷取（暫停時釋放的攝影機會在擷取執行緒中重新開啟）"""
+        self._still_requested = False
+        self.paused = False
+    
+    def _capture_still(self):
+        """擷取靜態影像並以 still_captured 送出（在擷取執行緒中執行）"""
+        self._still_requested = False
+        try:
+            if self.camera is None or not self.camera.is_opened():
+                self.init_camera()
+            # 擷取後即暫停並釋放裝置時，不必恢復原本的解析度
+            restore = not (self.paused and self.release_on_pause)
+            if self.crop_mode == 'device':
+                # 靜態影像使用完整視野，繼續擷取時再套用要求的視野
+                self.camera.set_device_crop(None)
+                self.crop_mode = None
+                self.field = None
+                self._crop_pending = True
+            frame = self.camera.capture_still(restore=restore)
+        except Exception as e:
+            print(f"擷取靜態影像時發生錯誤: {str(e)}")
+            return
+        if frame is None:
+            print("擷取靜態影像失敗")
+            return
+        if self.channel_order == 'RGB':
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        print(f"已擷取靜態影像: {frame.shape[1]}x{frame.shape[0]}")
+        self.still_captured.emit(frame)
+    
     def stop(self):
         """停止攝影機擷取"""
         self.running = False
         self.wait()
+        self.release()
+    
+    def release(self):
+        """釋放影格來源"""
         if self.camera is not None:
             self.camera.release()
             self.camera = None
     
-    def set_resolution(self, width, height):
-        """設定攝影機解析度"""
+    def set_resolution(self, width, height, negotiate=True):
+        """設定攝影機解析度
+
+        negotiate 為 False 時（依縮放自動調整）只改變寬高，不重新協商格式與量測幀率，
+        畫面不會停頓；使用者變更設定時才完整協商。
+        """
+        if (width, height) == (self.frame_width, self.frame_height):
+            return
         self.frame_width = width
         self.frame_height = height
-        if self.camera is not None and self.camera.isOpened():
-            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if negotiate:
+            self._request_format()
+        elif self.isRunning():
+            self._resize_pending = True
+        elif self.camera is not None and self.camera.is_opened():
+            self.resize_capture()
+    
+    def set_capture_format(self, fourcc=None, fps=None, buffer_size=None):
+        """設定擷取格式（FOURCC、幀率、驅動緩衝影格數），None 表示不變"""
+        new = (fourcc or self.fourcc,
+               self.target_fps if fps is None else fps,
+               self.buffer_size if buffer_size is None else buffer_size)
+        if new == (self.fourcc, self.target_fps, self.buffer_size):
+            return
+        self.fourcc, self.target_fps, self.buffer_size = new
+        self._request_format()
+    
+    def _request_format(self):
+        """重新協商擷取格式：擷取中交給擷取執行緒處理，否則立即套用"""
+        if self.isRunning():
+            self._format_pending = True
+        elif self.camera is not None and self.camera.is_opened():
+            self.negotiate_format()
     
     def set_focus(self, value):
         """設定對焦值"""
         self.focus_value = value
         self.autofocus = False
-        if self.camera is not None and self.camera.isOpened():
-            self.camera.set(cv2.CAP_PROP_AUTOFOCUS, 0)
-            self.camera.set(cv2.CAP_PROP_FOCUS, value)
+        self._request_focus()
     
     def set_autofocus(self, enabled):
         """設定自動對焦"""
         self.autofocus = enabled
-        if self.camera is not None and self.camera.isOpened():
-            self.camera.set(cv2.CAP_PROP_AUTOFOCUS, 1 if enabled else 0)
+        self._request_focus()
+    
+    def _request_focus(self):
+        """套用對焦設定：擷取中交給擷取執行緒處理，否則立即套用"""
+        if self.isRunning():
+            self._focus_pending = True
+        else:
+            self.apply_focus()
     
     def get_frame(self):
-        """獲取當前的攝影機畫面"""
-        if self.camera is None or not self.camera.isOpened():
+        """獲取最新的攝影機畫面（不會讀取裝置）"""
+        packet = self.frame_slot.get_latest()
+        if packet is None:
             return None
-            
-        ret, frame = self.camera.read()
-        if ret:
-            # 轉換為 RGB 格式
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            self.current_frame = frame
-            return frame
-        return None
\ No newline at end of file
+        return packet.frame
\ No newline at end of file
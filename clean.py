@@ -22,7 +22,23 @@ def clean():
     keep_files = [
         'main.py',
         'camera_module.py',
+        'frame_buffer.py',
+        'processing_worker.py',
         'image_processor.py',
+        'color_lut.py',
+        'overlay_cache.py',
+        'filters.py',
+        'video_recorder.py',
+        'frame_profiler.py',
+        'frame_source.py',
+        'camera_inventory.py',
+        'orientation.py',
+        'image_pyramid.py',
+        'image_exporter.py',
+        'resolution_policy.py',
+        'adaptive_threshold.py',
+        'temporal.py',
+        'benchmark.py',
         'settings_dialog.py',
         'translations.py',
         'keyboard_controller.py',
@@ -0,0 +1,62 @@
+import numpy as np
+
+# 雙色對比模式的前景色 / 背景色（RGB）
+CONTRAST_COLORS = {
+    'yellow_on_black': ((255, 255, 0), (0, 0, 0)),    # 黃色 / 黑色
+    'yellow_on_blue': ((255, 255, 0), (0, 0, 255)),   # 黃色 / 藍色
+    'green_on_black': ((0, 255, 0), (0, 0, 0)),       # 綠色 / 黑色
+    'blue_on_yellow': ((0, 0, 255), (255, 255, 0)),   # 藍色 / 黃色
+}
+
+# 二值化門檻（灰階值大於此值視為前景）
+THRESHOLD = 128
+
+_IDENTITY = np.arange(256, dtype=np.float64)
+
+
+def brightness_table(brightness):
+    """建立亮度調整查找表，結果與 cv2.convertScaleAbs 完全相同"""
+    if brightness > 0:
+        alpha = 1.0
+        beta = brightness * 2.55  # 將 0-100 映射到 0-255
+    else:
+        alpha = 1.0 + (brightness / 100.0)  # 降低亮度時調整對比度
+        beta = 0
+    return np.clip(np.rint(_IDENTITY * alpha + beta), 0, 255).astype(np.uint8)
+
+
+def two_color_table(foreground, background, source=None):
+    """建立灰階到雙色的查找表（256x1x3），source 為先套用的灰階映射"""
+    levels = np.arange(256) if source is None else source
+    table = np.empty((256, 1, 3), dtype=np.uint8)
+    table[:, 0] = background
+    table[levels > THRESHOLD, 0] = foreground
+    return table
+
+
+def build_lut(brightness, color_mode, custom_colors=None):
+    """將亮度與顏色模式合併成單一查找表
+
+    回傳 (kind, table)：
+    - kind 為 None：不需處理
+    - kind 為 'channel'：table 為 256 項，對每個通道套用同一張表
+    - kind 為 'gray'：先轉灰階，table 為 256x1x3 的雙色表
+    """
+    bright = brightness_table(brightness) if brightness != 0 else None
+
+    if color_mode == 'custom_contrast' and custom_colors is not None:
+        foreground, background = custom_colors
+        return 'gray', two_color_table(foreground, background, bright)
+    if color_mode in CONTRAST_COLORS:
+        foreground, background = CONTRAST_COLORS[color_mode]
+        # 亮度併入灰階映射：gray(b(x)) 與 b(gray(x)) 只在通道飽和時有些微差異
+        return 'gray', two_color_table(foreground, background, bright)
+
+    table = bright
+    if color_mode == 'white_on_black':
+        if table is None:
+            table = np.arange(256, dtype=np.uint8)
+        table = 255 - table
+    if table is None:
+        return None, None
+    return 'channel', table
@@ -0,0 +1,147 @@
+import threading
+import numpy as np
+import time
+from collections import namedtuple
+
+# 影格封包：序號、擷取時間（time.monotonic）、影像，以及影像涵蓋的視野（FrameField，
+# None 表示完整畫面）
+FramePacket = namedtuple('FramePacket', ['seq', 'timestamp', 'frame', 'field'], defaults=(None,))
+
+# 擷取端裁剪（攝影機數位變焦或軟體裁剪）後影像的視野：x, y, width, height 為在完整畫面中的
+# 範圍（0-1 的原始影像座標），full_width / full_height 為完整畫面的擷取解析度。
+# 數位變焦的影像與擷取解析度同大小（像素較密），軟體裁剪的影像則只有範圍內的像素
+FrameField = namedtuple('FrameField', ['x', 'y', 'width', 'height', 'full_width', 'full_height'])
+
+
+class FrameSlot:
+    """只保留最新一張影格的緩衝槽
+
+    生產者（擷取執行緒）以 put() 覆寫槽內影格，每張影格帶有遞增序號；
+    消費者（顯示、錄影、截圖）以 get_latest() 或 wait_newer() 取得影格，
+    並以序號判斷是否為新影格。槽的大小固定為 1，生產者永遠不會被阻塞，
+    落後的消費者只會直接跳到最新的影格。
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._packet = None
+        self._seq = 0
+        self._consumed = True
+        self.dropped = 0  # 尚未被讀取就被覆寫的影格數
+
+    def put(self, frame, timestamp=None, field=None):
+        """放入新影格，回傳其序號"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self._condition:
+            if self._packet is not None and not self._consumed:
+                self.dropped += 1
+            self._seq += 1
+            self._packet = FramePacket(self._seq, timestamp, frame, field)
+            self._consumed = False
+            self._condition.notify_all()
+            return self._seq
+
+    def get_latest(self):
+        """取得最新影格封包，若尚無影格則回傳 None"""
+        with self._condition:
+            if self._packet is not None:
+                self._consumed = True
+            return self._packet
+
+    def wait_newer(self, seq, timeout=None):
+        """等待序號大於 seq 的影格，逾時則回傳 None"""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._seq > seq, timeout):
+                return None
+            self._consumed = True
+            return self._packet
+
+    @property
+    def seq(self):
+        """目前最新影格的序號"""
+        return self._seq
+
+    def clear(self):
+        """清除槽內影格（序號保持遞增）"""
+        with self._condition:
+            self._packet = None
+            self._condition.notify_all()
+
+
+class BufferRing:
+    """預先配置的影像緩衝區環
+
+    acquire() 依序回傳環中的緩衝區，形狀不符時才重新配置，
+    因此穩定狀態下每張影格不會再配置新的記憶體。輸出的緩衝區會在
+    繞回一圈後被覆寫，消費者若需要長期保存影像必須自行複製。
+    其他執行緒仍在讀取的緩衝區以 hold() 保留、用完後 release()，
+    保留期間 acquire() 會略過它（環中都被保留時另外配置，不會覆寫）。
+    scratch() 則提供以名稱區分、不在環中的暫存緩衝區。
+    """
+
+    def __init__(self, size=4, reuse=True):
+        self.size = size
+        self.reuse = reuse  # False 時每次都配置新緩衝區（用於比較）
+        self._ring = [None] * size
+        self._held = [0] * size  # 各緩衝區被保留的次數
+        self._lock = threading.Lock()
+        self._index = 0
+        self._scratch = {}
+        self.allocations = 0
+        self.reuses = 0
+
+    def _allocate(self, shape, dtype):
+        self.allocations += 1
+        return np.empty(shape, dtype=dtype)
+
+    def acquire(self, shape, dtype=np.uint8):
+        """取得環中的下一個輸出緩衝區"""
+        if not self.reuse:
+            return self._allocate(shape, dtype)
+        with self._lock:
+            for _ in range(self.size):
+                self._index = (self._index + 1) % self.size
+                if not self._held[self._index]:
+                    break
+            else:
+                # 所有緩衝區都被保留
+                return self._allocate(shape, dtype)
+            buffer = self._ring[self._index]
+            if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+                buffer = self._allocate(shape, dtype)
+                self._ring[self._index] = buffer
+            else:
+                self.reuses += 1
+            return buffer
+
+    def _find(self, buffer):
+        for index, item in enumerate(self._ring):
+            if item is buffer:
+                return index
+        return None
+
+    def hold(self, buffer):
+        """保留環中的緩衝區，release() 之前 acquire() 不會回傳它（不在環中的陣列忽略）"""
+        with self._lock:
+            index = self._find(buffer)
+            if index is not None:
+                self._held[index] += 1
+
+    def release(self, buffer):
+        """解除 hold() 的保留"""
+        with self._lock:
+            index = self._find(buffer)
+            if index is not None and self._held[index]:
+                self._held[index] -= 1
+
+    def scratch(self, name, shape, dtype=np.uint8):
+        """取得指定名稱的暫存緩衝區"""
+        buffer = self._scratch.get(name)
+        if (not self.reuse or buffer is None or buffer.shape != tuple(shape)
+                or buffer.dtype != dtype):
+            buffer = self._allocate(shape, dtype)
+            self._scratch[name] = buffer
+        else:
+            self.reuses += 1
+        return buffer
@@ -0,0 +1,141 @@
+import csv
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+
+class _NullStage:
+    """停用時使用的空計時區段，不做任何事"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """計時區段"""
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class FrameProfiler:
+    """逐階段影格計時器
+
+    stage(name) 回傳可用於 with 的計時區段，記錄最近 window 筆耗時以計算
+    p50/p95/p99；tick(name) 記錄事件時間以計算每秒次數（擷取、處理、顯示 FPS）。
+    停用時 stage() 回傳共用的空區段、tick()/record() 直接返回，幾乎沒有額外成本。
+    """
+
+    def __init__(self, enabled=False, window=300, rate_window=2.0):
+        self.enabled = enabled
+        self.window = window
+        self.rate_window = rate_window  # 計算 FPS 的時間範圍（秒）
+        self._samples = {}
+        self._events = {}
+
+    def stage(self, name):
+        """取得計時區段"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        """記錄一筆耗時（秒）"""
+        if not self.enabled:
+            return
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def tick(self, name, timestamp=None):
+        """記錄一次事件，用於計算每秒次數"""
+        if not self.enabled:
+            return
+        if timestamp is None:
+            timestamp = time.monotonic()
+        events = self._events.get(name)
+        if events is None:
+            events = self._events[name] = deque(maxlen=1000)
+        events.append(timestamp)
+
+    def rate(self, name, now=None):
+        """回傳最近 rate_window 秒內的每秒事件數"""
+        events = list(self._events.get(name, ()))
+        if len(events) < 2:
+            return 0.0
+        if now is None:
+            now = time.monotonic()
+        recent = [t for t in events if now - t <= self.rate_window]
+        if len(recent) < 2:
+            return 0.0
+        span = recent[-1] - recent[0]
+        return (len(recent) - 1) / span if span > 0 else 0.0
+
+    def percentiles(self, name):
+        """回傳指定階段耗時的 p50/p95/p99（毫秒）"""
+        samples = list(self._samples.get(name, ()))
+        if not samples:
+            return None
+        p50, p95, p99 = np.percentile(np.array(samples) * 1000, [50, 95, 99])
+        return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99),
+                'count': len(samples)}
+
+    def summary(self):
+        """回傳所有階段的百分位數與 FPS"""
+        return {
+            'stages': {name: self.percentiles(name) for name in list(self._samples)},
+            'fps': {name: self.rate(name) for name in list(self._events)},
+        }
+
+    def format_hud(self):
+        """產生畫面上顯示用的文字"""
+        summary = self.summary()
+        lines = ['  '.join(f'{name} {fps:5.1f}fps' for name, fps in summary['fps'].items())]
+        for name, stats in summary['stages'].items():
+            if stats is not None:
+                lines.append(f"{name:<10} p50 {stats['p50']:6.2f}  p95 {stats['p95']:6.2f}  "
+                             f"p99 {stats['p99']:6.2f} ms")
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        """將統計寫入檔案，副檔名為 .csv 時寫成 CSV，否則寫成 JSON"""
+        summary = self.summary()
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['name', 'p50_ms', 'p95_ms', 'p99_ms', 'count', 'fps'])
+                for name, stats in summary['stages'].items():
+                    if stats is not None:
+                        writer.writerow([name, f"{stats['p50']:.3f}", f"{stats['p95']:.3f}",
+                                         f"{stats['p99']:.3f}", stats['count'], ''])
+                for name, fps in summary['fps'].items():
+                    writer.writerow([name, '', '', '', '', f'{fps:.2f}'])
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+        return path
+
+    def reset(self):
+        """清除所有統計"""
+        self._samples = {}
+        self._events = {}
@@ -0,0 +1,655 @@
+import abc
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+# 影格節奏
+#   realtime：依來源本身的速度（攝影機由裝置決定，影片依檔案幀率）
+#   fast：不等待，盡可能快速送出影格
+#   fixed：依指定的 fps 送出影格
+PACING_MODES = ['realtime', 'fast', 'fixed']
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+# 攝影機格式協商時依序嘗試的 FOURCC（'auto'）：
+# MJPG 在高解析度下仍能維持 30fps，未壓縮的 YUY2 在 1080p 常只剩 5fps
+FOURCC_PREFERENCES = ['MJPG', 'YUY2']
+
+# 不知道攝影機支援的解析度時，擷取靜態影像所要求的解析度（驅動會改用最接近的可用解析度）
+STILL_RESOLUTION = (3840, 2160)
+
+
+def fourcc_to_str(value):
+    """將 CAP_PROP_FOURCC 的數值轉為四字元字串"""
+    value = int(value)
+    if value <= 0:
+        return ''
+    return ''.join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00 ')
+
+
+def open_capture(index):
+    """開啟攝影機，優先使用 DirectShow，失敗時改用預設後端；都失敗回傳 None"""
+    capture = cv2.VideoCapture(index, cv2.CAP_DSHOW)
+    if capture.isOpened():
+        return capture
+    capture.release()
+    capture = cv2.VideoCapture(index)
+    if capture.isOpened():
+        return capture
+    capture.release()
+    return None
+
+
+def zoom_field(rect, max_zoom, centered=False):
+    """涵蓋 rect 的數位變焦，回傳 (倍率, 中心 x, 中心 y)
+
+    rect 為 0-1 的原始影像座標 (x, y, w, h)。centered 為 True 表示裝置只能以畫面中心
+    變焦（無法平移），倍率限制在中心視野仍涵蓋 rect 的範圍內。
+    """
+    x, y, w, h = rect
+    zoom = min(max_zoom, 1.0 / max(w, h))
+    if centered:
+        half = max(0.5 - x, x + w - 0.5, 0.5 - y, y + h - 0.5)
+        return max(1.0, min(zoom, 0.5 / half)), 0.5, 0.5
+    return max(1.0, zoom), x + w / 2, y + h / 2
+
+
+def zoom_rect(zoom, center_x, center_y):
+    """數位變焦的視野（0-1 座標 (x, y, w, h)），中心限制在視野不超出畫面的範圍內"""
+    half = 0.5 / zoom
+    center_x = min(1.0 - half, max(half, center_x))
+    center_y = min(1.0 - half, max(half, center_y))
+    return (center_x - half, center_y - half, 2 * half, 2 * half)
+
+
+def make_text_page(width, height, seed=0):
+    """產生模擬書頁的合成影像（RGB）：紙張底色、文字行與些許雜訊"""
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width, 3), (235, 230, 220), dtype=np.uint8)
+    scale = max(0.4, height / 1080)
+    line_height = int(42 * scale)
+    margin = int(60 * scale)
+    words = ['magnifier', 'reading', 'the', 'quick', 'brown', 'fox', 'jumps',
+             'over', 'lazy', 'dog', '0123456789', 'vision', 'contrast', 'text']
+    y = margin + line_height
+    while y < height - margin:
+        text = ' '.join(rng.choice(words, size=12))
+        cv2.putText(page, text, (margin, y), cv2.FONT_HERSHEY_SIMPLEX, scale,
+                    (30, 30, 30), max(1, int(2 * scale)), cv2.LINE_AA)
+        y += line_height
+    # 不均勻照明與感光雜訊
+    gradient = np.linspace(0.75, 1.0, width, dtype=np.float32)[None, :, None]
+    noise = rng.normal(0, 4, page.shape).astype(np.float32)
+    return np.clip(page * gradient + noise, 0, 255).astype(np.uint8)
+
+
+class FrameSource(abc.ABC):
+    """影格來源基底類別
+
+    read() 回傳 (ret, frame, timestamp)，frame 為 BGR（與 cv2.VideoCapture 相同），
+    timestamp 為 time.monotonic() 時間。節奏由 pacing 決定，'realtime' 時使用
+    native_fps（沒有則不等待），'fixed' 時使用 fps。
+    exhausted 為 True 表示來源已播放完畢，不會再有新影格。
+    """
+
+    def __init__(self, pacing='realtime', fps=None):
+        if pacing not in PACING_MODES:
+            raise ValueError(f"未知的影格節奏: {pacing}")
+        if pacing == 'fixed' and not fps:
+            raise ValueError("fixed 節奏需要指定 fps")
+        self.pacing = pacing
+        self.fps = fps
+        self.native_fps = None
+        self.exhausted = False
+        self._start_time = None
+        self._frame_index = 0
+
+    def open(self):
+        """開啟來源，成功回傳 True"""
+        return True
+
+    def is_opened(self):
+        """來源是否已開啟"""
+        return True
+
+    def release(self):
+        """釋放來源"""
+
+    def set(self, prop, value):
+        """設定擷取屬性（cv2.CAP_PROP_*），不支援時回傳 False"""
+        return False
+
+    def get(self, prop):
+        """讀取擷取屬性（cv2.CAP_PROP_*），不支援時回傳 0"""
+        return 0
+
+    def describe(self):
+        """來源說明（用於記錄）"""
+        return type(self).__name__
+
+    def supports_device_crop(self):
+        """裝置能否只送出部分視野（數位變焦），不支援時由擷取端以軟體裁剪"""
+        return False
+
+    def set_device_crop(self, rect):
+        """讓裝置送出涵蓋 rect（0-1 的原始影像座標 (x, y, w, h)）的視野
+
+        rect 為 None 表示完整畫面。回傳裝置實際送出的視野，完整畫面時回傳 None；
+        影像大小不變，視野以外的部分不會被讀取與傳輸。
+        """
+        return None
+
+    @abc.abstractmethod
+    def _grab(self):
+        """讀取下一張影格，由子類別實作，回傳 (ret, frame)"""
+
+    def _interval(self):
+        """依節奏回傳影格間隔（秒），None 表示不等待"""
+        if self.pacing == 'fixed':
+            return 1.0 / self.fps
+        if self.pacing == 'realtime' and self.native_fps:
+            return 1.0 / self.native_fps
+        return None
+
+    def _wait(self):
+        """等到下一張影格的預定時間
+
+        以開始時間加上影格編號計算預定時間，不會累積誤差；
+        落後超過一秒（例如除錯中斷）時重新對齊，避免之後連續不等待。
+        """
+        interval = self._interval()
+        if interval is None:
+            return
+        now = time.monotonic()
+        if self._start_time is None:
+            self._start_time = now
+        deadline = self._start_time + self._frame_index * interval
+        if now - deadline > 1.0:
+            self._start_time = now - self._frame_index * interval
+            deadline = now
+        if deadline > now:
+            time.sleep(deadline - now)
+
+    def read(self):
+        """依節奏讀取下一張影格"""
+        self._wait()
+        ret, frame = self._grab()
+        if not ret:
+            return False, None, None
+        self._frame_index += 1
+        return True, frame, time.monotonic()
+
+    def capture_still(self, width=None, height=None, restore=True):
+        """擷取單張靜態影像（BGR），失敗回傳 None
+
+        攝影機會以 width x height（預設為最高解析度）擷取；其他來源直接回傳下一張影格。
+        """
+        ret, frame = self._grab()
+        return frame if ret else None
+
+
+class CameraSource(FrameSource):
+    """攝影機來源
+
+    優先使用 DirectShow，失敗時改用預設後端；指定的攝影機無法開啟時，
+    會嘗試前 5 個攝影機。有攝影機清單服務（inventory）時以平行探測的結果
+    挑選可用的攝影機，否則逐一嘗試。實際使用的編號存在 camera_id。
+    """
+
+    def __init__(self, camera_id=0, pacing='realtime', fps=None, fallback=True, inventory=None):
+        super().__init__(pacing, fps)
+        self.camera_id = camera_id
+        self.fallback = fallback
+        self.inventory = inventory
+        self.capture = None
+        self.format = None  # 最近一次協商／量測的結果
+        # 數位變焦：UVC 的 CAP_PROP_ZOOM 沒有統一的單位，預設採用常見的 zoom_base 為 1 倍、
+        # 每增加 1 倍加 zoom_step 的對應（例如 Logitech 的 100-400 為 1-4 倍）
+        self.zoom_base = 100
+        self.zoom_step = 100
+        self.max_device_zoom = 4.0
+        # 水平 / 垂直視角（度）：設定後才以 CAP_PROP_PAN / CAP_PROP_TILT（UVC 單位為角秒）
+        # 移動變焦中心，否則只以畫面中心變焦
+        self.field_of_view = None
+        self._reset_device_crop()
+
+    def _reset_device_crop(self):
+        """開啟或釋放裝置時重新探測數位變焦"""
+        self._device_zoom = None  # None：尚未探測
+        self._device_state = None  # 最近送出的 (zoom, pan, tilt) 設定值
+        self._device_field = None
+
+    def open(self):
+        self._reset_device_crop()
+        print(f"嘗試開啟攝影機 {self.camera_id}...")
+        self.capture = open_capture(self.camera_id)
+        if self.capture is None:
+            if self.inventory is not None:
+                self.inventory.mark_failed(self.camera_id)
+            if self.fallback:
+                print("嘗試尋找可用的攝影機...")
+                candidates = [i for i in range(5) if i != self.camera_id]  # 嘗試前5個攝影機
+                if self.inventory is not None:
+                    candidates = self.inventory.scan(candidates)
+                for i in candidates:
+                    print(f"嘗試攝影機 {i}...")
+                    self.capture = open_capture(i)
+                    if self.capture is not None:
+                        self.camera_id = i
+                        print(f"成功開啟攝影機 {i}")
+                        break
+                    if self.inventory is not None:
+                        self.inventory.mark_failed(i)
+        if self.capture is not None and self.inventory is not None:
+            self.inventory.register(self.camera_id)
+        return self.capture is not None
+
+    def is_opened(self):
+        return self.capture is not None and self.capture.isOpened()
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+            self._reset_device_crop()
+            if self.inventory is not None:
+                self.inventory.unregister(self.camera_id)
+
+    def set(self, prop, value):
+        if not self.is_opened():
+            return False
+        return self.capture.set(prop, value)
+
+    def get(self, prop):
+        if not self.is_opened():
+            return 0
+        return self.capture.get(prop)
+
+    def describe(self):
+        return f"攝影機 {self.camera_id}"
+
+    def supports_device_crop(self):
+        """能設定並讀回 1 倍的變焦值才視為支援（同時把變焦恢復為 1 倍）
+
+        不支援的後端 set() 回傳 False，或讀回 0 / -1。
+        """
+        if self._device_zoom is None and self.is_opened():
+            self._device_zoom = (bool(self.capture.set(cv2.CAP_PROP_ZOOM, self.zoom_base)) and
+                                 abs(self.capture.get(cv2.CAP_PROP_ZOOM) - self.zoom_base) < 0.5)
+            self._device_state = (self.zoom_base, 0, 0)
+            self._device_field = None
+        return bool(self._device_zoom)
+
+    def set_device_crop(self, rect):
+        """以數位變焦（有視角時加上平移）涵蓋 rect
+
+        實際視野以裝置讀回的值計算（裝置可能只接受特定的步進）；設定值不變時不重送。
+        """
+        if not self.supports_device_crop():
+            return None
+        pan = self.field_of_view is not None
+        zoom, center_x, center_y = 1.0, 0.5, 0.5
+        if rect is not None:
+            zoom, center_x, center_y = zoom_field(rect, self.max_device_zoom, centered=not pan)
+        if zoom < 1.05:
+            zoom, center_x, center_y = 1.0, 0.5, 0.5
+        pan_value = tilt_value = 0
+        if pan:
+            horizontal, vertical = self.field_of_view
+            pan_value = int(round((center_x - 0.5) * horizontal * 3600))
+            tilt_value = int(round((0.5 - center_y) * vertical * 3600))
+        state = (int(round(self.zoom_base + (zoom - 1.0) * self.zoom_step)), pan_value, tilt_value)
+        if state == self._device_state:
+            return self._device_field
+        self.capture.set(cv2.CAP_PROP_ZOOM, state[0])
+        if pan:
+            self.capture.set(cv2.CAP_PROP_PAN, pan_value)
+            self.capture.set(cv2.CAP_PROP_TILT, tilt_value)
+            center_x = 0.5 + self.capture.get(cv2.CAP_PROP_PAN) / (horizontal * 3600)
+            center_y = 0.5 - self.capture.get(cv2.CAP_PROP_TILT) / (vertical * 3600)
+        self._device_state = state
+        zoom = 1.0 + (self.capture.get(cv2.CAP_PROP_ZOOM) - self.zoom_base) / self.zoom_step
+        zoom = min(self.max_device_zoom, zoom)
+        self._device_field = zoom_rect(zoom, center_x, center_y) if zoom > 1.001 else None
+        return self._device_field
+
+    def negotiate(self, width, height, fourcc='auto', fps=30, buffer_size=1):
+        """協商擷取格式並量測裝置實際送出的格式
+
+        FOURCC 必須在解析度之前設定，部分驅動程式會依 FOURCC 決定可用的解析度。
+        fourcc 為 'auto' 時依 FOURCC_PREFERENCES 嘗試，使用第一個裝置接受的格式。
+        buffer_size 設為 1 讓驅動只保留最新影格，降低延遲（不支援的後端會忽略）。
+        回傳 probe() 的結果。
+        """
+        if not self.is_opened():
+            return None
+        candidates = FOURCC_PREFERENCES if fourcc == 'auto' else [fourcc]
+        for code in candidates:
+            self.capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*code))
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            if fps:
+                self.capture.set(cv2.CAP_PROP_FPS, fps)
+            if fourcc_to_str(self.capture.get(cv2.CAP_PROP_FOURCC)) == code:
+                break
+        if buffer_size:
+            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        return self.probe()
+
+    def set_resolution(self, width, height):
+        """只改變擷取解析度，回傳裝置實際的 (寬, 高)
+
+        不重新設定 FOURCC、幀率與緩衝區，也不量測幀率（probe 會讀取並丟棄最多 1 秒的影格），
+        用於擷取中依縮放調整解析度；幀率由呼叫端從持續擷取的影格量測。
+        """
+        if not self.is_opened():
+            return None
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        return (int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def probe(self, frames=10, timeout=1.0):
+        """讀取裝置回報的格式，並實際擷取數張影格量測送出的幀率
+
+        第一張影格常因裝置暖機而較慢，不列入量測；最多量測 timeout 秒。
+        """
+        if not self.is_opened():
+            return None
+        result = {
+            'fourcc': fourcc_to_str(self.capture.get(cv2.CAP_PROP_FOURCC)),
+            'width': int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'reported_fps': self.capture.get(cv2.CAP_PROP_FPS),
+            'buffer_size': int(self.capture.get(cv2.CAP_PROP_BUFFERSIZE)),
+            'measured_fps': 0.0,
+        }
+        if frames > 1 and self.capture.grab():
+            start = time.monotonic()
+            grabbed = 0
+            while grabbed < frames and time.monotonic() - start < timeout:
+                if not self.capture.grab():
+                    break
+                grabbed += 1
+            elapsed = time.monotonic() - start
+            if grabbed and elapsed > 0:
+                result['measured_fps'] = grabbed / elapsed
+        self.format = result
+        return result
+
+    def max_resolution(self):
+        """攝影機支援的最高解析度，清單服務沒有記錄時回傳 STILL_RESOLUTION"""
+        if self.inventory is not None:
+            entry = self.inventory.get(self.camera_id)
+            resolutions = entry['capabilities'].get('resolutions') if entry else None
+            if resolutions:
+                return max(resolutions, key=lambda size: size[0] * size[1])
+        return STILL_RESOLUTION
+
+    def capture_still(self, width=None, height=None, restore=True, warmup=3):
+        """切換到 width x height（預設為最高解析度）擷取單張影像
+
+        切換解析度後的前幾張影格可能仍是舊格式或曝光尚未穩定，先丟棄 warmup 張。
+        restore 為 True 時擷取後恢復原本的解析度（之後會釋放裝置時可省略）。
+        """
+        if not self.is_opened():
+            return None
+        if width is None or height is None:
+            width, height = self.max_resolution()
+        current = (int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                   int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        changed = (width, height) != current
+        if changed:
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        frame = None
+        for _ in range(warmup + 1 if changed else 1):
+            ret, image = self.capture.read()
+            if ret:
+                frame = image
+        if changed and restore:
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, current[0])
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, current[1])
+        return frame
+
+    def _interval(self):
+        # 攝影機由裝置控制節奏，realtime 時不另外等待
+        if self.pacing == 'realtime':
+            return None
+        return super()._interval()
+
+    def _grab(self):
+        return self.capture.read()
+
+
+class VideoFileSource(FrameSource):
+    """影片檔來源，realtime 時依檔案幀率播放，loop 為 True 時播完從頭開始"""
+
+    def __init__(self, path, pacing='realtime', fps=None, loop=True):
+        super().__init__(pacing, fps)
+        self.path = path
+        self.loop = loop
+        self.capture = None
+        self.frame_size = None
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.path)
+        if not self.capture.isOpened():
+            self.capture = None
+            return False
+        self.native_fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_size = (int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                           int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        return True
+
+    def is_opened(self):
+        return self.capture is not None and self.capture.isOpened()
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH and self.frame_size:
+            return self.frame_size[0]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT and self.frame_size:
+            return self.frame_size[1]
+        if prop == cv2.CAP_PROP_FPS:
+            return self.native_fps or 0
+        return 0
+
+    def describe(self):
+        return f"影片 {self.path}"
+
+    def _grab(self):
+        ret, frame = self.capture.read()
+        if not ret and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+        if not ret:
+            self.exhausted = True
+        return ret, frame
+
+
+class ImageSequenceSource(FrameSource):
+    """圖片資料夾來源，依檔名排序播放，realtime 時以 fps（預設 30）播放
+
+    圖片在第一次讀到時解碼並保留，重播時不必再次解碼。
+    """
+
+    def __init__(self, path, pacing='realtime', fps=None, loop=True):
+        super().__init__(pacing, fps)
+        self.path = path
+        self.loop = loop
+        self.native_fps = fps or 30.0
+        self.files = []
+        self._cache = {}
+        self._position = 0
+
+    def open(self):
+        if os.path.isdir(self.path):
+            files = glob.glob(os.path.join(self.path, '*'))
+        else:
+            files = glob.glob(self.path)
+        self.files = sorted(f for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+        self._position = 0
+        return bool(self.files)
+
+    def is_opened(self):
+        return bool(self.files)
+
+    def release(self):
+        self.files = []
+        self._cache = {}
+
+    def get(self, prop):
+        if prop in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT) and self.files:
+            ret, frame = self._load(0)
+            if ret:
+                return frame.shape[1] if prop == cv2.CAP_PROP_FRAME_WIDTH else frame.shape[0]
+        if prop == cv2.CAP_PROP_FPS:
+            return self.native_fps
+        return 0
+
+    def describe(self):
+        return f"圖片資料夾 {self.path}（{len(self.files)} 張）"
+
+    def _load(self, index):
+        frame = self._cache.get(index)
+        if frame is None:
+            frame = cv2.imread(self.files[index], cv2.IMREAD_COLOR)
+            if frame is None:
+                print(f"無法讀取圖片: {self.files[index]}")
+                return False, None
+            self._cache[index] = frame
+        return True, frame
+
+    def _grab(self):
+        if self._position >= len(self.files):
+            if not self.loop or not self.files:
+                self.exhausted = True
+                return False, None
+            self._position = 0
+        ret, frame = self._load(self._position)
+        self._position += 1
+        # 影格會被下游保留，不能直接交出快取中的陣列
+        return ret, frame.copy() if ret else None
+
+
+class SyntheticSource(FrameSource):
+    """合成文字頁面來源
+
+    產生一張比畫面高的書頁，每張影格往下捲動 scroll 像素，模擬攝影機在書本上移動。
+    相同的參數與 seed 會產生完全相同的影格序列，可用於重現問題與壓力測試。
+    """
+
+    def __init__(self, width=1920, height=1080, pacing='realtime', fps=None,
+                 seed=0, scroll=2, frame_count=None):
+        super().__init__(pacing, fps)
+        self.width = width
+        self.height = height
+        self.native_fps = fps or 30.0
+        self.seed = seed
+        self.scroll = scroll
+        self.frame_count = frame_count  # None 表示無限
+        self.page = None
+        # 模擬可平移的數位變焦（設定立即生效），用於測試擷取端裁剪
+        self.max_device_zoom = 4.0
+        self._device_crop = None  # 裝置視野的像素範圍 (x, y, w, h)
+
+    def open(self):
+        page = make_text_page(self.width, self.height * 2, self.seed)
+        self.page = cv2.cvtColor(page, cv2.COLOR_RGB2BGR)
+        return True
+
+    def is_opened(self):
+        return self.page is not None
+
+    def release(self):
+        self.page = None
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        if prop == cv2.CAP_PROP_FPS:
+            return self.native_fps
+        return 0
+
+    def describe(self):
+        return f"合成影像 {self.width}x{self.height}"
+
+    def supports_device_crop(self):
+        return True
+
+    def set_device_crop(self, rect):
+        """視野取整到像素，回傳的範圍與送出的影像完全一致"""
+        self._device_crop = None
+        if rect is None:
+            return None
+        zoom, center_x, center_y = zoom_field(rect, self.max_device_zoom)
+        if zoom < 1.05:
+            return None
+        x, y, w, h = zoom_rect(zoom, center_x, center_y)
+        crop = (int(round(x * self.width)), int(round(y * self.height)),
+                max(1, int(round(w * self.width))), max(1, int(round(h * self.height))))
+        self._device_crop = crop
+        return (crop[0] / self.width, crop[1] / self.height,
+                crop[2] / self.width, crop[3] / self.height)
+
+    def _grab(self):
+        if self.frame_count is not None and self._frame_index >= self.frame_count:
+            self.exhausted = True
+            return False, None
+        # 在兩倍高的頁面上來回捲動
+        span = self.height
+        offset = (self._frame_index * self.scroll) % (2 * span) if span else 0
+        if offset > span:
+            offset = 2 * span - offset
+        frame = self.page[offset:offset + self.height]
+        if self._device_crop is not None:
+            # 與攝影機的數位變焦相同：只取視野內的像素，放大回原本的影像大小
+            x, y, w, h = self._device_crop
+            return True, cv2.resize(frame[y:y + h, x:x + w], (self.width, self.height),
+                                    interpolation=cv2.INTER_LINEAR)
+        return True, frame.copy()
+
+
+def create_source(spec, pacing='realtime', fps=None):
+    """依字串建立影格來源
+
+    支援的格式：
+        camera:0                攝影機
+        file:sample.mp4         影片檔
+        images:frames/          圖片資料夾（或 glob 樣式，例如 frames/*.png）
+        synthetic:1920x1080     合成文字頁面
+    未加前綴時，數字視為攝影機編號、資料夾視為圖片資料夾，其餘視為影片檔。
+    """
+    kind, _, value = spec.partition(':')
+    if not value or kind not in ('camera', 'file', 'images', 'synthetic'):
+        # 沒有前綴（Windows 路徑中的磁碟代號也會落在這裡）
+        kind, value = None, spec
+        if spec.isdigit():
+            kind = 'camera'
+        elif spec == 'synthetic':
+            kind, value = 'synthetic', ''
+        elif os.path.isdir(spec) or any(c in spec for c in '*?['):
+            kind = 'images'
+        else:
+            kind = 'file'
+
+    if kind == 'camera':
+        return CameraSource(int(value or 0), pacing, fps)
+    if kind == 'images':
+        return ImageSequenceSource(value, pacing, fps)
+    if kind == 'synthetic':
+        width, height = 1920, 1080
+        if value:
+            width, height = (int(v) for v in value.lower().split('x'))
+        return SyntheticSource(width, height, pacing, fps)
+    return VideoFileSource(value, pacing, fps)
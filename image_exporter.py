@@ -0,0 +1,98 @@
+import cv2
+import os
+import queue
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+
+# 截圖格式對應的副檔名
+IMAGE_FORMATS = {'PNG': 'png', 'JPG': 'jpg', 'BMP': 'bmp'}
+
+
+def encode_params(image_format, png_compression=1, jpeg_quality=95):
+    """回傳 cv2.imwrite 的編碼參數
+
+    PNG 壓縮等級 0-9：等級越高檔案越小但越慢，1080p 在等級 1 與 9 的寫入時間可差數倍；
+    JPEG 品質 0-100。
+    """
+    image_format = image_format.upper()
+    if image_format == 'PNG':
+        return [cv2.IMWRITE_PNG_COMPRESSION, max(0, min(9, int(png_compression)))]
+    if image_format in ('JPG', 'JPEG'):
+        return [cv2.IMWRITE_JPEG_QUALITY, max(0, min(100, int(jpeg_quality)))]
+    return []
+
+
+class ImageExporter(QThread):
+    """截圖輸出執行緒
+
+    submit() 只把影像放進有上限的佇列，建立資料夾、色彩轉換與編碼寫檔都在
+    輸出執行緒中進行，截圖（包含連拍）不會讓畫面停頓。完成或失敗時以
+    saved / failed 信號通知介面（跨執行緒信號，不會阻塞）。
+    """
+
+    saved = pyqtSignal(str, float)  # 檔名, 轉換與寫檔耗時（秒）
+    failed = pyqtSignal(str, str)   # 檔名, 錯誤訊息
+
+    def __init__(self, queue_size=16, parent=None):
+        super().__init__(parent)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.running = False
+        self.images_saved = 0
+        self.images_dropped = 0  # 佇列已滿而未儲存
+
+    def submit(self, frame, filename, convert_code=None, params=None, copy=True):
+        """送入一張要儲存的影像（可從任何執行緒呼叫），佇列已滿時回傳 False
+
+        frame 來自會被重複使用的緩衝區（例如處理器的輸出）時 copy 必須為 True；
+        convert_code 為寫檔前的色彩轉換（cv2.imwrite 需要 BGR），None 表示不轉換。
+        """
+        if not self.running:
+            return False
+        item = (frame.copy() if copy else frame, filename, convert_code, params or [])
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.images_dropped += 1
+            return False
+        return True
+
+    def run(self):
+        """執行輸出迴圈"""
+        while self.running or not self.queue.empty():
+            try:
+                item = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            self._write(*item)
+
+    def start(self):
+        """開始輸出執行緒"""
+        self.running = True
+        super().start()
+
+    def _write(self, frame, filename, convert_code, params):
+        """轉換並寫入單張影像"""
+        start = time.perf_counter()
+        try:
+            os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+            if convert_code is not None:
+                frame = cv2.cvtColor(frame, convert_code)
+            if not cv2.imwrite(filename, frame, params):
+                raise IOError("cv2.imwrite 回傳失敗")
+        except Exception as e:
+            print(f"儲存截圖失敗: {filename}: {str(e)}")
+            self.failed.emit(filename, str(e))
+            return
+        self.images_saved += 1
+        self.saved.emit(filename, time.perf_counter() - start)
+
+    def stop(self):
+        """停止輸出，寫完佇列中剩餘的影像"""
+        self.running = False
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self.wait()
@@ -1,13 +1,52 @@
 import cv2
+import math
 import numpy as np
+import threading
+import time
+from frame_buffer import BufferRing
+import color_lut
+from overlay_cache import OverlayCache
+from filters import HighContrastFilter, TextUpscaler
+from frame_profiler import FrameProfiler
+from image_pyramid import ImagePyramid
+from adaptive_threshold import AdaptiveThreshold, THRESHOLD_MODES
+from temporal import TemporalDenoiser, Stabilizer
+import orientation
+
+# 支援的模式
+COLOR_MODES = ['normal', 'white_on_black', 'black_on_white', 'yellow_on_black',
+               'yellow_on_blue', 'green_on_black', 'blue_on_yellow', 'custom_contrast']
+FILTER_MODES = ['normal', 'high_contrast', 'grayscale', 'inverse']
+MASK_MODES = ['horizontal', 'vertical', 'rectangle', 'ellipse']
+GUIDE_MODES = ['cross', 'grid', 'center', 'reading_line']
+# 放大時的插值方式：auto 依倍率選擇，text 為文字放大（見 filters.TextUpscaler）
+INTERPOLATION_MODES = ['auto', 'linear', 'cubic', 'text']
+# 輸出範圍的最小邊長（顯示元件可縮到 1 像素，過小的輸出沒有意義且會讓輔助線無法計算）
+MIN_OUTPUT_SIZE = 16
+# 局部門檻模式下亮度改為平移門檻：亮度每增加 1，門檻降低固定門檻的 1/100
+# （+100 時降低 128，幾乎所有像素成為前景；-100 時升高 128，幾乎全為背景）
+BRIGHTNESS_THRESHOLD_STEP = color_lut.THRESHOLD / 100
 
 class ImageProcessor:
     def __init__(self):
-        self.zoom_factors = [1.0, 1.5, 2.0, 3.0, 4.0]
+        # 放大 / 縮小按鈕使用的倍率，滾輪與觸控縮放可使用範圍內的任意倍率
+        self.zoom_factors = [1.0, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0, 12.0, 16.0]
+        self.min_zoom = 1.0
+        self.max_zoom = 16.0
         self.current_zoom_index = 0
         self.zoom_factor = self.zoom_factors[self.current_zoom_index]
-        self.pan_x = 0
+        # 縮放動畫：依經過時間（而非影格數）計算倍率，每張影格的處理成本不變
+        self.zoom_duration = 0.25  # 秒
+        self.target_zoom = self.zoom_factor
+        self._zoom_animation = None
+        self.pan_x = 0  # 平移量以轉向後（顯示）的座標表示
         self.pan_y = 0
+        # 影像轉向：先水平翻轉、再垂直翻轉、最後順時針旋轉
+        self.flip_horizontal = False
+        self.flip_vertical = False
+        self.rotation = 0
+        self._orientation_key = None
+        self._orientation_inverse = None
         self.color_mode = 'normal'
         self.filter_mode = 'normal'
         self.show_mask = False
@@ -21,92 +60,798 @@ class ImageProcessor:
         self.last_frame = None
         self.last_processed_frame = None
         self.brightness = 0  # 亮度調整值，範圍 -100 到 100
+        self.contrast_colors = ((255, 255, 255), (0, 0, 0))  # 自訂對比色（前景, 背景）
+        # 雙色對比模式的二值化方式（THRESHOLD_MODES），非 global 時以局部門檻處理不均勻的光線
+        self.threshold_mode = 'global'
+        self.adaptive_threshold = AdaptiveThreshold()
+        # 輸入影格的通道順序：'RGB' 或 'BGR'（擷取端保留 BGR 時省去一次整張色彩轉換）
+        # 顏色設定（對比色、輔助線顏色）一律以 RGB 指定，由處理器依通道順序轉換
+        self.channel_order = 'RGB'
+        # 亮度與顏色模式的查找表快取，只在參數變更時重建
+        self._lut_key = None
+        self._lut = (None, None)
+        # 處理執行緒與 GUI 執行緒可能同時呼叫 process_frame
+        self.lock = threading.RLock()
+        # 預先配置的輸出緩衝區，避免每張影格配置與複製
+        self.buffers = BufferRing()
+        self.copies = 0
+        # True：先裁剪 ROI 並在 ROI 解析度下處理；False：舊的處理順序（用於逐像素比對）
+        self.crop_first = True
+        self.output_size = None  # 輸出範圍 (寬, 高)，保持長寬比；None 表示與輸入影格相同
+        # 縮放到輸出大小時使用的插值方式
+        self.upscale_interpolation = cv2.INTER_LINEAR
+        self.downscale_interpolation = cv2.INTER_AREA
+        # 解析度自適應：輸出比 ROI 小時先縮小再處理；放大倍率達 cubic_threshold 時改用 INTER_CUBIC
+        self.adaptive_resolution = True
+        self.cubic_threshold = 2.0
+        self.interpolation_mode = 'auto'
+        self.text_upscaler = TextUpscaler()
+        # 時間處理（只用於即時影像的 crop-first 流程）：ROI 的遞迴降噪，以及以整體位移抵銷震動
+        self.denoise = False
+        self.stabilize = False
+        self.denoiser = TemporalDenoiser()
+        self.stabilizer = Stabilizer()
+        self._stabilization = (0.0, 0.0)  # 加在 ROI 位置上的位移（顯示座標）
+        # 擷取端裁剪：輸入影格的視野（frame_buffer.FrameField），None 表示完整畫面。
+        # 平移量與 ROI 以完整畫面的擷取解析度計算後再換算到影格中，
+        # 擷取端是否裁剪、裁剪多少都不影響畫面與平移速度
+        self.field = None
+        self._live_field = None
+        # 遮罩與輔助線圖層快取
+        self.overlays = OverlayCache()
+        # 高對比濾鏡（保留 CLAHE 物件，不再每張影格重建）
+        self.high_contrast = HighContrastFilter()
+        # 逐階段計時（預設停用）
+        self.profiler = FrameProfiler()
+        # 參數已變更但尚未重新處理；由處理執行緒合併後重新處理，設定方法本身不處理影像
+        self.dirty = False
+        # 凍結畫面：凍結影像的金字塔，以及凍結前最後一張即時影格（解除凍結時換算平移量）
+        self.still = None
+        self._live_frame = None
+        # 凍結影像的層級套用查找表與濾鏡後的結果：(參數, 層級, 結果)；只平移或縮放時直接沿用
+        self._still_filtered = (None, None, None)
+        self._still_pending = (None, None)
+        self._roi_prefiltered = False
+        
+    def mark_dirty(self):
+        """標記處理參數已變更"""
+        self.dirty = True
+        
+    def needs_render(self):
+        """靜止畫面是否需要重新處理（參數變更或縮放動畫進行中）"""
+        return self.dirty or self._zoom_animation is not None
+        
+    def render_still(self):
+        """以目前參數重新處理最後一張影格，沒有影格時回傳 None"""
+        with self.lock:
+            if self.last_frame is None:
+                return None
+            return self._process_frame(self.last_frame, self.field)
         
-    def process_frame(self, frame):
-        """處理影像"""
+    def process_frame(self, frame, field=None):
+        """處理影像，field 為影格在完整畫面中的視野（見 FramePacket）"""
         if frame is None:
             return None
+        with self.lock:
+            return self._process_frame(frame, field)
             
-        self.last_frame = frame.copy()
-        processed_frame = frame.copy()
+    def _process_frame(self, frame, field=None):
+        """處理影像（呼叫端需持有 lock）
+
+        輸入影格只保留參考不複製；所有處理結果寫入 self.buffers 環中預先配置的
+        緩衝區，OpenCV 函式一律以 dst= 指定輸出位置。
+        """
+        if self.still is not None:
+            # 凍結中一律處理凍結的影像（忽略仍在途中的擷取影格）
+            frame = self.still.base
+        else:
+            if self.last_frame is not None and (self.last_frame.shape[:2] != frame.shape[:2] or
+                                                field != self.field):
+                # 擷取解析度或視野改變（例如解析度自適應、擷取端裁剪）：
+                # 平移量換算到新的完整畫面大小，畫面位置不變
+                self._rescale_pan(self._full_shape(self.last_frame.shape, self.field),
+                                  self._full_shape(frame.shape, field))
+            if field != self.field:
+                # 視野改變時影格內容整體移動，不是震動
+                self.stabilizer.reset()
+            self.field = field
+        self.last_frame = frame
+        self.dirty = False
+        self.update_zoom()
+        if self.stabilize and self.still is None and self.crop_first:
+            with self.profiler.stage('stabilize'):
+                self._update_stabilization(frame)
+        else:
+            self.stabilizer.reset()
+            self._stabilization = (0.0, 0.0)
+        with self.profiler.stage('process'):
+            if self.still is not None:
+                processed_frame = self._process_still()
+            elif self.crop_first:
+                processed_frame = self._process_crop_first(frame)
+            else:
+                processed_frame = self._process_full_frame(frame)
+        self.last_processed_frame = processed_frame
+        return processed_frame
         
-        # 套用亮度調整
-        processed_frame = self.apply_brightness(processed_frame)
+    def _update_stabilization(self, frame):
+        """估計畫面震動，換算成顯示座標後作為 ROI 的額外位移
+
+        使用者的平移量（pan_x / pan_y）不變，ROI 跟著畫面內容移動，放大後的畫面保持穩定。
+        """
+        dx, dy = self.stabilizer.update(frame, self._gray_code())
+        height, width = frame.shape[:2]
+        rotation, mirror = self._orientation()
+        linear = orientation.orientation_matrix(width, height, rotation, mirror)[:2, :2]
+        view_x, view_y = linear @ (dx, dy)
+        if self.field is not None:
+            # 位移以影格像素量測，ROI 位置以擷取像素計算
+            density = self._field_density()
+            view_x, view_y = view_x / density, view_y / density
+        self._stabilization = (float(view_x), float(view_y))
         
-        # 套用縮放和平移
-        if self.zoom_factor != 1.0 or self.pan_x != 0 or self.pan_y != 0:
-            height, width = frame.shape[:2]
+    def _view_key(self, shape):
+        """描述目前檢視範圍的鍵值，跨影格累積的統計（門檻圖、降噪）在鍵值改變時重新開始"""
+        return (self.zoom_factor, self.pan_x, self.pan_y, self.rotation, self.flip_horizontal,
+                self.flip_vertical, self.still is not None, self.field, shape)
+        
+    def _full_shape(self, shape, field):
+        """視野為 field 的影格所對應的完整畫面大小 (高, 寬)（平移量的座標範圍）"""
+        if field is None:
+            return shape[:2]
+        return field.full_height, field.full_width
+        
+    def _view_field(self):
+        """目前影格的視野換算到顯示座標（0-1 的 (x, y, w, h)），完整畫面時回傳 None"""
+        if self.field is None:
+            return None
+        rotation, mirror = self._orientation()
+        matrix = orientation.orientation_matrix(1, 1, rotation, mirror)
+        return orientation.map_rect_float(matrix, *self.field[:4])
+        
+    def _field_density(self):
+        """輸入影格在每個擷取像素上的像素數（數位變焦時大於 1，軟體裁剪時為 1）"""
+        field = self.field
+        return round(self.last_frame.shape[1] / (field.width * field.full_width), 9)
+        
+    def _output_size(self, shape, rotation):
+        """依完整畫面的長寬比計算輸出大小（擷取端裁剪的影格取整到像素，長寬比會略有差異）"""
+        height, width = self._full_shape(shape, self.field)
+        return self.get_output_size(*orientation.oriented_size(width, height, rotation))
+        
+    def _frame_zoom(self):
+        """ROI 相對於輸入影格的倍率（擷取端已裁剪時小於 zoom_factor）"""
+        field = self._view_field()
+        if field is None:
+            return self.zoom_factor
+        return self.zoom_factor * field[2]
+        
+    def _denoise_roi(self, roi):
+        """在查找表與濾鏡之前對 ROI 套用時間降噪（凍結畫面不需要）"""
+        if not self.denoise or self.still is not None:
+            return roi
+        with self.profiler.stage('denoise'):
+            return self.denoiser.apply(roi, self._gray_code(), self._view_key(roi.shape))
+        
+    def _process_still(self):
+        """處理凍結畫面：依輸出所需的解析度選擇金字塔層級，平移量換算到該層級的座標"""
+        base = self.still.base
+        rotation = self._orientation()[0]
+        view_width, view_height = orientation.oriented_size(base.shape[1], base.shape[0], rotation)
+        out_width, _ = self._output_size(base.shape, rotation)
+        level = self.still.select(out_width * self._frame_zoom() / view_width)
+        if not self.crop_first:
+            process = self._process_full_frame
+        else:
+            # 整個層級先套用查找表與濾鏡（參數不變時沿用），之後每次只需裁剪與縮放
+            process = self._process_crop_first
+            filtered = self._filtered_still_level(level)
+            if filtered is not None:
+                level = filtered
+                self._roi_prefiltered = True
+        level_width, level_height = orientation.oriented_size(level.shape[1], level.shape[0], rotation)
+        scale_x, scale_y = level_width / view_width, level_height / view_height
+        self.pan_x *= scale_x
+        self.pan_y *= scale_y
+        try:
+            return process(level)
+        finally:
+            self._roi_prefiltered = False
+            self.pan_x /= scale_x
+            self.pan_y /= scale_y
             
-            # 計算ROI大小和位置
-            roi_width = int(width / self.zoom_factor)
-            roi_height = int(height / self.zoom_factor)
+    def _filtered_still_level(self, level):
+        """凍結影像層級套用查找表與濾鏡後的結果，參數未變更時使用快取
+
+        參數剛變更（例如拖曳亮度滑桿）時回傳 None，只處理 ROI；
+        同一組參數第二次處理（例如之後的平移）才處理整個層級並快取。
+        """
+        key = (self.brightness, self.color_mode, self.contrast_colors, self.channel_order,
+               self.threshold_mode, self.filter_mode, self.high_contrast.clip_limit,
+               self.high_contrast.tile_grid_size)
+        cached_key, cached_level, filtered = self._still_filtered
+        if cached_key != key or cached_level is not level:
+            pending_key, pending_level = self._still_pending
+            if pending_key != key or pending_level is not level:
+                self._still_pending = (key, level)
+                return None
+            with self.profiler.stage('still_filter'):
+                filtered = self._process_roi(level)
+                if filtered is not level:
+                    # _process_roi 寫入共用的暫存緩衝區，快取需保留自己的副本
+                    filtered = filtered.copy()
+            self._still_filtered = (key, level, filtered)
+        return filtered
             
-            # 計算最大平移範圍
-            max_pan_x = int(width * (1 - 1/self.zoom_factor) / 2)
-            max_pan_y = int(height * (1 - 1/self.zoom_factor) / 2)
+    def freeze(self, image=None):
+        """凍結畫面，image 預設為最後一張影格；已凍結時以 image 取代（例如高解析度靜態影像）
+
+        凍結的影像預先建立影像金字塔，縮放、平移與濾鏡只處理所需解析度的層級。
+        回傳是否成功（尚無影格時無法凍結）。
+        """
+        with self.lock:
+            # 最後一張影格沿用它的視野，另外擷取的靜態影像為完整畫面
+            field = self.field if image is None else None
+            if image is None:
+                image = self.last_frame
+            if image is None:
+                return False
+            if self.still is None:
+                self._live_frame = self.last_frame
+                self._live_field = self.field
+            if self.last_frame is not None:
+                self._rescale_pan(self._full_shape(self.last_frame.shape, self.field),
+                                  self._full_shape(image.shape, field))
+            self.field = field
+            self.still = ImagePyramid(image)
+            self._still_filtered = (None, None, None)
+            self._still_pending = (None, None)
+            self.last_frame = image
+            self.mark_dirty()
+        return True
+        
+    def unfreeze(self):
+        """解除凍結，回到即時影像"""
+        with self.lock:
+            if self.still is None:
+                return
+            live_frame = self._live_frame
+            if live_frame is not None:
+                self._rescale_pan(self._full_shape(self.still.base.shape, self.field),
+                                  self._full_shape(live_frame.shape, self._live_field))
+            self.field = self._live_field
+            self.still = None
+            self._still_filtered = (None, None, None)
+            self._still_pending = (None, None)
+            self._live_frame = None
+            self.last_frame = live_frame
+            self.mark_dirty()
             
-            # 限制平移範圍
-            self.pan_x = max(-max_pan_x, min(max_pan_x, self.pan_x))
-            self.pan_y = max(-max_pan_y, min(max_pan_y, self.pan_y))
+    def is_frozen(self):
+        """是否為凍結畫面"""
+        return self.still is not None
+        
+    def _rescale_pan(self, old_shape, new_shape):
+        """影像大小改變時（例如換成高解析度靜態影像）依比例換算平移量，畫面位置不變"""
+        if old_shape[:2] == new_shape[:2]:
+            return
+        rotation = self._orientation()[0]
+        old_width, old_height = orientation.oriented_size(old_shape[1], old_shape[0], rotation)
+        new_width, new_height = orientation.oriented_size(new_shape[1], new_shape[0], rotation)
+        scale_x, scale_y = new_width / old_width, new_height / old_height
+        self.pan_x *= scale_x
+        self.pan_y *= scale_y
+        # 進行中的縮放動畫以舊的座標記錄錨點與平移量，一併換算
+        animation = self._zoom_animation
+        if animation is not None:
+            if animation['anchor'] is not None:
+                anchor, point_x, point_y = animation['anchor']
+                animation['anchor'] = (anchor, point_x * scale_x, point_y * scale_y)
+            for key in ('start_pan', 'end_pan'):
+                if animation[key] is not None:
+                    animation[key] = (animation[key][0] * scale_x, animation[key][1] * scale_y)
+        
+    def compute_roi(self, width, height):
+        """依縮放與平移計算 ROI，回傳 (x, y, w, h)，並限制平移範圍"""
+        field = self._view_field()
+        if field is not None:
+            roi_x, roi_y, roi_width, roi_height = self._field_roi(width, height, field, self._roi_int)
+            return int(round(roi_x)), int(round(roi_y)), int(round(roi_width)), int(round(roi_height))
+        return self._roi_int(width, height)
+        
+    def _roi_int(self, width, height):
+        """width x height 的（完整）畫面中的整數 ROI，並限制平移範圍"""
+        if self.zoom_factor == 1.0 and self.pan_x == 0 and self.pan_y == 0:
+            return 0, 0, width, height
             
-            # 計算ROI的起始點
-            roi_x = int((width - roi_width) / 2 - self.pan_x)
-            roi_y = int((height - roi_height) / 2 - self.pan_y)
+        # 計算ROI大小和位置
+        roi_width = int(width / self.zoom_factor)
+        roi_height = int(height / self.zoom_factor)
+        
+        # 計算最大平移範圍
+        max_pan_x = int(width * (1 - 1/self.zoom_factor) / 2)
+        max_pan_y = int(height * (1 - 1/self.zoom_factor) / 2)
+        
+        # 限制平移範圍
+        self.pan_x = max(-max_pan_x, min(max_pan_x, self.pan_x))
+        self.pan_y = max(-max_pan_y, min(max_pan_y, self.pan_y))
+        
+        # 計算ROI的起始點（畫面穩定的位移只影響 ROI，不改變平移量）
+        shift_x, shift_y = self._stabilization
+        roi_x = int((width - roi_width) / 2 - self.pan_x + shift_x)
+        roi_y = int((height - roi_height) / 2 - self.pan_y + shift_y)
+        
+        # 確保ROI在影像範圍內
+        roi_x = max(0, min(width - roi_width, roi_x))
+        roi_y = max(0, min(height - roi_height, roi_y))
+        return roi_x, roi_y, roi_width, roi_height
+        
+    def compute_roi_float(self, width, height):
+        """計算次像素精度的 ROI，回傳浮點數 (x, y, w, h)，並限制平移範圍"""
+        field = self._view_field()
+        if field is not None:
+            return self._field_roi(width, height, field, self._roi_float)
+        return self._roi_float(width, height)
+        
+    def _field_roi(self, width, height, field, compute):
+        """擷取端已裁剪時（field 為顯示座標的視野）的 ROI
+
+        以 compute（_roi_int 或 _roi_float）在完整畫面（擷取解析度，凍結畫面的金字塔
+        層級依比例縮小）中計算，再依像素密度換算到影格，並限制在影格內：視野尚未
+        跟上時（例如快速平移、裝置還在變焦）暫時停在視野邊緣。凍結畫面不會再有其他
+        視野，平移量也一併限制，避免往外拖曳後要拖回同樣的距離畫面才移動。
+        完整畫面大小與視野位置先捨去浮點誤差，軟體裁剪（視野對齊像素）的結果
+        與未裁剪時完全相同。
+        """
+        field_x, field_y, field_width, field_height = field
+        density = self._field_density()
+        full_width = round(width / field_width / density, 6)
+        full_height = round(height / field_height / density, 6)
+        if full_width.is_integer() and full_height.is_integer():
+            full_width, full_height = int(full_width), int(full_height)
+        roi_x, roi_y, roi_width, roi_height = compute(full_width, full_height)
+        roi_x = (roi_x - round(field_x * full_width, 6)) * density
+        roi_y = (roi_y - round(field_y * full_height, 6)) * density
+        roi_width, roi_height = min(width, roi_width * density), min(height, roi_height * density)
+        clamped_x = max(0.0, min(width - roi_width, roi_x))
+        clamped_y = max(0.0, min(height - roi_height, roi_y))
+        if self.still is not None:
+            self.pan_x += (roi_x - clamped_x) / density
+            self.pan_y += (roi_y - clamped_y) / density
+        return clamped_x, clamped_y, roi_width, roi_height
+        
+    def _roi_float(self, width, height):
+        """width x height 的（完整）畫面中的浮點數 ROI，並限制平移範圍"""
+        roi_width = width / self.zoom_factor
+        roi_height = height / self.zoom_factor
+        max_pan_x = (width - roi_width) / 2
+        max_pan_y = (height - roi_height) / 2
+        self.pan_x = max(-max_pan_x, min(max_pan_x, self.pan_x))
+        self.pan_y = max(-max_pan_y, min(max_pan_y, self.pan_y))
+        shift_x, shift_y = self._stabilization
+        roi_x = max(0.0, min(2 * max_pan_x, max_pan_x - self.pan_x + shift_x))
+        roi_y = max(0.0, min(2 * max_pan_y, max_pan_y - self.pan_y + shift_y))
+        return (roi_x, roi_y, roi_width, roi_height)
+        
+    def configure(self, **params):
+        """一次更新多個處理參數
+
+        在 lock 內套用，處理執行緒不會處理到只更新一半的設定。
+        """
+        with self.lock:
+            for name, value in params.items():
+                if not hasattr(self, name):
+                    raise AttributeError(f"未知的處理參數: {name}")
+                setattr(self, name, value)
+            self.mark_dirty()
             
-            # 確保ROI在影像範圍內
-            roi_x = max(0, min(width - roi_width, roi_x))
-            roi_y = max(0, min(height - roi_height, roi_y))
+    def set_output_size(self, width, height):
+        """設置輸出範圍（例如顯示元件大小），輸出會保持影像長寬比放入此範圍內
+
+        None 表示輸出與輸入影格相同大小。
+        """
+        if width is None or height is None:
+            self.output_size = None
+        else:
+            self.output_size = (max(MIN_OUTPUT_SIZE, int(width)), max(MIN_OUTPUT_SIZE, int(height)))
+        self.mark_dirty()
             
-            # 裁剪ROI並縮放回原始大小
-            roi = frame[roi_y:roi_y+roi_height, roi_x:roi_x+roi_width]
-            processed_frame = cv2.resize(roi, (width, height), interpolation=cv2.INTER_LINEAR)
+    def required_source_size(self):
+        """以目前輸出大小與（目標）縮放倍率顯示時，不需放大所需的原始影像大小 (寬, 高)
+
+        尚無影格時回傳 None。用於決定擷取解析度：輸出只需要較少像素時可降低擷取解析度。
+        擷取端已裁剪時為輸入影格（裁剪後）的大小，軟體裁剪時由擷取端換算回擷取解析度。
+        """
+        if self.last_frame is None:
+            return None
+        height, width = self.last_frame.shape[:2]
+        rotation = self._orientation()[0]
+        view_width, view_height = orientation.oriented_size(width, height, rotation)
+        out_width, out_height = self._output_size(self.last_frame.shape, rotation)
+        zoom = max(self.zoom_factor, self.target_zoom)
+        field = self._view_field()
+        if field is not None:
+            zoom *= field[2]
+        need_width, need_height = math.ceil(out_width * zoom), math.ceil(out_height * zoom)
+        if rotation in (90, 270):
+            need_width, need_height = need_height, need_width
+        return need_width, need_height
+        
+    def get_output_size(self, width, height):
+        """計算 width x height 影像在輸出範圍內保持長寬比的大小"""
+        if self.output_size is None:
+            return width, height
+        box_width, box_height = self.output_size
+        scale = min(box_width / width, box_height / height)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+        
+    def _orientation(self):
+        """目前的轉向，回傳 (旋轉角度, 是否水平翻轉)"""
+        return orientation.normalize(self.flip_horizontal, self.flip_vertical, self.rotation)
+        
+    def _view_to_source(self, width, height, rotation, mirror):
+        """顯示座標到原始影像座標的仿射矩陣（依影像大小與轉向快取）"""
+        key = (width, height, rotation, mirror)
+        if key != self._orientation_key:
+            matrix = orientation.orientation_matrix(width, height, rotation, mirror)
+            self._orientation_inverse = np.linalg.inv(matrix)
+            self._orientation_key = key
+        return self._orientation_inverse
+        
+    def _process_crop_first(self, frame):
+        """先裁剪 ROI，在 ROI 解析度下處理，再一次縮放到輸出大小
+
+        ROI 在轉向後的座標中計算，再對應回原始影像裁剪。輸出比 ROI 大（放大）時
+        ROI 保有次像素精度（見 _process_subpixel），連續縮放與動畫時畫面不會因
+        整數取整而跳動；輸出比 ROI 小（縮小顯示）時使用整數 ROI，解析度自適應模式下
+        先縮小到輸出大小再處理（見 _decimate），否則處理後以 INTER_AREA 縮放。
+        翻轉與旋轉只套用在裁剪後的 ROI 上，不處理整張影像。
+        """
+        height, width = frame.shape[:2]
+        rotation, mirror = self._orientation()
+        view_width, view_height = orientation.oriented_size(width, height, rotation)
+        out_width, out_height = self._output_size(frame.shape, rotation)
+        zoom = self._frame_zoom()
+        if zoom != 1.0 and out_width > view_width / zoom:
+            return self._process_subpixel(frame, rotation, mirror, view_width, view_height,
+                                          out_width, out_height)
+        roi_x, roi_y, roi_width, roi_height = self.compute_roi(view_width, view_height)
+        
+        # 逐像素與鄰域運算都在 ROI 解析度下進行
+        if (roi_width, roi_height) == (view_width, view_height):
+            roi = frame
+        else:
+            inverse = self._view_to_source(width, height, rotation, mirror)
+            src_x, src_y, src_width, src_height = orientation.map_rect(
+                inverse, roi_x, roi_y, roi_width, roi_height)
+            roi = frame[src_y:src_y+src_height, src_x:src_x+src_width]
+        if self.adaptive_resolution and out_width < roi_width:
+            # 輸出需要的像素比 ROI 少：先縮小到輸出大小，查找表與濾鏡只處理輸出解析度
+            with self.profiler.stage('decimate'):
+                if rotation in (90, 270):
+                    roi = self._decimate(roi, out_height, out_width)
+                else:
+                    roi = self._decimate(roi, out_width, out_height)
+            roi_width, roi_height = out_width, out_height
+        if rotation or mirror:
+            with self.profiler.stage('orient'):
+                roi = orientation.apply(roi, rotation, mirror, self.buffers.scratch)
+        roi = self._denoise_roi(roi)
+        out = None
+        if (out_width, out_height) == (roi_width, roi_height) and self._roi_needs_processing():
+            # 不需縮放（例如 1 倍）：查找表與濾鏡直接寫入輸出緩衝區，不必再複製
+            out = self.buffers.acquire((out_height, out_width, frame.shape[2]))
+        processed_roi = self._process_roi(roi, out)
+        
+        # 一次縮放到輸出大小
+        if out is not None:
+            processed_frame = processed_roi
+        elif processed_roi is frame and (out_width, out_height) == (width, height):
+            processed_frame = frame
+        else:
+            with self.profiler.stage('zoom'):
+                out = self.buffers.acquire((out_height, out_width, frame.shape[2]))
+                if (out_width, out_height) == (roi_width, roi_height):
+                    np.copyto(out, processed_roi)
+                    self.copies += 1
+                else:
+                    self._resize(processed_roi, (out_width, out_height), out, out_width / roi_width)
+                processed_frame = out
             
-        # 套用顏色模式
-        if self.color_mode != 'normal':
-            processed_frame = self.apply_color_mode(processed_frame)
+        # 在輸出解析度下繪製遮罩與輔助線
+        return self._apply_overlays(processed_frame, frame)
+        
+    def select_interpolation(self, scale):
+        """依縮放比例（輸出 / 來源）選擇插值方式
+
+        縮小使用 downscale_interpolation；放大依 interpolation_mode：
+        linear / cubic 固定使用該方式（text 的 OpenCV 插值為 INTER_CUBIC）；
+        auto 在解析度自適應模式下依倍率選擇：小於 cubic_threshold 時 INTER_LINEAR
+        與 INTER_CUBIC 幾乎看不出差別，達到門檻時改用 INTER_CUBIC（成本只與輸出
+        大小有關，高倍率時 ROI 很小，整體處理時間仍與低倍率相近）。
+        """
+        if scale < 1.0:
+            return self.downscale_interpolation
+        if self.interpolation_mode == 'linear':
+            return cv2.INTER_LINEAR
+        if self.interpolation_mode in ('cubic', 'text'):
+            return cv2.INTER_CUBIC
+        if self.adaptive_resolution:
+            return cv2.INTER_CUBIC if scale >= self.cubic_threshold else cv2.INTER_LINEAR
+        return self.upscale_interpolation
+        
+    def _resize(self, image, size, dst, scale):
+        """將處理後的 ROI 縮放到 size = (寬, 高) 並寫入 dst
+
+        文字放大模式下放大改用 text_upscaler；預估超出時間預算時這張影格改用
+        INTER_LINEAR，畫面更新不會因放大品質而延遲。
+        """
+        if self.interpolation_mode == 'text' and scale > 1.0:
+            if self.text_upscaler.admit(size[0] * size[1]):
+                return self.text_upscaler.upscale(image, size, dst)
+            return cv2.resize(image, size, dst=dst, interpolation=cv2.INTER_LINEAR)
+        return cv2.resize(image, size, dst=dst, interpolation=self.select_interpolation(scale))
+        
+    def _decimate(self, image, width, height):
+        """將影像縮小到 width x height
+
+        先以整數倍 INTER_AREA 縮小（比例為整數時 OpenCV 使用快速的區塊平均），
+        剩下不到 1.5 倍的比例再以 INTER_LINEAR 處理；直接以非整數比例
+        INTER_AREA 縮小 1080p 影像的成本約高出十倍。
+        """
+        source_height, source_width = image.shape[:2]
+        factor = max(1, int(round(min(source_width / width, source_height / height))))
+        if factor > 1:
+            small_width, small_height = source_width // factor, source_height // factor
+            small = self.buffers.scratch('decimate', (small_height, small_width) + image.shape[2:])
+            cv2.resize(image[:small_height * factor, :small_width * factor],
+                       (small_width, small_height), dst=small, interpolation=cv2.INTER_AREA)
+            image = small
+        if image.shape[:2] == (height, width):
+            return image
+        resized = self.buffers.scratch('decimate_out', (height, width) + image.shape[2:])
+        cv2.resize(image, (width, height), dst=resized, interpolation=cv2.INTER_LINEAR)
+        return resized
+        
+    def _roi_needs_processing(self):
+        """ROI 是否需要套用查找表或濾鏡"""
+        return not self._roi_prefiltered and (self.get_lut()[0] is not None or
+                                              self.filter_mode != 'normal')
+        
+    def _process_roi(self, roi, dst=None):
+        """在 ROI 解析度下套用查找表與濾鏡（凍結畫面已預先處理整個層級時略過）
+
+        dst 為 None 時寫入暫存緩衝區；指定時（不需再縮放）直接寫入 dst。
+        """
+        if self._roi_prefiltered:
+            return roi
+        roi_shape = roi.shape
+        with self.profiler.stage('lut'):
+            lut_dst = self.buffers.scratch('roi_lut', roi_shape) if dst is None else dst
+            processed_roi = self.apply_intensity_lut(roi, lut_dst)
+        if self.filter_mode != 'normal':
+            with self.profiler.stage('filter'):
+                filter_dst = self.buffers.scratch('roi_filter', roi_shape) if dst is None else dst
+                processed_roi = self.apply_filter(processed_roi, filter_dst)
+        return processed_roi
+        
+    def _process_subpixel(self, frame, rotation, mirror, view_width, view_height,
+                          out_width, out_height):
+        """次像素 ROI：處理涵蓋 ROI 的整數範圍，放大後依小數位移取出輸出範圍
+
+        整數範圍依 ROI 的倍率放大，再從中取出輸出大小的區塊；位移以輸出像素取整，
+        誤差不超過半個輸出像素（即 1/(2*倍率) 個來源像素），連續縮放時畫面平順。
+        """
+        height, width = frame.shape[:2]
+        roi_x, roi_y, roi_width, roi_height = self.compute_roi_float(view_width, view_height)
+        
+        # 涵蓋浮點 ROI 的整數範圍（顯示座標），對應回原始影像後裁剪（不複製）
+        x0, y0 = int(math.floor(roi_x)), int(math.floor(roi_y))
+        x1 = min(view_width, int(math.ceil(roi_x + roi_width)))
+        y1 = min(view_height, int(math.ceil(roi_y + roi_height)))
+        inverse = self._view_to_source(width, height, rotation, mirror)
+        src_x, src_y, src_width, src_height = orientation.map_rect(inverse, x0, y0, x1 - x0, y1 - y0)
+        roi = frame[src_y:src_y+src_height, src_x:src_x+src_width]
+        if rotation or mirror:
+            with self.profiler.stage('orient'):
+                roi = orientation.apply(roi, rotation, mirror, self.buffers.scratch)
+        processed_roi = self._process_roi(self._denoise_roi(roi))
+        
+        with self.profiler.stage('zoom'):
+            scale_x = out_width / roi_width
+            scale_y = out_height / roi_height
+            full_width = max(out_width, int(round((x1 - x0) * scale_x)))
+            full_height = max(out_height, int(round((y1 - y0) * scale_y)))
+            offset_x = min(full_width - out_width, int(round((roi_x - x0) * scale_x)))
+            offset_y = min(full_height - out_height, int(round((roi_y - y0) * scale_y)))
+            channels = frame.shape[2]
+            out = self.buffers.acquire((out_height, out_width, channels))
+            if (full_width, full_height) == (out_width, out_height):
+                # ROI 剛好落在整數像素上（例如預設倍率、未平移）：直接縮放到輸出
+                self._resize(processed_roi, (out_width, out_height), out, scale_x)
+            else:
+                enlarged = self.buffers.scratch('zoom_full', (full_height, full_width, channels))
+                self._resize(processed_roi, (full_width, full_height), enlarged, scale_x)
+                np.copyto(out, enlarged[offset_y:offset_y+out_height, offset_x:offset_x+out_width])
+                self.copies += 1
+        return self._apply_overlays(out, frame)
+        
+    def _process_full_frame(self, frame):
+        """舊的處理順序：先縮放回原始大小，再對整張影像套用所有處理"""
+        rotation, mirror = self._orientation()
+        if rotation or mirror:
+            with self.profiler.stage('orient'):
+                frame = orientation.apply(frame, rotation, mirror, self.buffers.scratch)
+        height, width = frame.shape[:2]
+        out = self.buffers.acquire(frame.shape)
+        processed_frame = frame
+        
+        # 套用縮放和平移
+        roi_x, roi_y, roi_width, roi_height = self.compute_roi(width, height)
+        if (roi_width, roi_height) != (width, height):
+            # 裁剪ROI（只是檢視，不複製）並縮放回原始大小
+            roi = frame[roi_y:roi_y+roi_height, roi_x:roi_x+roi_width]
+            with self.profiler.stage('zoom'):
+                processed_frame = cv2.resize(roi, (width, height), dst=out,
+                                             interpolation=cv2.INTER_LINEAR)
+        
+        # 以單一查找表同時套用亮度調整與顏色模式
+        with self.profiler.stage('lut'):
+            processed_frame = self.apply_intensity_lut(processed_frame, out)
             
         # 套用濾鏡
         if self.filter_mode != 'normal':
-            processed_frame = self.apply_filter(processed_frame)
+            with self.profiler.stage('filter'):
+                processed_frame = self.apply_filter(processed_frame, out)
+            
+        return self._apply_overlays(processed_frame, frame, out)
+        
+    def _apply_overlays(self, processed_frame, frame, out=None):
+        """套用遮罩與輔助線（不會修改呼叫端傳入的影格）"""
+        owned = processed_frame is not frame
+        if (self.show_mask or self.show_guide_line) and not owned and out is None:
+            out = self.buffers.acquire(frame.shape)
             
         # 套用遮罩
         if self.show_mask:
-            processed_frame = self.apply_mask(processed_frame)
+            with self.profiler.stage('mask'):
+                processed_frame = self.apply_mask(processed_frame,
+                                                  processed_frame if owned else out)
+            owned = True
             
-        # 套用輔助線
+        # 套用輔助線（直接畫在輸出緩衝區上）
         if self.show_guide_line:
-            processed_frame = self.apply_guide_line(processed_frame)
-            
-        self.last_processed_frame = processed_frame.copy()
+            if not owned:
+                np.copyto(out, frame)
+                self.copies += 1
+                processed_frame = out
+            with self.profiler.stage('guide'):
+                processed_frame = self.apply_guide_line(processed_frame)
         return processed_frame
         
+    def get_buffer_stats(self):
+        """回傳緩衝區配置與複製次數"""
+        return {
+            'allocations': self.buffers.allocations,
+            'reuses': self.buffers.reuses,
+            'copies': self.copies,
+        }
+        
+    def set_zoom(self, factor, animate=True, anchor=None):
+        """設置縮放倍率（min_zoom 到 max_zoom 之間的任意值）
+
+        animate 為 True 時在 zoom_duration 秒內平滑過渡；anchor 為輸出畫面上的
+        正規化座標 (x, y)，範圍 -0.5 到 0.5，縮放時該點下的影像保持不動，
+        None 表示以畫面中心縮放。
+        """
+        with self.lock:
+            self._start_zoom(factor, animate, anchor)
+        self.mark_dirty()
+        
+    def _start_zoom(self, factor, animate, anchor=None, end_pan=None):
+        """建立縮放動畫；end_pan 指定動畫結束時的平移量（與 anchor 擇一）"""
+        factor = max(self.min_zoom, min(self.max_zoom, float(factor)))
+        self.target_zoom = factor
+        self.current_zoom_index = max(
+            (i for i, z in enumerate(self.zoom_factors) if z <= factor + 1e-6), default=0)
+        anchor_point = None
+        if anchor is not None and self.last_frame is not None:
+            # 錨點在顯示座標中的位置（以目前的倍率與平移計算）
+            view_width, view_height = self._view_size()
+            anchor_point = (
+                anchor,
+                view_width / 2 - self.pan_x + anchor[0] * view_width / self.zoom_factor,
+                view_height / 2 - self.pan_y + anchor[1] * view_height / self.zoom_factor,
+            )
+        duration = self.zoom_duration if animate else 0.0
+        self._zoom_animation = {
+            'start_zoom': self.zoom_factor, 'end_zoom': factor,
+            'start_time': time.monotonic(), 'duration': duration,
+            'anchor': anchor_point, 'start_pan': (self.pan_x, self.pan_y), 'end_pan': end_pan,
+        }
+        self.update_zoom()
+        
+    def zoom_by(self, ratio, anchor=None, animate=True):
+        """以倍數調整縮放（例如滾輪、觸控縮放），以目標倍率為基準累加"""
+        self.set_zoom(self.target_zoom * ratio, animate, anchor)
+        
+    def _view_size(self):
+        """最近一張影格的完整畫面轉向後的大小（平移量的座標範圍）"""
+        height, width = self._full_shape(self.last_frame.shape, self.field)
+        return orientation.oriented_size(width, height, self._orientation()[0])
+        
+    def get_view_size(self):
+        """不縮放到輸出範圍時的輸出大小 (寬, 高)（擷取解析度轉向後），尚無影格時回傳 None"""
+        with self.lock:
+            if self.last_frame is None:
+                return None
+            return self._view_size()
+        
+    def field_request(self, margin=1.5):
+        """擷取端只需要的視野：目前 ROI 放大 margin 倍，保留平移、畫面穩定與縮放動畫的餘裕
+
+        回傳 0-1 的原始影像座標 (x, y, w, h)；倍率不到 margin、凍結中、尚無影格或
+        使用舊的處理順序時回傳 None（完整畫面）。縮放動畫中以較小的倍率計算。呼叫端需持有 lock。
+        """
+        if self.last_frame is None or self.still is not None or not self.crop_first:
+            # 舊的處理順序輸出與輸入影格同大小，裁剪後的影格會改變輸出
+            return None
+        size = margin / min(self.zoom_factor, self.target_zoom)
+        if size >= 1.0:
+            return None
+        view_width, view_height = self._view_size()
+        x = min(1.0 - size, max(0.0, 0.5 - self.pan_x / view_width - size / 2))
+        y = min(1.0 - size, max(0.0, 0.5 - self.pan_y / view_height - size / 2))
+        rotation, mirror = self._orientation()
+        inverse = np.linalg.inv(orientation.orientation_matrix(1, 1, rotation, mirror))
+        return orientation.map_rect_float(inverse, x, y, size, size)
+        
+    def update_zoom(self, now=None):
+        """依經過時間推進縮放動畫（每張影格處理前呼叫）"""
+        animation = self._zoom_animation
+        if animation is None:
+            return
+        if now is None:
+            now = time.monotonic()
+        duration = animation['duration']
+        t = 1.0 if duration <= 0 else min(1.0, (now - animation['start_time']) / duration)
+        # ease-in-out（三次）；在對數空間內插，放大與縮小的速度感一致
+        eased = 4 * t ** 3 if t < 0.5 else 1 - (-2 * t + 2) ** 3 / 2
+        start, end = math.log(animation['start_zoom']), math.log(animation['end_zoom'])
+        self.zoom_factor = math.exp(start + (end - start) * eased)
+        if t >= 1.0:
+            self.zoom_factor = animation['end_zoom']
+            
+        if animation['anchor'] is not None and self.last_frame is not None:
+            (anchor_x, anchor_y), point_x, point_y = animation['anchor']
+            view_width, view_height = self._view_size()
+            self.pan_x = view_width / 2 - (point_x - anchor_x * view_width / self.zoom_factor)
+            self.pan_y = view_height / 2 - (point_y - anchor_y * view_height / self.zoom_factor)
+        elif animation['end_pan'] is not None:
+            (start_x, start_y), (end_x, end_y) = animation['start_pan'], animation['end_pan']
+            self.pan_x = start_x + (end_x - start_x) * eased
+            self.pan_y = start_y + (end_y - start_y) * eased
+            
+        if t >= 1.0:
+            self._zoom_animation = None
+            
     def zoom_in(self):
-        """放大"""
-        if self.current_zoom_index < len(self.zoom_factors) - 1:
-            self.current_zoom_index += 1
-            self.zoom_factor = self.zoom_factors[self.current_zoom_index]
-            if self.last_frame is not None:
-                return self.process_frame(self.last_frame)
-        return None
+        """放大到下一個預設倍率"""
+        larger = [z for z in self.zoom_factors if z > self.target_zoom + 1e-6]
+        if larger:
+            self.set_zoom(larger[0])
         
     def zoom_out(self):
-        """縮小"""
-        if self.current_zoom_index > 0:
-            self.current_zoom_index -= 1
-            self.zoom_factor = self.zoom_factors[self.current_zoom_index]
-            if self.last_frame is not None:
-                return self.process_frame(self.last_frame)
-        return None
+        """縮小到上一個預設倍率"""
+        smaller = [z for z in self.zoom_factors if z < self.target_zoom - 1e-6]
+        if smaller:
+            self.set_zoom(smaller[-1])
         
     def reset_zoom(self):
-        """重置縮放"""
-        self.current_zoom_index = 0
-        self.zoom_factor = self.zoom_factors[self.current_zoom_index]
-        self.pan_x = 0
-        self.pan_y = 0
-        if self.last_frame is not None:
-            return self.process_frame(self.last_frame)
-        return None
+        """重置縮放（平移同時回到中心）"""
+        with self.lock:
+            self._start_zoom(self.min_zoom, True, end_pan=(0, 0))
+        self.mark_dirty()
         
     def move(self, dx, dy):
         """移動視野"""
@@ -115,177 +860,171 @@ class ImageProcessor:
             dx = int(dx * self.zoom_factor)
             dy = int(dy * self.zoom_factor)
             
-            # 更新平移位置
-            self.pan_x += dx
-            self.pan_y += dy
-            
-            if self.last_frame is not None:
-                return self.process_frame(self.last_frame)
-        return None
+            with self.lock:
+                # 使用者移動後，縮放動畫不再控制平移
+                if self._zoom_animation is not None:
+                    self._zoom_animation['anchor'] = None
+                    self._zoom_animation['end_pan'] = None
+                # 更新平移位置
+                self.pan_x += dx
+                self.pan_y += dy
+            self.mark_dirty()
+        
+    def set_flip(self, horizontal=None, vertical=None):
+        """設置水平 / 垂直翻轉，None 表示不變"""
+        with self.lock:
+            self._set_orientation(
+                self.flip_horizontal if horizontal is None else bool(horizontal),
+                self.flip_vertical if vertical is None else bool(vertical),
+                self.rotation)
+        self.mark_dirty()
+        
+    def set_rotation(self, angle):
+        """設置順時針旋轉角度（90 的倍數）"""
+        with self.lock:
+            self._set_orientation(self.flip_horizontal, self.flip_vertical, int(angle) % 360)
+        self.mark_dirty()
+        
+    def _set_orientation(self, flip_horizontal, flip_vertical, rotation):
+        """變更轉向，並調整平移量讓畫面中心仍是原始影像上的同一點"""
+        new_rotation, new_mirror = orientation.normalize(flip_horizontal, flip_vertical, rotation)
+        if self.last_frame is not None and (self.pan_x or self.pan_y):
+            height, width = self._full_shape(self.last_frame.shape, self.field)
+            old_rotation, old_mirror = self._orientation()
+            view_width, view_height = orientation.oriented_size(width, height, old_rotation)
+            center = np.array([view_width / 2 - self.pan_x, view_height / 2 - self.pan_y, 1.0])
+            source = self._view_to_source(width, height, old_rotation, old_mirror) @ center
+            matrix = orientation.orientation_matrix(width, height, new_rotation, new_mirror)
+            new_center = matrix @ source
+            view_width, view_height = orientation.oriented_size(width, height, new_rotation)
+            self.pan_x = int(round(view_width / 2 - new_center[0]))
+            self.pan_y = int(round(view_height / 2 - new_center[1]))
+        self.flip_horizontal = flip_horizontal
+        self.flip_vertical = flip_vertical
+        self.rotation = rotation
         
     def set_color_mode(self, mode):
         """設置顏色模式"""
         self.color_mode = mode
-        if self.last_frame is not None:
-            return self.process_frame(self.last_frame)
-        return None
-        
-    def apply_color_mode(self, frame):
-        """套用顏色模式"""
-        if self.color_mode == 'white_on_black':
-            return 255 - frame
-        elif self.color_mode == 'black_on_white':
-            return frame
-        elif self.color_mode == 'yellow_on_black':
-            gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
-            yellow = np.zeros_like(frame)
-            yellow[gray > 128] = [255, 255, 0]  # 黃色
-            return yellow
-        elif self.color_mode == 'yellow_on_blue':
-            gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
-            colored = np.zeros_like(frame)
-            colored[gray > 128] = [255, 255, 0]  # 黃色
-            colored[gray <= 128] = [0, 0, 255]  # 藍色
-            return colored
-        elif self.color_mode == 'green_on_black':
-            gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
-            green = np.zeros_like(frame)
-            green[gray > 128] = [0, 255, 0]  # 綠色
-            return green
-        elif self.color_mode == 'blue_on_yellow':
-            gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
-            colored = np.zeros_like(frame)
-            colored[gray > 128] = [0, 0, 255]  # 藍色
-            colored[gray <= 128] = [255, 255, 0]  # 黃色
-            return colored
+        self.mark_dirty()
+        
+    def set_channel_order(self, order):
+        """設置輸入影格的通道順序（'RGB' 或 'BGR'）"""
+        if order not in ('RGB', 'BGR'):
+            raise ValueError(f"未知的通道順序: {order}")
+        self.channel_order = order
+        
+    def _gray_code(self):
+        """依通道順序回傳轉灰階的 cvtColor 代碼"""
+        return cv2.COLOR_BGR2GRAY if self.channel_order == 'BGR' else cv2.COLOR_RGB2GRAY
+        
+    def _native_color(self, color):
+        """將 RGB 顏色轉為輸入影格的通道順序"""
+        return tuple(color)[::-1] if self.channel_order == 'BGR' else tuple(color)
+        
+    def _native_table(self, lut):
+        """雙色查找表依通道順序調整（表格內的顏色為 RGB）"""
+        kind, table = lut
+        if kind == 'gray' and self.channel_order == 'BGR':
+            table = np.ascontiguousarray(table[:, :, ::-1])
+        return kind, table
+        
+    def set_contrast_colors(self, foreground, background):
+        """設置自訂對比色（RGB）"""
+        self.contrast_colors = (tuple(foreground), tuple(background))
+        self.mark_dirty()
+        
+    def get_lut(self):
+        """取得亮度與顏色模式合併後的查找表，參數未變更時使用快取"""
+        key = (self.brightness, self.color_mode, self.contrast_colors, self.channel_order,
+               self.threshold_mode)
+        if key != self._lut_key:
+            lut = color_lut.build_lut(self.brightness, self.color_mode, self.contrast_colors)
+            if lut[0] == 'gray' and self.threshold_mode != 'global':
+                # 局部門檻：查找表只把二值化遮罩（0 / 255）對應到雙色，亮度改為平移門檻
+                lut = color_lut.build_lut(0, self.color_mode, self.contrast_colors)
+            self._lut = self._native_table(lut)
+            self._lut_key = key
+        return self._lut
+        
+    def set_threshold_mode(self, mode):
+        """設置雙色對比模式的二值化方式"""
+        if mode not in THRESHOLD_MODES:
+            raise ValueError(f"未知的二值化方式: {mode}")
+        self.threshold_mode = mode
+        if mode != 'global':
+            self.adaptive_threshold.mode = mode
+        self.adaptive_threshold.reset()
+        self.mark_dirty()
+        
+    def apply_intensity_lut(self, frame, dst=None):
+        """以單次 cv2.LUT 套用亮度與顏色模式"""
+        kind, table = self.get_lut()
+        if kind == 'channel':
+            return cv2.LUT(frame, table, dst=dst)
+        elif kind == 'gray':
+            gray = self.buffers.scratch('gray', frame.shape[:2])
+            cv2.cvtColor(frame, self._gray_code(), dst=gray)
+            if self.threshold_mode != 'global':
+                # 檢視範圍改變時門檻圖重新開始累積
+                key = self._view_key(frame.shape)
+                offset = -BRIGHTNESS_THRESHOLD_STEP * self.brightness
+                binary = self.buffers.scratch('binary', frame.shape[:2])
+                gray = self.adaptive_threshold.apply(gray, key, offset, dst=binary)
+            colored = cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB, dst=dst)
+            return cv2.LUT(colored, table, dst=colored)
         return frame
         
     def set_filter_mode(self, mode):
         """設置濾鏡模式"""
         self.filter_mode = mode
-        if self.last_frame is not None:
-            return self.process_frame(self.last_frame)
-        return None
+        self.mark_dirty()
         
-    def apply_filter(self, frame):
+    def apply_filter(self, frame, dst=None):
         """套用濾鏡"""
         if self.filter_mode == 'high_contrast':
-            # 轉換到 LAB 色彩空間
-            lab = cv2.cvtColor(frame, cv2.COLOR_RGB2LAB)
-            # 分離通道
-            l, a, b = cv2.split(lab)
-            # 對亮度通道進行 CLAHE（限制對比度自適應直方圖均衡化）
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8,8))
-            cl = clahe.apply(l)
-            # 合併通道
-            enhanced_lab = cv2.merge((cl, a, b))
-            # 轉回 RGB
-            enhanced = cv2.cvtColor(enhanced_lab, cv2.COLOR_LAB2RGB)
-            # 增加銳利度
-            kernel = np.array([[-1,-1,-1],
-                             [-1, 9,-1],
-                             [-1,-1,-1]])
-            sharpened = cv2.filter2D(enhanced, -1, kernel)
-            return sharpened
+            return self.high_contrast.apply(frame, dst, to_gray=self._gray_code())
         elif self.filter_mode == 'grayscale':
-            gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
-            return cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
+            gray = self.buffers.scratch('gray', frame.shape[:2])
+            cv2.cvtColor(frame, self._gray_code(), dst=gray)
+            return cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB, dst=dst)
         elif self.filter_mode == 'inverse':
-            return 255 - frame
+            return cv2.bitwise_not(frame, dst=dst)
         return frame
         
+    def set_high_contrast_params(self, clip_limit=None, tile_grid_size=None):
+        """設置高對比濾鏡的 CLAHE 參數"""
+        self.high_contrast.configure(clip_limit, tile_grid_size)
+        self.mark_dirty()
+        
     def toggle_mask(self, show):
         """切換遮罩顯示"""
         self.show_mask = show
-        if self.last_frame is not None:
-            return self.process_frame(self.last_frame)
-        return None
+        self.mark_dirty()
         
-    def apply_mask(self, frame):
-        """套用遮罩"""
-        height, width = frame.shape[:2]
-        mask = np.zeros((height, width), dtype=np.uint8)
-        
-        if self.mask_mode == 'horizontal':
-            mask_height = int(height * self.mask_size / 100)
-            y1 = (height - mask_height) // 2
-            y2 = y1 + mask_height
-            mask[y1:y2, :] = 255
-        elif self.mask_mode == 'vertical':
-            mask_width = int(width * self.mask_size / 100)
-            x1 = (width - mask_width) // 2
-            x2 = x1 + mask_width
-            mask[:, x1:x2] = 255
-        elif self.mask_mode == 'rectangle':
-            mask_height = int(height * self.mask_size / 100)
-            mask_width = int(width * self.mask_size / 100)
-            y1 = (height - mask_height) // 2
-            y2 = y1 + mask_height
-            x1 = (width - mask_width) // 2
-            x2 = x1 + mask_width
-            mask[y1:y2, x1:x2] = 255
-        elif self.mask_mode == 'ellipse':
-            center = (width // 2, height // 2)
-            axes = (int(width * self.mask_size / 200), int(height * self.mask_size / 200))
-            cv2.ellipse(mask, center, axes, 0, 0, 360, 255, -1)
-            
-        # 創建半透明遮罩
-        alpha = self.mask_opacity / 100
-        mask_rgb = cv2.cvtColor(mask, cv2.COLOR_GRAY2RGB)
-        return cv2.addWeighted(frame, 1, mask_rgb, alpha, 0)
+    def apply_mask(self, frame, dst=None):
+        """套用遮罩（只處理遮罩覆蓋的區域）"""
+        if dst is None:
+            dst = frame.copy()
+        elif dst is not frame:
+            np.copyto(dst, frame)
+            self.copies += 1
+        layer = self.overlays.mask_layer(self.mask_mode, self.mask_size,
+                                         self.mask_opacity, dst.shape)
+        return layer.apply(dst)
         
     def toggle_guide_line(self, show):
         """切換輔助線顯示"""
         self.show_guide_line = show
-        if self.last_frame is not None:
-            return self.process_frame(self.last_frame)
-        return None
+        self.mark_dirty()
         
     def apply_guide_line(self, frame):
-        """套用輔助線"""
-        height, width = frame.shape[:2]
-        result = frame.copy()
-        
-        if self.guide_mode == 'cross':
-            # 繪製十字線
-            cv2.line(result, (width//2, 0), (width//2, height), self.guide_color, self.guide_thickness)
-            cv2.line(result, (0, height//2), (width, height//2), self.guide_color, self.guide_thickness)
-        elif self.guide_mode == 'grid':
-            # 繪製網格
-            for x in range(width//3, width, width//3):
-                cv2.line(result, (x, 0), (x, height), self.guide_color, self.guide_thickness)
-            for y in range(height//3, height, height//3):
-                cv2.line(result, (0, y), (width, y), self.guide_color, self.guide_thickness)
-        elif self.guide_mode == 'center':
-            # 繪製中心點
-            center = (width//2, height//2)
-            size = 20
-            cv2.line(result, (center[0]-size, center[1]), (center[0]+size, center[1]), 
-                    self.guide_color, self.guide_thickness)
-            cv2.line(result, (center[0], center[1]-size), (center[0], center[1]+size), 
-                    self.guide_color, self.guide_thickness)
-        elif self.guide_mode == 'reading_line':
-            # 繪製閱讀線
-            y = height//2
-            cv2.line(result, (0, y), (width, y), self.guide_color, self.guide_thickness)
-            
-        return result 
+        """套用輔助線（直接畫在傳入的影像上）"""
+        layer = self.overlays.guide_layer(self.guide_mode, self._native_color(self.guide_color),
+                                          self.guide_thickness, frame.shape)
+        return layer.apply(frame)
         
     def set_brightness(self, value):
         """設置亮度"""
         self.brightness = max(-100, min(100, value))
-        if self.last_frame is not None:
-            return self.process_frame(self.last_frame)
-        return None
-        
-    def apply_brightness(self, frame):
-        """套用亮度調整"""
-        if self.brightness != 0:
-            if self.brightness > 0:
-                alpha = 1.0
-                beta = self.brightness * 2.55  # 將 0-100 映射到 0-255
-            else:
-                alpha = 1.0 + (self.brightness / 100.0)  # 降低亮度時調整對比度
-                beta = 0
-            return cv2.convertScaleAbs(frame, alpha=alpha, beta=beta)
-        return frame 
\ No newline at end of file
+        self.mark_dirty()
\ No newline at end of file
@@ -0,0 +1,31 @@
+import cv2
+
+
+class ImagePyramid:
+    """凍結畫面用的影像金字塔
+
+    以 cv2.pyrDown 預先建立每層縮小一半的影像，直到短邊小於 min_size。
+    瀏覽時依輸出所需的解析度挑選最小但仍足夠的層級，低倍率檢視高解析度
+    靜態影像時不必每次處理整張原圖；高倍率時直接使用原圖，細節不會流失。
+    """
+
+    def __init__(self, image, min_size=256):
+        self.levels = [image]
+        while min(self.levels[-1].shape[:2]) // 2 >= min_size:
+            self.levels.append(cv2.pyrDown(self.levels[-1]))
+
+    @property
+    def base(self):
+        """原始（最高解析度）影像"""
+        return self.levels[0]
+
+    def select(self, scale):
+        """回傳解析度至少為原圖 scale 倍的最小層級影像
+
+        scale 為輸出像素與原圖像素的比例，大於等於 1 時回傳原圖。
+        """
+        base_width = self.base.shape[1]
+        for level in reversed(self.levels[1:]):
+            if level.shape[1] >= scale * base_width:
+                return level
+        return self.base
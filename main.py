@@ -1,19 +1,87 @@
 import sys
+import argparse
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                           QHBoxLayout, QPushButton, QLabel, QStyle, QSizePolicy, QGroupBox, QComboBox, QSlider)
-from PyQt5.QtCore import Qt, QTimer, QSettings
+from PyQt5.QtCore import Qt, QTimer, QSettings, QEvent
 from PyQt5.QtGui import QImage, QPixmap, QPalette, QColor, QIcon
 from camera_module import CameraModule
-from image_processor import ImageProcessor
+from frame_source import create_source, CameraSource, PACING_MODES
+from camera_inventory import CameraInventory
+from image_processor import ImageProcessor, INTERPOLATION_MODES, THRESHOLD_MODES
+from resolution_policy import CaptureResolutionPolicy
+from processing_worker import ProcessingWorker
+from video_recorder import VideoRecorder
+from image_exporter import ImageExporter, IMAGE_FORMATS, encode_params
+from frame_profiler import FrameProfiler
 from keyboard_controller import KeyboardController
 from settings_dialog import SettingsDialog
 import cv2
 import os
+import time
+import threading
 from translations import get_text
 
+# 設定群組：apply_settings 只重新設定與上次套用時不同的群組
+# 每個項目為 設定名稱: (型別, 預設值)
+SETTING_GROUPS = {
+    'device': {'camera_id': (int, 0), 'bgr_pipeline': (bool, True)},
+    'capture': {'width': (int, 1280), 'height': (int, 720), 'camera_fourcc': (str, 'auto'),
+                'camera_fps': (int, 30), 'camera_buffer_size': (int, 1)},
+    'focus': {'autofocus': (bool, True), 'focus_value': (int, 50)},
+    'processor': {
+        'mask_mode': (str, ''), 'mask_opacity': (int, 50), 'mask_size': (int, 30),
+        'guide_mode': (str, ''), 'guide_color': (str, ''), 'guide_thickness': (int, 1),
+        'foreground_color': (str, ''), 'background_color': (str, ''), 'threshold_mode': (str, 'global'),
+        'custom_fg_red': (int, 255), 'custom_fg_green': (int, 255), 'custom_fg_blue': (int, 255),
+        'custom_bg_red': (int, 0), 'custom_bg_green': (int, 0), 'custom_bg_blue': (int, 0),
+        'clahe_clip_limit': (float, 3.0), 'clahe_tile_grid': (int, 8),
+        'interpolation_mode': (str, 'auto'), 'text_budget_ms': (int, 8),
+        'crop_first': (bool, True), 'adaptive_resolution': (bool, True), 'capture_crop': (bool, False),
+        'temporal_denoise': (bool, False), 'stabilization': (bool, False),
+    },
+    'color_mode': {'color_mode': (str, 'normal')},
+    'transform': {'flip_horizontal': (bool, False), 'flip_vertical': (bool, False),
+                  'rotation_angle': (int, 0)},
+    'controls': {'move_speed': (int, 5), 'invert_mouse': (bool, False),
+                 'zoom_in_key': (str, '+'), 'zoom_out_key': (str, '-'), 'reset_key': (str, '0')},
+    'layout': {'button_position': (str, '右側'), 'control_width': (int, 20)},
+    'panels': {'show_zoom': (bool, True), 'show_color': (bool, True), 'show_filter': (bool, True),
+               'show_assist': (bool, True), 'show_transform': (bool, True),
+               'show_function': (bool, True)},
+    'fullscreen': {'fullscreen': (bool, False)},
+}
+
+# 設定中以介面文字儲存的顏色
+NAMED_COLORS = {
+    'white': (255, 255, 255),
+    'black': (0, 0, 0),
+    'yellow': (255, 255, 0),
+    'green': (0, 255, 0),
+    'blue': (0, 0, 255),
+    'red': (255, 0, 0),
+}
+
+# 設定中以介面文字儲存的遮罩 / 輔助線模式（翻譯鍵 -> 處理器模式）
+MASK_MODE_KEYS = {'horizontal_mask': 'horizontal', 'vertical_mask': 'vertical',
+                  'rectangle_mask': 'rectangle', 'ellipse_mask': 'ellipse'}
+GUIDE_MODE_KEYS = {'cross': 'cross', 'grid': 'grid', 'center': 'center',
+                   'reading_line': 'reading_line'}
+
+
+def match_text(text, keys, default=None):
+    """設定中儲存的是當時介面語言的文字，比對兩種語言找出對應的鍵"""
+    for key in keys:
+        if text in (key, get_text(key, 'zh_TW'), get_text(key, 'en_US')):
+            return key
+    return default
+
 class MagnifierApp(QMainWindow):
-    def __init__(self):
+    def __init__(self, source_spec=None, pacing='realtime', source_fps=None):
         super().__init__()
+        # 指定影格來源（影片檔、圖片資料夾、合成影像）時取代設定中的攝影機
+        self.source_spec = source_spec
+        self.source_pacing = pacing
+        self.source_fps = source_fps
         self.settings = QSettings('MagnifierApp', 'Settings')
         self.current_language = self.settings.value('language', 'zh_TW')
         self.mouse_pressed = False
@@ -21,7 +89,12 @@ class MagnifierApp(QMainWindow):
         self.move_speed = 5
         self.invert_mouse = False
         self.is_recording = False
-        self.video_writer = None
+        self.recorder = None
+        self._burst = None  # 連拍中：{'count', 'remaining', 'index', 'stamp', 'last_seq'}
+        self.last_frame_seq = 0
+        self.applied_settings = {}  # 上次套用的設定（依群組），用於比對差異
+        self._camera_switch = None  # 進行中的攝影機切換
+        self.capture_crop = False  # 放大時只擷取 ROI 附近的視野（見 _update_capture_crop）
         self.init_ui()
         self.load_settings()
         
@@ -63,8 +136,11 @@ class MagnifierApp(QMainWindow):
         """)
         
         # 初始化模組
-        self.camera = CameraModule(self.settings.value('camera_id', 0, type=int))
+        # 攝影機清單在背景平行探測並快取，設定對話框與開啟失敗時共用
+        self.camera_inventory = CameraInventory()
+        self.camera = self.create_camera(self.settings.value('camera_id', 0, type=int))
         self.processor = ImageProcessor()
+        self.processor.set_channel_order(self.camera.channel_order)
         self.keyboard = KeyboardController(self)
         
         # 設置主視窗
@@ -81,6 +157,20 @@ class MagnifierApp(QMainWindow):
         self.image_label = QLabel()
         self.image_label.setAlignment(Qt.AlignCenter)
         self.image_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        # 影像在處理執行緒中就縮放到顯示元件大小，需追蹤元件大小變化
+        self.image_label.setMinimumSize(1, 1)
+        self.image_label.installEventFilter(self)
+        self.image_label.grabGesture(Qt.PinchGesture)
+        
+        # 效能資訊顯示（HUD），疊在影像上，預設隱藏
+        self.hud_label = QLabel(self.image_label)
+        self.hud_label.setStyleSheet(
+            'background-color: rgba(0, 0, 0, 160); color: #00ff00; '
+            'font-family: Consolas, monospace; font-size: 12px; padding: 4px;')
+        self.hud_label.move(8, 8)
+        self.hud_label.hide()
+        self.hud_timer = QTimer()
+        self.hud_timer.timeout.connect(self.update_hud)
         self.image_layout.addWidget(self.image_label)
         self.image_widget.setLayout(self.image_layout)
         
@@ -98,10 +188,70 @@ class MagnifierApp(QMainWindow):
         self.timer.timeout.connect(self.update_frame)
         self.timer.start(30)  # 30ms = ~33fps
         
-        # 啟動攝影機
-        self.camera.frame_ready.connect(self.process_frame)
+        # 啟動攝影機（擷取執行緒是唯一讀取裝置的地方）
         self.camera.start()
         
+        # 啟動影像處理執行緒，GUI 執行緒只負責顯示處理完成的影像
+        self.worker = ProcessingWorker(self.processor, self.camera.frame_slot)
+        # 靜止畫面（來源暫停時）的重新處理最多與顯示更新同頻率
+        self.worker.render_interval = self.timer.interval() / 1000
+        self.worker.start()
+        
+        # 截圖在背景執行緒中編碼與寫檔，完成後以狀態列通知
+        self.exporter = ImageExporter()
+        self.exporter.saved.connect(self.on_screenshot_saved)
+        self.exporter.failed.connect(self.on_screenshot_failed)
+        self.exporter.start()
+        self.burst_timer = QTimer()
+        self.burst_timer.timeout.connect(self._capture_burst_frame)
+        
+        # 依縮放倍率與顯示大小調整擷取解析度（不超過設定的解析度）
+        self.resolution_policy = CaptureResolutionPolicy(
+            (self.settings.value('width', 1280, type=int), self.settings.value('height', 720, type=int)))
+        self.resolution_timer = QTimer()
+        self.resolution_timer.timeout.connect(self._update_capture_resolution)
+        self.resolution_timer.start(250)
+        # 放大時只擷取需要的視野（攝影機數位變焦或軟體裁剪），跟隨平移與縮放
+        self.crop_timer = QTimer()
+        self.crop_timer.timeout.connect(self._update_capture_crop)
+        self.crop_timer.start(100)
+        
+        # 啟動完成後再於背景探測其他攝影機，開啟設定時不必等待
+        QTimer.singleShot(3000, lambda: self.camera_inventory.scan(wait=False))
+        
+        # 擷取、處理與顯示共用同一個計時器（預設停用，開啟 HUD 時才啟用）
+        self.profiler = FrameProfiler()
+        self.processor.profiler = self.profiler
+        self.camera.profiler = self.profiler
+        
+    def camera_options(self):
+        """從設定讀取擷取模組的參數（只在 GUI 執行緒中讀取設定）"""
+        return {
+            'width': self.settings.value('width', 1280, type=int),
+            'height': self.settings.value('height', 720, type=int),
+            'fourcc': self.settings.value('camera_fourcc', 'auto'),
+            'fps': self.settings.value('camera_fps', 30, type=int),
+            'buffer_size': self.settings.value('camera_buffer_size', 1, type=int),
+            # 保留 BGR 直到顯示，省去每張影格一次整張色彩轉換
+            'channel_order': 'BGR' if self.settings.value('bgr_pipeline', True, type=bool) else 'RGB',
+        }
+        
+    def create_camera(self, camera_id, options=None):
+        """建立擷取模組，有指定影格來源時使用該來源
+
+        options 為 camera_options() 的結果；在背景執行緒中建立時必須先在 GUI 執行緒讀好傳入，
+        None 表示立即從設定讀取。
+        """
+        if options is None:
+            options = self.camera_options()
+        if self.source_spec:
+            source = create_source(self.source_spec, self.source_pacing, self.source_fps)
+        else:
+            source = CameraSource(camera_id, inventory=self.camera_inventory)
+        camera = CameraModule(camera_id, source=source, **options)
+        camera.still_captured.connect(self.on_still_captured)
+        return camera
+        
     def setup_controls(self):
         """設置控制按鈕"""
         # 主控制面板
@@ -172,7 +322,8 @@ class MagnifierApp(QMainWindow):
             get_text('yellow_on_black', self.current_language): 'yellow_on_black',
             get_text('yellow_on_blue', self.current_language): 'yellow_on_blue',
             get_text('green_on_black', self.current_language): 'green_on_black',
-            get_text('blue_on_yellow', self.current_language): 'blue_on_yellow'
+            get_text('blue_on_yellow', self.current_language): 'blue_on_yellow',
+            get_text('custom_contrast', self.current_language): 'custom_contrast'
         }
         self.color_combo.addItems(list(self.color_mode_map.keys()))
         color_content_layout.addWidget(self.color_combo)
@@ -242,11 +393,14 @@ class MagnifierApp(QMainWindow):
         function_content_layout = QVBoxLayout()
         
         self.screenshot_btn = QPushButton(get_text('screenshot', self.current_language))
+        self.freeze_btn = QPushButton(get_text('freeze', self.current_language))
+        self.freeze_btn.setCheckable(True)
         self.record_btn = QPushButton(get_text('start_recording', self.current_language))
         self.settings_btn = QPushButton(get_text('settings', self.current_language))
         self.fullscreen_btn = QPushButton(get_text('fullscreen', self.current_language))
         
-        for btn in [self.screenshot_btn, self.record_btn, self.settings_btn, self.fullscreen_btn]:
+        for btn in [self.screenshot_btn, self.freeze_btn, self.record_btn, self.settings_btn,
+                    self.fullscreen_btn]:
             btn.setMinimumHeight(40)
             function_content_layout.addWidget(btn)
             
@@ -322,6 +476,7 @@ class MagnifierApp(QMainWindow):
         self.guide_btn.clicked.connect(lambda: self.processor.toggle_guide_line(self.guide_btn.isChecked()))
         
         self.screenshot_btn.clicked.connect(self.take_screenshot)
+        self.freeze_btn.clicked.connect(self.toggle_freeze)
         self.record_btn.clicked.connect(self.toggle_recording)
         self.settings_btn.clicked.connect(self.show_settings)
         self.fullscreen_btn.clicked.connect(self.toggle_fullscreen)
@@ -356,6 +511,7 @@ class MagnifierApp(QMainWindow):
         self.guide_btn.setText(get_text('guide_line', self.current_language))
         
         self.screenshot_btn.setText(get_text('screenshot', self.current_language))
+        self.freeze_btn.setText(get_text('freeze', self.current_language))
         self.record_btn.setText(get_text('start_recording' if not self.is_recording else 'stop_recording', 
                                        self.current_language))
         self.settings_btn.setText(get_text('settings', self.current_language))
@@ -376,7 +532,8 @@ class MagnifierApp(QMainWindow):
             get_text('yellow_on_black', self.current_language),
             get_text('yellow_on_blue', self.current_language),
             get_text('green_on_black', self.current_language),
-            get_text('blue_on_yellow', self.current_language)
+            get_text('blue_on_yellow', self.current_language),
+            get_text('custom_contrast', self.current_language)
         ])
         
         # 更新顏色模式映射
@@ -387,7 +544,8 @@ class MagnifierApp(QMainWindow):
             get_text('yellow_on_black', self.current_language): 'yellow_on_black',
             get_text('yellow_on_blue', self.current_language): 'yellow_on_blue',
             get_text('green_on_black', self.current_language): 'green_on_black',
-            get_text('blue_on_yellow', self.current_language): 'blue_on_yellow'
+            get_text('blue_on_yellow', self.current_language): 'blue_on_yellow',
+            get_text('custom_contrast', self.current_language): 'custom_contrast'
         }
         
         # 更新分組框標題
@@ -409,9 +567,6 @@ class MagnifierApp(QMainWindow):
         """變更顏色模式"""
         mode = self.color_mode_map.get(text, 'normal')
         self.processor.set_color_mode(mode)
-        # 強制更新畫面
-        if self.processor.last_frame is not None:
-            self.process_frame(self.processor.last_frame)
         
     def apply_layout_settings(self):
         """應用佈局設定"""
@@ -441,41 +596,122 @@ class MagnifierApp(QMainWindow):
                 self.main_layout.addWidget(self.image_widget)
                 self.main_layout.addWidget(self.control_panel)
                 
-    def process_frame(self, frame):
-        """處理攝影機影像"""
-        if frame is not None:
-            processed_frame = self.processor.process_frame(frame)
-            if processed_frame is not None:
-                # 如果正在錄影，寫入影片
-                if self.is_recording and self.video_writer is not None:
-                    # 調整影片大小以符合設定的品質
-                    video_quality = self.settings.value('video_quality', '高品質')
-                    if video_quality != '高品質':
-                        height, width = processed_frame.shape[:2]
-                        if video_quality == '低品質':
-                            width = width // 2
-                            height = height // 2
-                        else:  # 中等品質
-                            width = int(width * 0.75)
-                            height = int(height * 0.75)
-                        processed_frame = cv2.resize(processed_frame, (width, height))
-                    
-                    # 轉換顏色空間並寫入影片
-                    self.video_writer.write(cv2.cvtColor(processed_frame, cv2.COLOR_RGB2BGR))
-                
-                # 顯示影像
-                height, width, channel = processed_frame.shape
-                bytes_per_line = 3 * width
-                q_image = QImage(processed_frame.data, width, height, bytes_per_line, QImage.Format_RGB888)
-                self.image_label.setPixmap(QPixmap.fromImage(q_image).scaled(
-                    self.image_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                    
+    def display_frame(self, processed_frame):
+        """顯示處理完成的影像"""
+        if processed_frame is None:
+            return
+            
+        # 顯示影像：影像已在處理執行緒縮放到元件大小，直接以原緩衝區建立 QImage
+        # （呼叫端以 take_output() 保留緩衝區，轉換完成前處理執行緒不會覆寫）
+        # BGR 影格交給 Qt 在轉換為 QPixmap 時一併處理通道順序
+        height, width, channel = processed_frame.shape
+        image_format = QImage.Format_BGR888 if self.processor.channel_order == 'BGR' else QImage.Format_RGB888
+        q_image = QImage(processed_frame.data, width, height, processed_frame.strides[0],
+                         image_format)
+        pixmap = QPixmap.fromImage(q_image)
+        label_width, label_height = self.image_label.width(), self.image_label.height()
+        fits_label = ((width == label_width and height <= label_height) or
+                      (height == label_height and width <= label_width))
+        if not fits_label:
+            # 舊的處理順序（crop_first=False）輸出原始大小，仍需由 Qt 縮放
+            pixmap = pixmap.scaled(self.image_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.image_label.setPixmap(pixmap)
+        
+    def eventFilter(self, obj, event):
+        """追蹤顯示元件大小，讓處理執行緒直接輸出該大小的影像；處理滾輪與觸控縮放"""
+        if obj is self.image_label:
+            if event.type() == QEvent.Resize:
+                if not self.is_recording:
+                    # 錄影中處理器輸出擷取解析度，停止錄影時才套用元件大小
+                    size = event.size()
+                    self.processor.set_output_size(size.width(), size.height())
+            elif event.type() == QEvent.Wheel:
+                # 每一格（120）縮放 1.25 倍，以游標位置為中心
+                steps = event.angleDelta().y() / 120
+                if steps:
+                    self.processor.zoom_by(1.25 ** steps, self.zoom_anchor(event.pos()))
+                return True
+            elif event.type() == QEvent.Gesture:
+                pinch = event.gesture(Qt.PinchGesture)
+                if pinch is not None:
+                    # 觸控縮放直接跟隨手指，不使用動畫
+                    center = self.image_label.mapFromGlobal(pinch.centerPoint().toPoint())
+                    self.processor.zoom_by(pinch.scaleFactor(), self.zoom_anchor(center),
+                                           animate=False)
+                    event.accept(pinch)
+                    return True
+            elif event.type() == QEvent.NativeGesture:
+                # 觸控板的縮放手勢（macOS）
+                if event.gestureType() == Qt.ZoomNativeGesture:
+                    self.processor.zoom_by(1.0 + event.value(), self.zoom_anchor(event.pos()),
+                                           animate=False)
+                    return True
+        return super().eventFilter(obj, event)
+        
+    def zoom_anchor(self, pos):
+        """將顯示元件上的位置轉為畫面上的正規化座標（-0.5 到 0.5）"""
+        pixmap = self.image_label.pixmap()
+        if pixmap is None or pixmap.isNull():
+            return None
+        width, height = pixmap.width(), pixmap.height()
+        # 影像置中顯示
+        left = (self.image_label.width() - width) / 2
+        top = (self.image_label.height() - height) / 2
+        anchor_x = (pos.x() - left) / width - 0.5
+        anchor_y = (pos.y() - top) / height - 0.5
+        return (max(-0.5, min(0.5, anchor_x)), max(-0.5, min(0.5, anchor_y)))
+            
     def update_frame(self):
-        """更新影像"""
-        frame = self.camera.get_frame()
-        if frame is not None:
-            self.process_frame(frame)
+        """取出處理執行緒最新完成的影像並更新畫面"""
+        packet = self.worker.take_output()
+        if packet is None:
+            return
+        try:
+            if packet.seq == self.last_frame_seq:
+                return
+            self.last_frame_seq = packet.seq
+            with self.profiler.stage('display'):
+                self.display_frame(packet.frame)
+        finally:
+            # display_frame 轉換為 QPixmap 後不再使用緩衝區，處理執行緒可以重複使用
+            self.worker.release_output(packet)
+        if self.profiler.enabled:
+            # 擷取到顯示的延遲
+            now = time.monotonic()
+            self.profiler.record('latency', now - packet.timestamp)
+            self.profiler.tick('displayed', now)
+            
+    def toggle_hud(self):
+        """切換效能資訊顯示，只在顯示時啟用計時"""
+        if self.hud_label.isVisible():
+            self.hud_label.hide()
+            self.hud_timer.stop()
+            self.profiler.enabled = False
+        else:
+            self.profiler.reset()
+            self.profiler.enabled = True
+            self.hud_label.setText('...')
+            self.hud_label.adjustSize()
+            self.hud_label.show()
+            self.hud_timer.start(500)
             
+    def update_hud(self):
+        """更新效能資訊顯示"""
+        self.hud_label.setText(self.profiler.format_hud())
+        self.hud_label.adjustSize()
+        
+    def dump_profile(self):
+        """將效能統計寫入 JSON 檔案"""
+        from datetime import datetime
+        if not self.profiler.enabled:
+            print("請先開啟效能資訊顯示 (F3) 以收集統計")
+            return
+        path = self.settings.value('recording_path', os.path.expanduser('~/Videos'))
+        os.makedirs(path, exist_ok=True)
+        filename = os.path.join(path, f'profile_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+        self.profiler.dump(filename)
+        print(f"效能統計已儲存: {filename}")
+        
     def zoom_in(self):
         """放大影像"""
         self.processor.zoom_in()
@@ -488,20 +724,113 @@ class MagnifierApp(QMainWindow):
         """重置縮放"""
         self.processor.reset_zoom()
         
+    def toggle_freeze(self):
+        """切換凍結畫面
+
+        凍結時立即以目前畫面建立影像金字塔，處理執行緒與擷取都暫停；
+        若設定為高解析度，擷取執行緒會先以攝影機最高解析度擷取一張靜態影像，
+        完成後（on_still_captured）取代凍結的畫面。
+        """
+        if self.processor.is_frozen():
+            self.processor.unfreeze()
+            self.camera.resume()
+            self.worker.set_paused(False)
+            self.freeze_btn.setChecked(False)
+            return
+        if not self.processor.freeze():
+            self.freeze_btn.setChecked(False)
+            return
+        self.worker.set_paused(True)
+        self.camera.freeze(self.settings.value('freeze_high_res', True, type=bool))
+        self.freeze_btn.setChecked(True)
+        
+    def on_still_captured(self, frame):
+        """高解析度靜態影像擷取完成"""
+        if self.sender() is self.camera and self.processor.is_frozen():
+            self.processor.freeze(frame)
+            
     def take_screenshot(self):
-        """截圖"""
+        """截圖（連拍張數大於 1 時依設定的間隔連續截圖）
+
+        GUI 執行緒只取出最新影像放進輸出佇列，編碼與寫檔由 ImageExporter 處理。
+        """
         from datetime import datetime
-        screenshot_path = self.settings.value('screenshot_path', os.path.expanduser('~/Pictures'))
-        screenshot_format = self.settings.value('screenshot_format', 'PNG').lower()
-        filename = os.path.join(screenshot_path, f'screenshot_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{screenshot_format}')
-        
-        # 確保目錄存在
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        if self._burst is not None:
+            # 連拍進行中再按一次：停止連拍
+            self._stop_burst()
+            return
+        count = max(1, self.settings.value('burst_count', 1, type=int))
+        self._burst = {'count': count, 'remaining': count, 'index': 0, 'last_seq': None,
+                       'stamp': datetime.now().strftime("%Y%m%d_%H%M%S")}
+        self._capture_burst_frame()
+        if self._burst is not None:
+            self.burst_timer.start(max(10, self.settings.value('burst_interval', 500, type=int)))
+            
+    def _stop_burst(self):
+        """結束連拍"""
+        self.burst_timer.stop()
+        self._burst = None
         
-        # 儲存截圖
-        frame = self.camera.get_frame()
-        if frame is not None:
-            cv2.imwrite(filename, cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+    def _screenshot_frame(self):
+        """依設定的來源取得要儲存的影像，回傳 (影像, 序號, 是否需要複製, 通道順序)
+
+        'raw'：原始擷取影格（凍結時為凍結的高解析度影像），擷取端每次產生新陣列，不需複製；
+        'processed'：目前顯示的處理後影像，處理器的輸出緩衝區會被重複使用，保留期間立即複製。
+        """
+        if self.settings.value('screenshot_source', 'raw') == 'processed':
+            packet = self.worker.take_output()
+            if packet is None:
+                return None, None, False, None
+            try:
+                frame = packet.frame.copy()
+            finally:
+                self.worker.release_output(packet)
+            return frame, ('processed', packet.seq), False, self.processor.channel_order
+        if self.processor.is_frozen():
+            return (self.processor.still.base, ('still', id(self.processor.still)), False,
+                    self.processor.channel_order)
+        packet = self.camera.frame_slot.get_latest()
+        if packet is None:
+            return None, None, False, None
+        return packet.frame, ('raw', packet.seq), False, self.camera.channel_order
+        
+    def _capture_burst_frame(self):
+        """取出一張影像送進輸出佇列（連拍計時器每次觸發時呼叫）"""
+        burst = self._burst
+        if burst is None:
+            return
+        frame, seq, copy, channel_order = self._screenshot_frame()
+        # 影像沒有更新時（例如間隔短於影格間隔、凍結的原始影像）略過這次，不重複儲存同一張
+        if frame is not None and seq != burst['last_seq']:
+            burst['last_seq'] = seq
+            image_format = self.settings.value('screenshot_format', 'PNG').upper()
+            extension = IMAGE_FORMATS.get(image_format, 'png')
+            path = self.settings.value('screenshot_path', os.path.expanduser('~/Pictures'))
+            name = f'screenshot_{burst["stamp"]}'
+            if burst['count'] > 1:
+                name += f'_{burst["index"] + 1:03d}'
+            params = encode_params(image_format,
+                                   self.settings.value('png_compression', 1, type=int),
+                                   self.settings.value('jpeg_quality', 95, type=int))
+            convert_code = cv2.COLOR_RGB2BGR if channel_order == 'RGB' else None
+            if not self.exporter.submit(frame, os.path.join(path, f'{name}.{extension}'),
+                                        convert_code, params, copy=copy):
+                self.statusBar().showMessage(get_text('screenshot_busy', self.current_language), 3000)
+            burst['index'] += 1
+        burst['remaining'] -= 1
+        if burst['remaining'] <= 0:
+            self._stop_burst()
+            
+    def on_screenshot_saved(self, filename, elapsed):
+        """截圖寫入完成"""
+        self.statusBar().showMessage(
+            f"{get_text('screenshot_saved', self.current_language)}: {filename} "
+            f"({elapsed * 1000:.0f} ms)", 3000)
+        
+    def on_screenshot_failed(self, filename, error):
+        """截圖寫入失敗"""
+        self.statusBar().showMessage(
+            f"{get_text('screenshot_failed', self.current_language)}: {filename} ({error})", 5000)
             
     def toggle_recording(self):
         """切換錄影狀態"""
@@ -526,29 +855,45 @@ class MagnifierApp(QMainWindow):
             else:  # wmv
                 fourcc = cv2.VideoWriter_fourcc(*'WMV1')
                 
-            # 設置解析度和幀率
-            frame = self.camera.get_frame()
-            if frame is not None:
-                height, width = frame.shape[:2]
+            # 以擷取解析度（轉向後）設置錄影解析度，錄影期間固定不變
+            view_size = self.processor.get_view_size()
+            if view_size is not None:
+                width, height = view_size
                 
-                # 根據品質設置解析度
-                if video_quality == '低品質':
+                # 根據品質設置解析度（只在開始時讀取一次設定）
+                if video_quality in ('低品質', get_text('low_quality', 'en_US')):
                     width = width // 2
                     height = height // 2
-                elif video_quality == '中等品質':
+                elif video_quality in ('中等品質', get_text('medium_quality', 'en_US')):
                     width = int(width * 0.75)
                     height = int(height * 0.75)
                 
-                self.video_writer = cv2.VideoWriter(filename, fourcc, 30.0, (width, height))
+                # 影片幀率使用實際擷取幀率，寫入時依擷取時間補齊或略過影格
+                fps = round(self.camera.measured_fps) or 30.0
+                overflow = self.settings.value('recording_overflow', 'drop')
+                convert_code = None if self.processor.channel_order == 'BGR' else cv2.COLOR_RGB2BGR
+                self.recorder = VideoRecorder(filename, fourcc, (width, height), fps=fps,
+                                              overflow=overflow, convert_code=convert_code)
+                if not self.recorder.is_opened():
+                    print(f"無法建立錄影檔: {filename}")
+                    self.recorder = None
+                    return
+                self.recorder.start()
+                # 錄影中處理器不縮放到顯示元件大小，錄下擷取解析度的處理結果（顯示改由 Qt 縮放）
+                self.processor.set_output_size(None, None)
+                self.worker.add_sink(self.recorder.submit)
                 self.is_recording = True
                 self.record_btn.setText('停止錄影')
                 self.record_btn.setStyleSheet('background-color: #ff4444;')
         else:
             # 停止錄影
-            if self.video_writer is not None:
-                self.video_writer.release()
-                self.video_writer = None
+            if self.recorder is not None:
+                self.worker.remove_sink(self.recorder.submit)
+                self.recorder.stop()
+                print(f"錄影統計: {self.recorder.get_stats()}")
+                self.recorder = None
             self.is_recording = False
+            self.processor.set_output_size(self.image_label.width(), self.image_label.height())
             self.record_btn.setText('開始錄影')
             self.record_btn.setStyleSheet('')
             
@@ -566,103 +911,275 @@ class MagnifierApp(QMainWindow):
             self.showFullScreen()
             self.fullscreen_btn.setText('退出全螢幕')
             
-    def apply_settings(self):
-        """應用新的設定"""
+    def read_setting_group(self, group):
+        """讀取一個設定群組的目前值"""
+        return {key: self.settings.value(key, default, type=value_type)
+                for key, (value_type, default) in SETTING_GROUPS[group].items()}
+        
+    def apply_settings(self, initial=False):
+        """應用新的設定
+
+        只重新設定與上次套用時不同的部分：移動速度或快捷鍵變更不會影響攝影機，
+        解析度與對焦直接套用在執行中的裝置上，處理參數在處理器的 lock 內一次替換，
+        只有更換攝影機時才建立新的擷取模組（先啟動新的，收到影格後才關閉舊的）。
+        initial 為 True 時（啟動時）略過已依設定建立的攝影機與佈局。
+        """
+        current = {group: self.read_setting_group(group) for group in SETTING_GROUPS}
+        changed = {group for group, values in current.items()
+                   if values != self.applied_settings.get(group)}
+        if initial:
+            changed -= {'device', 'capture', 'layout'}
+        
         try:
-            # 停止當前的攝影機
-            if hasattr(self, 'camera'):
-                self.timer.stop()  # 停止更新定時器
-                self.camera.stop()
-                self.camera.release()
+            # 攝影機
+            device = current['device']
+            if 'device' in changed:
+                old_device = self.applied_settings.get('device', {})
+                if device['camera_id'] != old_device.get('camera_id') and not self.source_spec:
+                    if not self.switch_camera(device['camera_id']):
+                        current['device'] = old_device
+                    # 新的擷取模組依目前設定建立，不需再調整舊的裝置
+                    changed -= {'capture', 'focus'}
+                else:
+                    # 只改變通道順序：沿用同一個裝置
+                    order = 'BGR' if device['bgr_pipeline'] else 'RGB'
+                    self.camera.channel_order = order
+                    self.worker.set_source(self.camera.frame_slot, order)
+            if 'capture' in changed:
+                capture = current['capture']
+                self.resolution_policy.set_max_size((capture['width'], capture['height']))
+                self.camera.set_resolution(capture['width'], capture['height'])
+                self.camera.set_capture_format(capture['camera_fourcc'], capture['camera_fps'],
+                                               capture['camera_buffer_size'])
+            if 'focus' in changed:
+                self.apply_focus_settings(self.camera)
                 
-            # 斷開所有信號連接
-            try:
-                self.camera.frame_ready.disconnect()
-            except:
-                pass
+            # 影像處理參數（一次替換）
+            if 'processor' in changed:
+                with self.processor.lock:
+                    self.apply_contrast_colors()
+                    self.apply_filter_settings()
+                    self.apply_overlay_settings()
+                    # 進階：False 時使用舊的處理順序（先放大再套用濾鏡），用於逐像素比對
+                    self.processor.crop_first = current['processor']['crop_first']
+                    self.processor.adaptive_resolution = current['processor']['adaptive_resolution']
+                    self.capture_crop = current['processor']['capture_crop']
+                    self.processor.denoise = current['processor']['temporal_denoise']
+                    self.processor.stabilize = current['processor']['stabilization']
+            if 'color_mode' in changed:
+                color_text = next((k for k, v in self.color_mode_map.items()
+                                 if v == current['color_mode']['color_mode']), None)
+                if color_text is not None:
+                    self.color_combo.setCurrentText(color_text)
+                    
+            # 更新影像變換設定與按鈕狀態
+            if 'transform' in changed:
+                transform = current['transform']
+                with self.processor.lock:
+                    self.processor.set_flip(transform['flip_horizontal'], transform['flip_vertical'])
+                    self.processor.set_rotation(transform['rotation_angle'])
+                self.flip_h_btn.setChecked(transform['flip_horizontal'])
+                self.flip_v_btn.setChecked(transform['flip_vertical'])
+                
+            # 更新移動控制與快捷鍵
+            if 'controls' in changed:
+                controls = current['controls']
+                self.move_speed = controls['move_speed']
+                self.invert_mouse = controls['invert_mouse']
+                self.keyboard.update_keys(controls['zoom_in_key'], controls['zoom_out_key'],
+                                          controls['reset_key'])
+                
+            # 更新佈局與功能塊顯示狀態
+            if 'layout' in changed:
+                self.apply_layout_settings()
+            if 'panels' in changed:
+                panels = current['panels']
+                self.zoom_group.setVisible(panels['show_zoom'])
+                self.color_group.setVisible(panels['show_color'])
+                self.filter_group.setVisible(panels['show_filter'])
+                self.assist_group.setVisible(panels['show_assist'])
+                self.transform_group.setVisible(panels['show_transform'])
+                self.function_group.setVisible(panels['show_function'])
                 
-            # 重新創建攝影機
-            camera_id = self.settings.value('camera_id', 0, type=int)
-            self.camera = CameraModule(camera_id)
-            
-            # 設置攝影機參數
-            self.camera.set_autofocus(self.settings.value('autofocus', True, type=bool))
-            self.camera.set_focus(self.settings.value('focus_value', 50, type=int))
-            
-            # 設置解析度
-            width = self.settings.value('width', 1280, type=int)
-            height = self.settings.value('height', 720, type=int)
-            self.camera.set_resolution(width, height)
-            
-            # 更新影像變換設定
-            self.camera.set_flip(
-                horizontal=self.settings.value('flip_horizontal', False, type=bool),
-                vertical=self.settings.value('flip_vertical', False, type=bool)
-            )
-            self.camera.set_rotation(self.settings.value('rotation_angle', 0, type=int))
-            
-            # 更新按鈕狀態
-            self.flip_h_btn.setChecked(self.settings.value('flip_horizontal', False, type=bool))
-            self.flip_v_btn.setChecked(self.settings.value('flip_vertical', False, type=bool))
-            
-            # 更新移動控制
-            self.move_speed = self.settings.value('move_speed', 5, type=int)
-            self.invert_mouse = self.settings.value('invert_mouse', False, type=bool)
-            
-            # 更新快捷鍵
-            self.keyboard.update_keys(
-                self.settings.value('zoom_in_key', '+'),
-                self.settings.value('zoom_out_key', '-'),
-                self.settings.value('reset_key', '0')
-            )
-            
-            # 更新佈局
-            self.apply_layout_settings()
-            
-            # 更新顏色模式
-            color_text = next((k for k, v in self.color_mode_map.items() 
-                             if v == self.settings.value('color_mode', 'normal')), '正常')
-            self.color_combo.setCurrentText(color_text)
-            
             # 如果需要全螢幕
-            if self.settings.value('fullscreen', False, type=bool):
+            if 'fullscreen' in changed and current['fullscreen']['fullscreen']:
                 self.showFullScreen()
                 self.fullscreen_btn.setText('退出全螢幕')
+        except Exception as e:
+            print(f"套用設定時發生錯誤: {str(e)}")
             
-            # 重新連接信號並啟動攝影機
-            self.camera.frame_ready.connect(self.process_frame)
-            self.camera.start()
-            
-            # 重新啟動更新定時器
-            self.timer.start(30)
+        self.applied_settings = current
+        
+    def apply_focus_settings(self, camera):
+        """將對焦設定套用到攝影機"""
+        if self.settings.value('autofocus', True, type=bool):
+            camera.set_autofocus(True)
+        else:
+            camera.set_focus(self.settings.value('focus_value', 50, type=int))
             
-            # 更新功能塊顯示狀態
-            self.zoom_group.setVisible(self.settings.value('show_zoom', True, type=bool))
-            self.color_group.setVisible(self.settings.value('show_color', True, type=bool))
-            self.filter_group.setVisible(self.settings.value('show_filter', True, type=bool))
-            self.assist_group.setVisible(self.settings.value('show_assist', True, type=bool))
-            self.transform_group.setVisible(self.settings.value('show_transform', True, type=bool))
-            self.function_group.setVisible(self.settings.value('show_function', True, type=bool))
+    def switch_camera(self, camera_id):
+        """切換攝影機（先建立新的再關閉舊的）
+
+        新攝影機在背景執行緒中開啟，開啟期間舊攝影機照常顯示；新攝影機送出
+        第一張影格後才把處理執行緒切換過去並關閉舊攝影機。開啟失敗或逾時時
+        保留舊攝影機。回傳 False 表示無法開始切換。
+        """
+        if self._camera_switch is not None:
+            print("攝影機切換進行中，請稍候")
+            return False
+        if self.processor.is_frozen():
+            self.toggle_freeze()
+        state = {'camera_id': camera_id, 'camera': None, 'error': None,
+                 'abandoned': False, 'started': time.monotonic()}
+        app_thread = QApplication.instance().thread()
+        # 設定在 GUI 執行緒中讀取，背景執行緒只使用這份副本
+        options = self.camera_options()
+        
+        def open_camera():
+            try:
+                camera = self.create_camera(camera_id, options)
+                # 物件在此執行緒建立，移回主執行緒後才交給 GUI 使用
+                camera.moveToThread(app_thread)
+                if state['abandoned']:
+                    camera.release()
+                else:
+                    state['camera'] = camera
+            except Exception as e:
+                state['error'] = e
+                
+        self._camera_switch = state
+        threading.Thread(target=open_camera, name='camera-switch', daemon=True).start()
+        self.camera_switch_timer = QTimer()
+        self.camera_switch_timer.timeout.connect(self._poll_camera_switch)
+        self.camera_switch_timer.start(30)
+        return True
+        
+    def _update_capture_resolution(self):
+        """依輸出實際需要的像素調整擷取解析度（由計時器呼叫）
+
+        低倍率時以較低解析度擷取，降低擷取、傳輸與處理的成本；放大時立即提高。
+        只改變執行中裝置的寬高（不重新協商格式，畫面不停頓），不寫入設定；
+        停用時恢復為設定的解析度。
+        """
+        if self.source_spec or self._camera_switch is not None or self.processor.is_frozen():
+            return
+        max_size = self.resolution_policy.max_size
+        current = (self.camera.frame_width, self.camera.frame_height)
+        if not self.processor.adaptive_resolution:
+            if current != max_size:
+                self.camera.set_resolution(*max_size, negotiate=False)
+            return
+        with self.processor.lock:
+            needed = self.processor.required_source_size()
+        needed = self.camera.full_frame_size(needed)
+        size = self.resolution_policy.update(needed, current)
+        if size is not None and size != current:
+            print(f"擷取解析度: {current[0]}x{current[1]} -> {size[0]}x{size[1]}")
+            self.camera.set_resolution(*size, negotiate=False)
+        
+    def _update_capture_crop(self):
+        """依目前的 ROI 更新擷取端的視野（由計時器呼叫）
+
+        放大時只擷取 ROI 附近的視野：攝影機支援數位變焦時由裝置送出該視野，
+        否則在色彩轉換前以軟體裁剪。凍結或切換攝影機中不變更；停用時恢復完整畫面。
+        """
+        if self._camera_switch is not None or self.processor.is_frozen():
+            return
+        rect = None
+        if self.capture_crop:
+            with self.processor.lock:
+                rect = self.processor.field_request()
+        self.camera.request_crop(rect)
+        
+    def _poll_camera_switch(self):
+        """檢查攝影機切換進度（由計時器呼叫）"""
+        state = self._camera_switch
+        if state is None:
+            self.camera_switch_timer.stop()
+            return
+        elapsed = time.monotonic() - state['started']
+        camera = state['camera']
+        error = state['error']
+        if error is None and camera is None and elapsed > 10.0:
+            state['abandoned'] = True
+            error = "開啟攝影機逾時"
+        elif camera is not None:
+            if not camera.isRunning():
+                camera.profiler = self.profiler
+                self.apply_focus_settings(camera)
+                camera.start()
+                return
+            if camera.frame_slot.seq == 0:
+                if elapsed <= 10.0:
+                    return
+                camera.stop()
+                error = "新攝影機沒有送出影格"
+        elif error is None:
+            return
             
-            print(f"成功切換到攝影機 {camera_id}")
+        self.camera_switch_timer.stop()
+        self._camera_switch = None
+        if error is not None:
+            print(f"切換攝影機時發生錯誤: {error}，繼續使用攝影機 {self.camera.camera_id}")
+            # 設定維持舊攝影機，下次套用設定時會重試
+            self.applied_settings.setdefault('device', {})['camera_id'] = self.camera.camera_id
+            return
+        
+        # 處理執行緒改用新攝影機後才關閉舊攝影機
+        old_camera = self.camera
+        self.camera = camera
+        self.worker.set_source(camera.frame_slot, camera.channel_order)
+        old_camera.stop()
+        print(f"成功切換到攝影機 {camera.camera_id}")
+        
+    def apply_contrast_colors(self):
+        """將設定中的前景色 / 背景色與二值化方式套用到影像處理器"""
+        def lookup(key, prefix, default):
+            # 設定中儲存的是當時介面語言的顏色名稱
+            text = self.settings.value(key, '')
+            name = match_text(text, NAMED_COLORS)
+            if name is not None:
+                return NAMED_COLORS[name]
+            if text in (get_text('custom', 'zh_TW'), get_text('custom', 'en_US')):
+                return tuple(self.settings.value(f'{prefix}_{channel}', value, type=int)
+                             for channel, value in zip(('red', 'green', 'blue'), default))
+            return default
             
-        except Exception as e:
-            print(f"切換攝影機時發生錯誤: {str(e)}")
-            # 如果切換失敗，嘗試回到預設攝影機
-            try:
-                self.camera = CameraModule(0)
-                self.camera.frame_ready.connect(self.process_frame)
-                self.camera.start()
-                self.timer.start(30)
-                print("已回到預設攝影機")
-            except Exception as e2:
-                print(f"無法回到預設攝影機: {str(e2)}")
+        self.processor.set_contrast_colors(
+            lookup('foreground_color', 'custom_fg', (255, 255, 255)),
+            lookup('background_color', 'custom_bg', (0, 0, 0))
+        )
+        mode = self.settings.value('threshold_mode', 'global')
+        self.processor.set_threshold_mode(mode if mode in THRESHOLD_MODES else 'global')
+        
+    def apply_filter_settings(self):
+        """將高對比濾鏡的 CLAHE 參數與放大插值方式套用到影像處理器"""
+        tile = self.settings.value('clahe_tile_grid', 8, type=int)
+        self.processor.set_high_contrast_params(
+            clip_limit=self.settings.value('clahe_clip_limit', 3.0, type=float),
+            tile_grid_size=(tile, tile)
+        )
+        mode = self.settings.value('interpolation_mode', 'auto')
+        self.processor.configure(interpolation_mode=mode if mode in INTERPOLATION_MODES else 'auto')
+        self.processor.text_upscaler.budget = self.settings.value('text_budget_ms', 8, type=int) / 1000
+        
+    def apply_overlay_settings(self):
+        """將遮罩與輔助線設定一次套用到影像處理器"""
+        mask_key = match_text(self.settings.value('mask_mode', ''), MASK_MODE_KEYS, 'horizontal_mask')
+        guide_key = match_text(self.settings.value('guide_mode', ''), GUIDE_MODE_KEYS, 'cross')
+        color_key = match_text(self.settings.value('guide_color', ''), NAMED_COLORS, 'green')
+        self.processor.configure(
+            mask_mode=MASK_MODE_KEYS[mask_key],
+            mask_opacity=self.settings.value('mask_opacity', 50, type=int),
+            mask_size=self.settings.value('mask_size', 30, type=int),
+            guide_mode=GUIDE_MODE_KEYS[guide_key],
+            guide_color=NAMED_COLORS[color_key],
+            guide_thickness=self.settings.value('guide_thickness', 1, type=int),
+        )
         
     def load_settings(self):
         """載入設定"""
-        if self.settings.value('fullscreen', False, type=bool):
-            self.showFullScreen()
-            self.fullscreen_btn.setText('退出全螢幕')
+        self.apply_settings(initial=True)
             
     def closeEvent(self, event):
         """關閉程式時的清理工作"""
@@ -671,8 +1188,19 @@ class MagnifierApp(QMainWindow):
             self.toggle_recording()
             
         self.keyboard.stop()
+        if self._camera_switch is not None:
+            # 放棄進行中的攝影機切換
+            self.camera_switch_timer.stop()
+            self._camera_switch['abandoned'] = True
+            if self._camera_switch['camera'] is not None:
+                self._camera_switch['camera'].stop()
+            self._camera_switch = None
+        self._stop_burst()
+        self.resolution_timer.stop()
+        self.crop_timer.stop()
+        self.exporter.stop()
+        self.worker.stop()
         self.camera.stop()
-        self.camera.release()
         event.accept()
         
     def mousePressEvent(self, event):
@@ -716,22 +1244,28 @@ class MagnifierApp(QMainWindow):
             self.processor.move(-speed, 0)
         elif event.text().upper() == self.settings.value('move_right_key', 'D'):
             self.processor.move(speed, 0)
+        elif event.text().upper() == self.settings.value('freeze_key', 'F'):
+            self.toggle_freeze()
+        elif event.key() == Qt.Key_F3:
+            self.toggle_hud()
+        elif event.key() == Qt.Key_F4:
+            self.dump_profile()
         else:
             super().keyPressEvent(event)
         
     def toggle_horizontal_flip(self):
         """切換水平翻轉"""
-        self.camera.set_flip(horizontal=self.flip_h_btn.isChecked())
+        self.processor.set_flip(horizontal=self.flip_h_btn.isChecked())
         
     def toggle_vertical_flip(self):
         """切換垂直翻轉"""
-        self.camera.set_flip(vertical=self.flip_v_btn.isChecked())
+        self.processor.set_flip(vertical=self.flip_v_btn.isChecked())
         
     def rotate_image(self):
         """旋轉影像"""
         current_angle = self.settings.value('rotation_angle', 0, type=int)
         new_angle = (current_angle + 90) % 360
-        self.camera.set_rotation(new_angle)
+        self.processor.set_rotation(new_angle)
         self.settings.setValue('rotation_angle', new_angle)
         
     def toggle_group_content(self, layout, show):
@@ -741,9 +1275,22 @@ class MagnifierApp(QMainWindow):
             if widget:
                 widget.setVisible(show)
                 
+def parse_args(argv):
+    """解析命令列參數（Qt 的參數交給 QApplication）"""
+    parser = argparse.ArgumentParser(description='擴視機')
+    parser.add_argument('--source',
+                        help='影格來源：camera:0、file:影片檔、images:資料夾、synthetic:1920x1080')
+    parser.add_argument('--pacing', choices=PACING_MODES, default='realtime',
+                        help='影格節奏：realtime（來源速度）、fast（盡快）、fixed（依 --fps）')
+    parser.add_argument('--fps', type=float, help='fixed 節奏的幀率，或圖片/合成來源的幀率')
+    return parser.parse_known_args(argv)
+    
 def main():
-    app = QApplication(sys.argv)
-    window = MagnifierApp()
+    args, qt_args = parse_args(sys.argv[1:])
+    if args.pacing == 'fixed' and not args.fps:
+        args.fps = 30.0
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = MagnifierApp(args.source, args.pacing, args.fps)
     window.show()
     sys.exit(app.exec_())
 
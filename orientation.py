@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+
+# 支援的旋轉角度（順時針）
+ROTATIONS = [0, 90, 180, 270]
+
+# (旋轉角度, 水平翻轉) -> 對 ROI 套用的運算，None 表示不需處理
+# 垂直翻轉等同於水平翻轉後旋轉 180°，先由 normalize() 轉換
+_OPERATIONS = {
+    (0, False): None,
+    (0, True): [('flip', 1)],
+    (180, False): [('flip', -1)],
+    (180, True): [('flip', 0)],
+    (90, False): [('rotate', cv2.ROTATE_90_CLOCKWISE)],
+    (270, False): [('rotate', cv2.ROTATE_90_COUNTERCLOCKWISE)],
+    (270, True): [('transpose', None)],
+    (90, True): [('transpose', None), ('flip', -1)],
+}
+
+
+def normalize(flip_horizontal, flip_vertical, rotation):
+    """將翻轉與旋轉化為 (旋轉角度, 是否水平翻轉)
+
+    顯示影像 = 旋轉(水平翻轉(原始影像))；垂直翻轉 = 水平翻轉 + 旋轉 180°。
+    """
+    rotation = int(rotation) % 360
+    if rotation not in ROTATIONS:
+        raise ValueError(f"旋轉角度必須是 90 的倍數: {rotation}")
+    mirror = bool(flip_horizontal)
+    if flip_vertical:
+        mirror = not mirror
+        rotation = (rotation + 180) % 360
+    return rotation, mirror
+
+
+def oriented_size(width, height, rotation):
+    """轉向後的影像大小"""
+    if rotation in (90, 270):
+        return height, width
+    return width, height
+
+
+def orientation_matrix(width, height, rotation, mirror):
+    """原始影像座標到轉向後座標的 3x3 仿射矩陣
+
+    座標以像素邊緣為準（0 到 width），像素 i 佔 [i, i+1)，
+    因此與 cv2.flip / cv2.rotate 的像素位置完全一致。
+    """
+    matrix = np.eye(3)
+    if mirror:
+        matrix = np.array([[-1, 0, width], [0, 1, 0], [0, 0, 1]], dtype=np.float64) @ matrix
+    w, h = width, height
+    if rotation == 90:
+        step = np.array([[0, -1, h], [1, 0, 0], [0, 0, 1]], dtype=np.float64)
+    elif rotation == 180:
+        step = np.array([[-1, 0, w], [0, -1, h], [0, 0, 1]], dtype=np.float64)
+    elif rotation == 270:
+        step = np.array([[0, 1, 0], [-1, 0, w], [0, 0, 1]], dtype=np.float64)
+    else:
+        step = np.eye(3)
+    return step @ matrix
+
+
+def map_rect_float(matrix, x, y, w, h):
+    """以仿射矩陣轉換軸對齊矩形，回傳浮點數 (x, y, w, h)"""
+    corners = np.array([[x, y, 1], [x + w, y + h, 1]], dtype=np.float64).T
+    mapped = (matrix @ corners)[:2]
+    x0, y0 = mapped.min(axis=1)
+    x1, y1 = mapped.max(axis=1)
+    return float(x0), float(y0), float(x1 - x0), float(y1 - y0)
+
+
+def map_rect(matrix, x, y, w, h):
+    """以仿射矩陣轉換軸對齊矩形，回傳整數 (x, y, w, h)"""
+    x0, y0, width, height = map_rect_float(matrix, x, y, w, h)
+    return int(round(x0)), int(round(y0)), int(round(width)), int(round(height))
+
+
+def apply(image, rotation, mirror, scratch):
+    """對影像（通常是已裁剪的 ROI）套用轉向
+
+    scratch(name, shape) 提供輸出緩衝區；不需轉向時直接回傳原影像。
+    """
+    operations = _OPERATIONS[(rotation, mirror)]
+    if operations is None:
+        return image
+    result = image
+    for index, (name, code) in enumerate(operations):
+        if name == 'flip':
+            shape = result.shape
+        else:
+            shape = (result.shape[1], result.shape[0]) + result.shape[2:]
+        dst = scratch(f'orient{index}', shape)
+        if name == 'flip':
+            result = cv2.flip(result, code, dst=dst)
+        elif name == 'rotate':
+            result = cv2.rotate(result, code, dst=dst)
+        else:
+            result = cv2.transpose(result, dst=dst)
+    return result
@@ -0,0 +1,154 @@
+import cv2
+import numpy as np
+
+
+def _write_back(view, result):
+    """舊版 OpenCV 對不連續的 dst 可能回傳新陣列，此時寫回原檢視"""
+    if result is not view:
+        view[...] = result
+
+
+def _regions_from_mask(mask):
+    """取出遮罩的外框區域，區域內若完全填滿則不需保留子遮罩"""
+    ys, xs = np.nonzero(mask)
+    if len(ys) == 0:
+        return []
+    y0, y1 = int(ys.min()), int(ys.max()) + 1
+    x0, x1 = int(xs.min()), int(xs.max()) + 1
+    submask = mask[y0:y1, x0:x1] > 0
+    if submask.all():
+        submask = None
+    return [(y0, y1, x0, x1, submask)]
+
+
+class MaskLayer:
+    """預先建立的遮罩圖層：只處理遮罩覆蓋的區域"""
+
+    def __init__(self, regions, opacity):
+        self.regions = regions
+        # addWeighted(frame, 1, mask, alpha, 0) 在遮罩內等同於加上 255 * alpha
+        alpha = opacity / 100
+        self.lut = np.clip(np.rint(np.arange(256) + 255 * alpha), 0, 255).astype(np.uint8)
+        self._scratch = None
+
+    def apply(self, frame):
+        """直接在影像上套用遮罩"""
+        for y0, y1, x0, x1, submask in self.regions:
+            view = frame[y0:y1, x0:x1]
+            if submask is None:
+                _write_back(view, cv2.LUT(view, self.lut, dst=view))
+            else:
+                if self._scratch is None or self._scratch.shape != view.shape:
+                    self._scratch = np.empty(view.shape, dtype=np.uint8)
+                cv2.LUT(view, self.lut, dst=self._scratch)
+                np.copyto(view, self._scratch, where=submask[..., None])
+        return frame
+
+
+class GuideLayer:
+    """預先點陣化的輔助線圖層：每條線只保留其外框區域"""
+
+    def __init__(self, regions, color):
+        self.regions = regions
+        self.color = np.array(color, dtype=np.uint8)
+
+    def apply(self, frame):
+        """直接在影像上繪製輔助線"""
+        for y0, y1, x0, x1, submask in self.regions:
+            view = frame[y0:y1, x0:x1]
+            if submask is None:
+                view[...] = self.color
+            else:
+                view[submask] = self.color
+        return frame
+
+
+class OverlayCache:
+    """遮罩與輔助線圖層快取
+
+    圖層只在模式、大小、透明度、顏色、粗細或影像大小改變時重建，
+    每張影格只需在覆蓋區域內合成，不再做整張影像的混合。
+    """
+
+    def __init__(self):
+        self._mask_key = None
+        self._mask_layer = None
+        self._guide_key = None
+        self._guide_layer = None
+        self.rebuilds = 0
+
+    def mask_layer(self, mode, size, opacity, shape):
+        """取得遮罩圖層"""
+        key = (mode, size, opacity, shape[:2])
+        if key != self._mask_key:
+            self._mask_layer = MaskLayer(self._build_mask_regions(mode, size, shape), opacity)
+            self._mask_key = key
+            self.rebuilds += 1
+        return self._mask_layer
+
+    def guide_layer(self, mode, color, thickness, shape):
+        """取得輔助線圖層"""
+        key = (mode, tuple(color), thickness, shape[:2])
+        if key != self._guide_key:
+            self._guide_layer = GuideLayer(self._build_guide_regions(mode, thickness, shape), color)
+            self._guide_key = key
+            self.rebuilds += 1
+        return self._guide_layer
+
+    @staticmethod
+    def _build_mask_regions(mode, size, shape):
+        height, width = shape[:2]
+        if mode == 'horizontal':
+            mask_height = int(height * size / 100)
+            y1 = (height - mask_height) // 2
+            return [(y1, y1 + mask_height, 0, width, None)]
+        elif mode == 'vertical':
+            mask_width = int(width * size / 100)
+            x1 = (width - mask_width) // 2
+            return [(0, height, x1, x1 + mask_width, None)]
+        elif mode == 'rectangle':
+            mask_height = int(height * size / 100)
+            mask_width = int(width * size / 100)
+            y1 = (height - mask_height) // 2
+            x1 = (width - mask_width) // 2
+            return [(y1, y1 + mask_height, x1, x1 + mask_width, None)]
+        elif mode == 'ellipse':
+            mask = np.zeros((height, width), dtype=np.uint8)
+            center = (width // 2, height // 2)
+            axes = (int(width * size / 200), int(height * size / 200))
+            cv2.ellipse(mask, center, axes, 0, 0, 360, 255, -1)
+            return _regions_from_mask(mask)
+        return []
+
+    @staticmethod
+    def _build_guide_regions(mode, thickness, shape):
+        height, width = shape[:2]
+        lines = []
+        if mode == 'cross':
+            # 十字線
+            lines.append(((width//2, 0), (width//2, height)))
+            lines.append(((0, height//2), (width, height//2)))
+        elif mode == 'grid':
+            # 網格
+            for x in range(width//3, width, max(1, width//3)):
+                lines.append(((x, 0), (x, height)))
+            for y in range(height//3, height, max(1, height//3)):
+                lines.append(((0, y), (width, y)))
+        elif mode == 'center':
+            # 中心點
+            center = (width//2, height//2)
+            size = 20
+            lines.append(((center[0]-size, center[1]), (center[0]+size, center[1])))
+            lines.append(((center[0], center[1]-size), (center[0], center[1]+size)))
+        elif mode == 'reading_line':
+            # 閱讀線
+            y = height//2
+            lines.append(((0, y), (width, y)))
+
+        regions = []
+        mask = np.zeros((height, width), dtype=np.uint8)
+        for start, end in lines:
+            mask[:] = 0
+            cv2.line(mask, start, end, 255, thickness)
+            regions.extend(_regions_from_mask(mask))
+        return regions
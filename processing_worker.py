@@ -0,0 +1,159 @@
+import threading
+import time
+from PyQt5.QtCore import QThread
+from frame_buffer import FrameSlot
+
+
+class ProcessingWorker(QThread):
+    """影像處理執行緒
+
+    從擷取槽取出最新影格交給 ImageProcessor 處理，處理完成的顯示用影像
+    放入 output_slot。處理速度跟不上擷取速度時，中間的影格會直接被略過，
+    因此 GUI 執行緒永遠只需要處理顯示，不受濾鏡成本影響。
+
+    處理參數變更只會把處理器標記為待更新，不會立即重新處理；來源有新影格時
+    自然會以新參數處理。只有來源暫停（paused，或超過 idle_timeout 秒沒有新影格）
+    時才重新處理最後一張影格，且每 render_interval 秒最多一次，
+    同一段時間內的多次變更（例如拖曳）合併為一次處理。
+
+    輸出影像是處理器緩衝區環中的緩衝區，放在 output_slot 中的期間保持保留；
+    在其他執行緒使用（例如轉換為 QImage）時以 take_output() 取出並保留，
+    用完後 release_output()，處理執行緒不會在讀取途中覆寫它。
+    """
+
+    def __init__(self, processor, source_slot, parent=None):
+        super().__init__(parent)
+        self.processor = processor
+        # (來源槽, 通道順序) 以單一 tuple 一起替換；通道順序 None 表示沿用處理器目前的設定
+        self.source = (source_slot, None)
+        self.output_slot = FrameSlot()
+        self.running = False
+        self.frames_processed = 0
+        self.frames_skipped = 0  # 因處理落後而略過的擷取影格
+        self.sinks = []  # 接收每張處理完成影像的回呼 (frame, timestamp)，例如錄影
+        self._last_seq = 0
+        self.paused = False  # True 時不處理新擷取的影格，只在參數變更時重新處理靜止畫面
+        self.render_interval = 1 / 30  # 靜止畫面重新處理的最短間隔（秒），通常與顯示更新同步
+        self.idle_timeout = 0.25  # 超過此時間沒有新影格，視為來源已暫停
+        self.stills_rendered = 0
+        self._last_frame_time = 0.0
+        self._last_render_time = 0.0
+        self._output_lock = threading.Lock()
+        self._published = None  # 目前放在 output_slot 中的影像
+
+    def set_paused(self, paused):
+        """暫停 / 繼續處理擷取的影格"""
+        self.paused = paused
+
+    def set_source(self, source_slot, channel_order=None):
+        """切換影格來源（例如更換攝影機時）
+
+        channel_order 與來源一起切換：處理執行緒在處理新來源的第一張影格前
+        才更新處理器的通道順序，不會用錯誤的順序處理任何一張影格。
+        """
+        self.source = (source_slot, channel_order)
+    
+    @property
+    def source_slot(self):
+        """目前的影格來源槽"""
+        return self.source[0]
+
+    def add_sink(self, sink):
+        """加入處理完成影像的接收者"""
+        self.sinks = self.sinks + [sink]
+
+    def remove_sink(self, sink):
+        """移除處理完成影像的接收者"""
+        self.sinks = [s for s in self.sinks if s != sink]
+
+    def run(self):
+        """執行影像處理迴圈"""
+        self.running = True
+        active_source = None
+        while self.running:
+            source = self.source
+            if source is not active_source:
+                # 新來源的影格編號重新開始（只在處理執行緒中重設，避免與 set_source 競爭）
+                active_source = source
+                self._last_seq = 0
+            source_slot, channel_order = source
+            if self.paused:
+                packet = None
+                time.sleep(self.render_interval)
+            else:
+                timeout = self.render_interval if self.processor.needs_render() else 0.1
+                packet = source_slot.wait_newer(self._last_seq, timeout=timeout)
+            if packet is None:
+                self._render_still()
+                continue
+            if source is not self.source:
+                continue
+            if channel_order is not None and channel_order != self.processor.channel_order:
+                self.processor.set_channel_order(channel_order)
+            if self._last_seq:
+                self.frames_skipped += max(0, packet.seq - self._last_seq - 1)
+            self._last_seq = packet.seq
+            self._last_frame_time = time.monotonic()
+
+            try:
+                processed_frame = self.processor.process_frame(packet.frame, packet.field)
+            except Exception as e:
+                print(f"處理影格時發生錯誤: {str(e)}")
+                continue
+            if processed_frame is not None:
+                self.frames_processed += 1
+                profiler = self.processor.profiler
+                profiler.tick('processed')
+                # 保留擷取時間，供顯示端計算延遲
+                self._publish(processed_frame, packet.timestamp)
+                if self.sinks:
+                    with profiler.stage('record'):
+                        for sink in self.sinks:
+                            sink(processed_frame, packet.timestamp)
+
+    def _render_still(self):
+        """來源暫停時，若參數有變更（或縮放動畫進行中）重新處理最後一張影格"""
+        if not self.processor.needs_render():
+            return
+        now = time.monotonic()
+        if not self.paused and now - self._last_frame_time < self.idle_timeout:
+            # 來源仍在輸出影格，變更會在下一張影格套用
+            return
+        if now - self._last_render_time < self.render_interval:
+            return
+        self._last_render_time = now
+        try:
+            processed_frame = self.processor.render_still()
+        except Exception as e:
+            print(f"重新處理影格時發生錯誤: {str(e)}")
+            return
+        if processed_frame is not None:
+            self.stills_rendered += 1
+            self._publish(processed_frame, now)
+
+    def _publish(self, frame, timestamp):
+        """將處理完成的影像放入 output_slot，並改為保留新影像的緩衝區"""
+        buffers = self.processor.buffers
+        with self._output_lock:
+            buffers.hold(frame)
+            self.output_slot.put(frame, timestamp)
+            if self._published is not None:
+                buffers.release(self._published)
+            self._published = frame
+
+    def take_output(self):
+        """取出最新的處理結果並保留其緩衝區，用完後必須呼叫 release_output()"""
+        with self._output_lock:
+            packet = self.output_slot.get_latest()
+            if packet is not None:
+                self.processor.buffers.hold(packet.frame)
+        return packet
+
+    def release_output(self, packet):
+        """解除 take_output() 的保留"""
+        self.processor.buffers.release(packet.frame)
+
+    def stop(self):
+        """停止影像處理執行緒"""
+        self.running = False
+        self.wait()
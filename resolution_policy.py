@@ -0,0 +1,69 @@
+import time
+
+# 常見的攝影機解析度（16:9 與 4:3），依面積排序
+STANDARD_RESOLUTIONS = [
+    (640, 360), (640, 480), (800, 600), (960, 540), (1024, 768), (1280, 720),
+    (1280, 960), (1600, 1200), (1920, 1080), (2560, 1440), (3840, 2160),
+]
+
+
+class CaptureResolutionPolicy:
+    """依輸出實際需要的像素數選擇擷取解析度
+
+    可用解析度為與設定解析度（max_size）長寬比相同、且不超過它的標準解析度。
+    需要更多像素時（例如放大）立即提高解析度；需要的像素低於較小解析度的
+    down_margin 倍、且持續 hold 秒後才降低，避免在兩個解析度之間來回切換
+    （每次切換攝影機需要重新協商格式）。
+    """
+
+    def __init__(self, max_size, resolutions=STANDARD_RESOLUTIONS, down_margin=0.8, hold=2.0):
+        self.resolutions = resolutions
+        self.down_margin = down_margin
+        self.hold = hold
+        self.sizes = []
+        self._down_since = None
+        self.set_max_size(max_size)
+
+    def set_max_size(self, max_size):
+        """設定最高（使用者設定的）擷取解析度"""
+        self.max_size = tuple(max_size)
+        width, height = self.max_size
+        aspect = width / height
+        sizes = [(w, h) for w, h in self.resolutions
+                 if w < width and h < height and abs(w / h - aspect) < 0.05 * aspect]
+        self.sizes = sizes + [self.max_size]
+        self._down_since = None
+
+    def _smallest_covering(self, width, height):
+        """能涵蓋 width x height 的最小解析度，都不夠時回傳最高解析度"""
+        for size in self.sizes:
+            if size[0] >= width and size[1] >= height:
+                return size
+        return self.max_size
+
+    def update(self, needed, current, now=None):
+        """依需要的大小決定擷取解析度，需要切換時回傳新的 (寬, 高)，否則回傳 None"""
+        if needed is None:
+            return None
+        if now is None:
+            now = time.monotonic()
+        current = tuple(current)
+        target = self._smallest_covering(*needed)
+        area = target[0] * target[1]
+        current_area = current[0] * current[1]
+        if area > current_area:
+            # 需要更多像素：立即提高
+            self._down_since = None
+            return target
+        # 留下餘裕：需要的大小乘上 1 / down_margin 後仍放得進較小的解析度才降低
+        lower = self._smallest_covering(needed[0] / self.down_margin, needed[1] / self.down_margin)
+        if lower[0] * lower[1] >= current_area:
+            self._down_since = None
+            return None
+        if self._down_since is None:
+            self._down_since = now
+            return None
+        if now - self._down_since < self.hold:
+            return None
+        self._down_since = None
+        return lower
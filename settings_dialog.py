@@ -1,11 +1,11 @@
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QComboBox, 
-                            QLabel, QPushButton, QGroupBox, QSpinBox, QCheckBox,
+                            QLabel, QPushButton, QGroupBox, QSpinBox, QDoubleSpinBox, QCheckBox,
                             QTabWidget, QWidget, QGridLayout, QLineEdit, QSlider, QFileDialog)
-from PyQt5.QtCore import Qt, QSettings
+from PyQt5.QtCore import Qt, QSettings, QTimer
 from PyQt5.QtGui import QFont
-import cv2
 import os
 from translations import get_text
+from camera_inventory import CameraInventory
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
@@ -116,6 +116,12 @@ class SettingsDialog(QDialog):
         
         camera_label = QLabel(get_text('select_camera', self.current_language))
         self.camera_combo = QComboBox()
+        self.refresh_camera_btn = QPushButton(get_text('refresh_cameras', self.current_language))
+        self.refresh_camera_btn.clicked.connect(lambda: self.refresh_camera_list(force=True))
+        # 背景探測完成前定時更新清單
+        self.camera_scan_timer = QTimer(self)
+        self.camera_scan_timer.timeout.connect(self._poll_camera_scan)
+        self.camera_inventory = getattr(self.parent, 'camera_inventory', None) or CameraInventory()
         self.refresh_camera_list()
         
         # 自動對焦設定
@@ -127,6 +133,7 @@ class SettingsDialog(QDialog):
         
         camera_group_layout.addWidget(camera_label, 0, 0)
         camera_group_layout.addWidget(self.camera_combo, 0, 1)
+        camera_group_layout.addWidget(self.refresh_camera_btn, 0, 2)
         camera_group_layout.addWidget(self.autofocus_check, 1, 0)
         camera_group_layout.addWidget(self.focus_value, 1, 1)
         
@@ -152,6 +159,44 @@ class SettingsDialog(QDialog):
         resolution_group.setLayout(resolution_layout)
         camera_layout.addWidget(resolution_group)
         
+        # 擷取格式設定
+        format_group = QGroupBox(get_text('capture_format', self.current_language))
+        format_layout = QGridLayout()
+        
+        format_layout.addWidget(QLabel(get_text('video_fourcc', self.current_language)), 0, 0)
+        self.fourcc_combo = QComboBox()
+        self.fourcc_combo.addItem(get_text('auto_format', self.current_language), 'auto')
+        self.fourcc_combo.addItem('MJPG', 'MJPG')
+        self.fourcc_combo.addItem('YUY2', 'YUY2')
+        format_layout.addWidget(self.fourcc_combo, 0, 1)
+        
+        format_layout.addWidget(QLabel(get_text('capture_fps', self.current_language)), 1, 0)
+        self.capture_fps_spin = QSpinBox()
+        self.capture_fps_spin.setRange(5, 120)
+        self.capture_fps_spin.setValue(30)
+        format_layout.addWidget(self.capture_fps_spin, 1, 1)
+        
+        format_layout.addWidget(QLabel(get_text('buffer_size', self.current_language)), 2, 0)
+        self.buffer_size_spin = QSpinBox()
+        self.buffer_size_spin.setRange(1, 10)
+        self.buffer_size_spin.setValue(1)
+        format_layout.addWidget(self.buffer_size_spin, 2, 1)
+        
+        self.bgr_pipeline_check = QCheckBox(get_text('bgr_pipeline', self.current_language))
+        format_layout.addWidget(self.bgr_pipeline_check, 3, 0, 1, 2)
+        
+        self.freeze_high_res_check = QCheckBox(get_text('freeze_high_res', self.current_language))
+        format_layout.addWidget(self.freeze_high_res_check, 4, 0, 1, 2)
+        
+        self.adaptive_resolution_check = QCheckBox(get_text('adaptive_resolution', self.current_language))
+        format_layout.addWidget(self.adaptive_resolution_check, 5, 0, 1, 2)
+        
+        self.capture_crop_check = QCheckBox(get_text('capture_crop', self.current_language))
+        format_layout.addWidget(self.capture_crop_check, 6, 0, 1, 2)
+        
+        format_group.setLayout(format_layout)
+        camera_layout.addWidget(format_group)
+        
         camera_tab.setLayout(camera_layout)
         
         # 遮罩設定分頁
@@ -380,6 +425,37 @@ class SettingsDialog(QDialog):
         self.screenshot_format.addItems(['PNG', 'JPG', 'BMP'])
         screenshot_grid.addWidget(self.screenshot_format, 1, 1)
         
+        screenshot_grid.addWidget(QLabel(get_text('screenshot_source', self.current_language)), 2, 0)
+        self.screenshot_source = QComboBox()
+        self.screenshot_source.addItem(get_text('raw_frame', self.current_language), 'raw')
+        self.screenshot_source.addItem(get_text('processed_view', self.current_language), 'processed')
+        screenshot_grid.addWidget(self.screenshot_source, 2, 1)
+        
+        screenshot_grid.addWidget(QLabel(get_text('png_compression', self.current_language)), 3, 0)
+        self.png_compression = QSpinBox()
+        self.png_compression.setRange(0, 9)
+        self.png_compression.setValue(1)
+        screenshot_grid.addWidget(self.png_compression, 3, 1)
+        
+        screenshot_grid.addWidget(QLabel(get_text('jpeg_quality', self.current_language)), 4, 0)
+        self.jpeg_quality = QSpinBox()
+        self.jpeg_quality.setRange(1, 100)
+        self.jpeg_quality.setValue(95)
+        screenshot_grid.addWidget(self.jpeg_quality, 4, 1)
+        
+        screenshot_grid.addWidget(QLabel(get_text('burst_count', self.current_language)), 5, 0)
+        self.burst_count = QSpinBox()
+        self.burst_count.setRange(1, 100)
+        self.burst_count.setValue(1)
+        screenshot_grid.addWidget(self.burst_count, 5, 1)
+        
+        screenshot_grid.addWidget(QLabel(get_text('burst_interval', self.current_language)), 6, 0)
+        self.burst_interval = QSpinBox()
+        self.burst_interval.setRange(50, 10000)
+        self.burst_interval.setSingleStep(50)
+        self.burst_interval.setValue(500)
+        screenshot_grid.addWidget(self.burst_interval, 6, 1)
+        
         screenshot_group.setLayout(screenshot_grid)
         save_layout.addWidget(screenshot_group)
         
@@ -501,8 +577,58 @@ class SettingsDialog(QDialog):
         self.custom_bg_group.setLayout(bg_layout)
         contrast_grid.addWidget(self.custom_bg_group, 3, 0, 1, 2)
         
+        # 雙色對比模式的二值化方式
+        contrast_grid.addWidget(QLabel(get_text('threshold_mode', self.current_language)), 4, 0)
+        self.threshold_combo = QComboBox()
+        for mode in ['global', 'mean', 'sauvola']:
+            self.threshold_combo.addItem(get_text(f'threshold_{mode}', self.current_language), mode)
+        contrast_grid.addWidget(self.threshold_combo, 4, 1)
+        
         contrast_group.setLayout(contrast_grid)
         color_layout.addWidget(contrast_group)
+        
+        # 高對比濾鏡設定
+        high_contrast_group = QGroupBox(get_text('high_contrast_settings', self.current_language))
+        high_contrast_grid = QGridLayout()
+        high_contrast_grid.addWidget(QLabel(get_text('clahe_clip_limit', self.current_language)), 0, 0)
+        self.clahe_clip_limit = QDoubleSpinBox()
+        self.clahe_clip_limit.setRange(0.5, 10.0)
+        self.clahe_clip_limit.setSingleStep(0.5)
+        self.clahe_clip_limit.setValue(3.0)
+        high_contrast_grid.addWidget(self.clahe_clip_limit, 0, 1)
+        high_contrast_grid.addWidget(QLabel(get_text('clahe_tile_grid', self.current_language)), 1, 0)
+        self.clahe_tile_grid = QSpinBox()
+        self.clahe_tile_grid.setRange(2, 16)
+        self.clahe_tile_grid.setValue(8)
+        high_contrast_grid.addWidget(self.clahe_tile_grid, 1, 1)
+        high_contrast_group.setLayout(high_contrast_grid)
+        color_layout.addWidget(high_contrast_group)
+        
+        # 放大品質設定
+        interpolation_group = QGroupBox(get_text('magnification_quality', self.current_language))
+        interpolation_grid = QGridLayout()
+        interpolation_grid.addWidget(QLabel(get_text('interpolation_mode', self.current_language)), 0, 0)
+        self.interpolation_combo = QComboBox()
+        for mode in ['auto', 'linear', 'cubic', 'text']:
+            self.interpolation_combo.addItem(get_text(f'interpolation_{mode}', self.current_language), mode)
+        interpolation_grid.addWidget(self.interpolation_combo, 0, 1)
+        interpolation_grid.addWidget(QLabel(get_text('text_budget_ms', self.current_language)), 1, 0)
+        self.text_budget_spin = QSpinBox()
+        self.text_budget_spin.setRange(2, 30)
+        self.text_budget_spin.setValue(8)
+        interpolation_grid.addWidget(self.text_budget_spin, 1, 1)
+        interpolation_group.setLayout(interpolation_grid)
+        color_layout.addWidget(interpolation_group)
+        
+        # 時間處理（放大後的感光雜訊與震動）
+        temporal_group = QGroupBox(get_text('temporal_settings', self.current_language))
+        temporal_layout = QVBoxLayout()
+        self.temporal_denoise_check = QCheckBox(get_text('temporal_denoise', self.current_language))
+        temporal_layout.addWidget(self.temporal_denoise_check)
+        self.stabilization_check = QCheckBox(get_text('stabilization', self.current_language))
+        temporal_layout.addWidget(self.stabilization_check)
+        temporal_group.setLayout(temporal_layout)
+        color_layout.addWidget(temporal_group)
         color_tab.setLayout(color_layout)
         
         # 添加分頁
@@ -538,23 +664,71 @@ class SettingsDialog(QDialog):
         """切換對焦滑桿啟用狀態"""
         self.focus_value.setEnabled(state == Qt.Checked)
         
-    def refresh_camera_list(self):
+    def refresh_camera_list(self, force=False):
+        """更新攝影機清單（使用主視窗的攝影機清單快取，force 時重新探測）
+
+        探測在背景執行緒中進行，不會讓對話框停住：先以快取填入清單，
+        探測完成（或逾時）前由 camera_scan_timer 定時更新。
+        """
+        inventory = self.camera_inventory
+        inventory.scan(force=force, wait=False)  # 平行檢查前10個攝影機
+        self._fill_camera_combo()
+        if inventory.pending():
+            self.refresh_camera_btn.setEnabled(False)
+            self.camera_scan_timer.start(100)
+            
+    def _poll_camera_scan(self):
+        """背景探測進行中時更新清單，全部完成或逾時後停止（由計時器呼叫）"""
+        self._fill_camera_combo()
+        if not self.camera_inventory.pending():
+            self.camera_scan_timer.stop()
+            self.refresh_camera_btn.setEnabled(True)
+            
+    def _fill_camera_combo(self):
+        """以攝影機清單快取填入選單，清單有變化時才重建（保留目前的選擇，
+        尚未選擇時使用設定中的攝影機）"""
+        inventory = self.camera_inventory
+        items = []
+        for i in inventory.available():
+            text = get_text('camera_id', self.current_language).format(i)
+            entry = inventory.get(i)
+            resolutions = entry['capabilities'].get('resolutions') if entry else None
+            if resolutions:
+                width, height = max(resolutions, key=lambda size: size[0] * size[1])
+                text += f' ({width}x{height})'
+            items.append((text, i))
+        if items == [(self.camera_combo.itemText(k), self.camera_combo.itemData(k))
+                     for k in range(self.camera_combo.count())]:
+            return
+        current = self.camera_combo.currentData()
+        if current is None:
+            current = self.settings.value('camera_id', 0, type=int)
         self.camera_combo.clear()
-        for i in range(10):  # 檢查前10個攝影機
-            cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
-            if cap.isOpened():
-                self.camera_combo.addItem(get_text('camera_id', self.current_language).format(i), i)
-                cap.release()
+        for text, i in items:
+            self.camera_combo.addItem(text, i)
+        index = self.camera_combo.findData(current)
+        if index >= 0:
+            self.camera_combo.setCurrentIndex(index)
                 
     def save_settings(self):
         """儲存所有設定"""
         try:
             # 儲存攝影機設定
-            self.settings.setValue('camera_id', self.camera_combo.currentData())
+            camera_id = self.camera_combo.currentData()
+            if camera_id is not None:
+                # 清單仍在探測中而沒有項目時保留原本的攝影機
+                self.settings.setValue('camera_id', camera_id)
             self.settings.setValue('autofocus', self.autofocus_check.isChecked())
             self.settings.setValue('focus_value', self.focus_value.value())
             self.settings.setValue('width', self.width_spin.value())
             self.settings.setValue('height', self.height_spin.value())
+            self.settings.setValue('camera_fourcc', self.fourcc_combo.currentData())
+            self.settings.setValue('camera_fps', self.capture_fps_spin.value())
+            self.settings.setValue('camera_buffer_size', self.buffer_size_spin.value())
+            self.settings.setValue('bgr_pipeline', self.bgr_pipeline_check.isChecked())
+            self.settings.setValue('freeze_high_res', self.freeze_high_res_check.isChecked())
+            self.settings.setValue('adaptive_resolution', self.adaptive_resolution_check.isChecked())
+            self.settings.setValue('capture_crop', self.capture_crop_check.isChecked())
             
             # 儲存遮罩設定
             self.settings.setValue('mask_mode', self.mask_mode.currentText())
@@ -590,6 +764,11 @@ class SettingsDialog(QDialog):
             # 儲存儲存設定
             self.settings.setValue('screenshot_path', self.screenshot_path.text())
             self.settings.setValue('screenshot_format', self.screenshot_format.currentText())
+            self.settings.setValue('screenshot_source', self.screenshot_source.currentData())
+            self.settings.setValue('png_compression', self.png_compression.value())
+            self.settings.setValue('jpeg_quality', self.jpeg_quality.value())
+            self.settings.setValue('burst_count', self.burst_count.value())
+            self.settings.setValue('burst_interval', self.burst_interval.value())
             self.settings.setValue('recording_path', self.recording_path.text())
             self.settings.setValue('video_format', self.video_format.currentText())
             self.settings.setValue('video_quality', self.video_quality.currentText())
@@ -598,6 +777,7 @@ class SettingsDialog(QDialog):
             # 儲存顏色設定
             self.settings.setValue('foreground_color', self.foreground_color.currentText())
             self.settings.setValue('background_color', self.background_color.currentText())
+            self.settings.setValue('threshold_mode', self.threshold_combo.currentData())
             
             # 儲存自訂顏色
             self.settings.setValue('custom_fg_red', self.fg_red.value())
@@ -608,6 +788,14 @@ class SettingsDialog(QDialog):
             self.settings.setValue('custom_bg_green', self.bg_green.value())
             self.settings.setValue('custom_bg_blue', self.bg_blue.value())
             
+            # 儲存高對比濾鏡設定
+            self.settings.setValue('clahe_clip_limit', self.clahe_clip_limit.value())
+            self.settings.setValue('clahe_tile_grid', self.clahe_tile_grid.value())
+            self.settings.setValue('interpolation_mode', self.interpolation_combo.currentData())
+            self.settings.setValue('text_budget_ms', self.text_budget_spin.value())
+            self.settings.setValue('temporal_denoise', self.temporal_denoise_check.isChecked())
+            self.settings.setValue('stabilization', self.stabilization_check.isChecked())
+            
             # 儲存語言設定
             self.settings.setValue('language', 'zh_TW' if self.language_combo.currentText() == '繁體中文' else 'en_US')
             
@@ -645,6 +833,15 @@ class SettingsDialog(QDialog):
             self.focus_value.setValue(self.settings.value('focus_value', 50, type=int))
             self.width_spin.setValue(self.settings.value('width', 1280, type=int))
             self.height_spin.setValue(self.settings.value('height', 720, type=int))
+            index = self.fourcc_combo.findData(self.settings.value('camera_fourcc', 'auto'))
+            self.fourcc_combo.setCurrentIndex(max(0, index))
+            self.capture_fps_spin.setValue(self.settings.value('camera_fps', 30, type=int))
+            self.buffer_size_spin.setValue(self.settings.value('camera_buffer_size', 1, type=int))
+            self.bgr_pipeline_check.setChecked(self.settings.value('bgr_pipeline', True, type=bool))
+            self.freeze_high_res_check.setChecked(self.settings.value('freeze_high_res', True, type=bool))
+            self.adaptive_resolution_check.setChecked(
+                self.settings.value('adaptive_resolution', True, type=bool))
+            self.capture_crop_check.setChecked(self.settings.value('capture_crop', False, type=bool))
             
             # 載入遮罩設定
             mask_mode = self.settings.value('mask_mode', get_text('horizontal_mask', self.current_language))
@@ -684,6 +881,12 @@ class SettingsDialog(QDialog):
             # 載入儲存設定
             self.screenshot_path.setText(self.settings.value('screenshot_path', os.path.expanduser('~/Pictures')))
             self.screenshot_format.setCurrentText(self.settings.value('screenshot_format', 'PNG'))
+            index = self.screenshot_source.findData(self.settings.value('screenshot_source', 'raw'))
+            self.screenshot_source.setCurrentIndex(max(0, index))
+            self.png_compression.setValue(self.settings.value('png_compression', 1, type=int))
+            self.jpeg_quality.setValue(self.settings.value('jpeg_quality', 95, type=int))
+            self.burst_count.setValue(self.settings.value('burst_count', 1, type=int))
+            self.burst_interval.setValue(self.settings.value('burst_interval', 500, type=int))
             self.recording_path.setText(self.settings.value('recording_path', os.path.expanduser('~/Videos')))
             self.video_format.setCurrentText(self.settings.value('video_format', 'MP4'))
             video_quality = self.settings.value('video_quality', get_text('high_quality', self.current_language))
@@ -696,6 +899,8 @@ class SettingsDialog(QDialog):
             bg_color = self.settings.value('background_color', get_text('black', self.current_language))
             self.foreground_color.setCurrentText(get_text(fg_color, self.current_language))
             self.background_color.setCurrentText(get_text(bg_color, self.current_language))
+            index = self.threshold_combo.findData(self.settings.value('threshold_mode', 'global'))
+            self.threshold_combo.setCurrentIndex(max(0, index))
             
             # 載入自訂顏色
             self.fg_red.setValue(self.settings.value('custom_fg_red', 255, type=int))
@@ -706,6 +911,15 @@ class SettingsDialog(QDialog):
             self.bg_green.setValue(self.settings.value('custom_bg_green', 0, type=int))
             self.bg_blue.setValue(self.settings.value('custom_bg_blue', 0, type=int))
             
+            # 載入高對比濾鏡設定
+            self.clahe_clip_limit.setValue(self.settings.value('clahe_clip_limit', 3.0, type=float))
+            self.clahe_tile_grid.setValue(self.settings.value('clahe_tile_grid', 8, type=int))
+            index = self.interpolation_combo.findData(self.settings.value('interpolation_mode', 'auto'))
+            self.interpolation_combo.setCurrentIndex(max(0, index))
+            self.text_budget_spin.setValue(self.settings.value('text_budget_ms', 8, type=int))
+            self.temporal_denoise_check.setChecked(self.settings.value('temporal_denoise', False, type=bool))
+            self.stabilization_check.setChecked(self.settings.value('stabilization', False, type=bool))
+            
             # 載入語言設定
             self.language_combo.setCurrentText('繁體中文' if self.settings.value('language', 'zh_TW') == 'zh_TW' else 'English')
             
@@ -0,0 +1,142 @@
+import cv2
+import numpy as np
+
+
+class TemporalDenoiser:
+    """動態自適應的遞迴降噪
+
+    以 float32 累加器保存前幾張影格的指數平均（新影格權重 strength），靜止區域的
+    感光雜訊因此被平均掉；與上一張輸出差異超過 motion_threshold 的像素視為移動，
+    直接採用新影格，不會留下殘影。累加器與輸出緩衝區預先配置並就地更新。
+    在查找表與濾鏡之前套用，CLAHE 不會再把雜訊放大。
+
+    輸入為同一檢視範圍的 ROI；key（檢視範圍）或大小改變時重新開始。
+    """
+
+    def __init__(self, strength=0.25, motion_threshold=24):
+        self.strength = strength
+        self.motion_threshold = motion_threshold
+        self._key = None
+        self._accumulator = None
+        self._output = None
+        self._buffers = {}
+
+    def _buffer(self, name, shape, dtype=np.uint8):
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer
+
+    def reset(self):
+        """捨棄累積的影格"""
+        self._key = None
+
+    def apply(self, image, gray_code, key=None):
+        """回傳降噪後的影像（內部緩衝區，下次呼叫前有效）
+
+        gray_code 為彩色影像轉灰階的 cvtColor 代碼（依輸入的通道順序），用於偵測移動。
+        """
+        if key != self._key or self._output is None or self._output.shape != image.shape:
+            self._accumulator = self._buffer('accumulator', image.shape, np.float32)
+            self._output = self._buffer('output', image.shape)
+            self._accumulator[...] = image
+            np.copyto(self._output, image)
+            self._key = key
+            return self._output
+        plane = image.shape[:2]
+        diff = cv2.absdiff(image, self._output, dst=self._buffer('diff', image.shape))
+        if diff.ndim == 3:
+            diff = cv2.cvtColor(diff, gray_code, dst=self._buffer('motion', plane))
+        moving = cv2.threshold(diff, self.motion_threshold, 255, cv2.THRESH_BINARY,
+                               dst=self._buffer('moving', plane))[1]
+        static = cv2.bitwise_not(moving, dst=self._buffer('static', plane))
+        cv2.accumulateWeighted(image, self._accumulator, self.strength, mask=static)
+        cv2.accumulateWeighted(image, self._accumulator, 1.0, mask=moving)
+        return cv2.convertScaleAbs(self._accumulator, dst=self._output)
+
+
+class Stabilizer:
+    """以相位相關估計整體位移的畫面穩定
+
+    取每張影格中央 analysis_size 見方的灰階區塊（4K 以上先以整數倍 INTER_AREA 縮小），
+    與上一張以 cv2.phaseCorrelate 求次像素位移，累加成畫面內容的移動軌跡。
+    震動是整體位移，中央區塊就足夠；縮小整張影格會讓文字的細紋理混疊，
+    縮小 6 倍時誤差可達 2 像素，中央原解析度區塊的誤差低於 0.1 像素且只需約 1 ms。
+    軌跡的指數平均（smoothing）代表刻意的移動（例如移動書本），
+    offset = 軌跡 - 平滑軌跡 為桌面或手的震動，由呼叫端加在 ROI 位置上抵銷。
+    相關性低於 min_response（畫面缺少紋理）時該張影格不計位移；
+    單張位移超過 max_step（短邊比例）視為場景改變並重新開始。
+    """
+
+    def __init__(self, analysis_size=256, smoothing=0.1, max_offset=0.05, max_step=0.2,
+                 min_response=0.1):
+        self.analysis_size = analysis_size
+        self.smoothing = smoothing
+        self.max_offset = max_offset
+        self.max_step = max_step
+        self.min_response = min_response
+        self.offset = (0.0, 0.0)  # 原始影像像素
+        self._shape = None
+        self._last_frame = None
+        self._previous = None
+        self._current = None
+        self._window = None
+        self._trajectory = np.zeros(2)
+        self._smoothed = np.zeros(2)
+
+    def reset(self):
+        """捨棄移動軌跡"""
+        self._shape = None
+        self._last_frame = None
+        self.offset = (0.0, 0.0)
+
+    def update(self, frame, gray_code):
+        """加入一張影格，回傳要加在 ROI 位置上的位移 (x, y)（原始影像像素）
+
+        gray_code 為彩色影像轉灰階的 cvtColor 代碼（依輸入的通道順序）。
+        """
+        if frame is self._last_frame:
+            # 同一張影格重新處理（例如調整參數），位移不變
+            return self.offset
+        self._last_frame = frame
+        height, width = frame.shape[:2]
+        factor = max(1, min(height, width) // 1080)
+        small_width = min(self.analysis_size, width // factor)
+        small_height = min(self.analysis_size, height // factor)
+        if self._shape != (height, width):
+            self._shape = (height, width)
+            self._previous = np.empty((small_height, small_width), np.float32)
+            self._current = np.empty((small_height, small_width), np.float32)
+            self._window = cv2.createHanningWindow((small_width, small_height), cv2.CV_32F)
+            self._trajectory[:] = 0
+            self._smoothed[:] = 0
+            self.offset = (0.0, 0.0)
+            self._sample(frame, factor, self._previous, gray_code)
+            return self.offset
+        self._sample(frame, factor, self._current, gray_code)
+        (dx, dy), response = cv2.phaseCorrelate(self._previous, self._current, self._window)
+        self._previous, self._current = self._current, self._previous
+        if abs(dx) > self.max_step * small_width or abs(dy) > self.max_step * small_height:
+            self._trajectory[:] = 0
+            self._smoothed[:] = 0
+        elif response >= self.min_response:
+            self._trajectory += (dx * factor, dy * factor)
+        self._smoothed += self.smoothing * (self._trajectory - self._smoothed)
+        limit = self.max_offset * min(height, width)
+        shake = np.clip(self._trajectory - self._smoothed, -limit, limit)
+        self.offset = (float(shake[0]), float(shake[1]))
+        return self.offset
+
+    def _sample(self, frame, factor, dst, gray_code):
+        """取中央區塊（必要時縮小）並轉為 float32 灰階，寫入 dst"""
+        height, width = dst.shape
+        crop_width, crop_height = width * factor, height * factor
+        x = (frame.shape[1] - crop_width) // 2
+        y = (frame.shape[0] - crop_height) // 2
+        sample = frame[y:y + crop_height, x:x + crop_width]
+        if sample.ndim == 3:
+            sample = cv2.cvtColor(sample, gray_code)
+        if factor > 1:
+            sample = cv2.resize(sample, (width, height), interpolation=cv2.INTER_AREA)
+        dst[...] = sample
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from frame_buffer import BufferRing
+from image_processor import ImageProcessor
+
+WARMUP = 5
+FRAMES = 30
+
+
+def _frames(count=3, width=1280, height=720):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+# (倍率, 顏色模式, 輔助線, 每張影格的複製次數)
+CASES = [
+    # 不縮放也不改變顏色：直接輸出輸入影格，不複製
+    (1.0, 'normal', False, 0),
+    # 次像素 ROI：放大涵蓋 ROI 的整數範圍後，取出輸出範圍複製一次
+    (1.5, 'normal', False, 1),
+    # ROI 落在整數像素上：直接縮放到輸出緩衝區，不複製
+    (2.0, 'white_on_black', False, 0),
+    # 輔助線不能畫在輸入影格上：複製到輸出緩衝區一次
+    (1.0, 'normal', True, 1),
+]
+
+
+@pytest.mark.parametrize('zoom, color_mode, guide, copies', CASES)
+def test_steady_state_reuses_buffers(zoom, color_mode, guide, copies):
+    processor = ImageProcessor()
+    processor.zoom_factor = zoom
+    processor.color_mode = color_mode
+    processor.show_guide_line = guide
+    frames = _frames()
+
+    stats, outputs = [], []
+    for i in range(WARMUP + FRAMES):
+        outputs.append(processor.process_frame(frames[i % len(frames)]))
+        stats.append(processor.get_buffer_stats())
+    warm, last = stats[WARMUP - 1], stats[-1]
+
+    # 暖機後不再配置
+    assert last['allocations'] == warm['allocations']
+    # 每張影格的複製次數固定
+    assert last['copies'] - warm['copies'] == copies * FRAMES
+    steady = outputs[WARMUP:]
+    if zoom == 1.0 and color_mode == 'normal' and not guide:
+        # 不需處理時輸出輸入影格本身
+        assert all(any(out is frame for frame in frames) for out in steady)
+    else:
+        # 輸出輪流使用環中的緩衝區
+        assert len({id(out) for out in steady}) <= processor.buffers.size
+        assert last['reuses'] > warm['reuses']
+
+
+def test_ring_reuses_buffers_of_same_shape():
+    ring = BufferRing(size=3)
+    first = [ring.acquire((4, 4, 3)) for _ in range(3)]
+    again = [ring.acquire((4, 4, 3)) for _ in range(3)]
+    assert all(a is b for a, b in zip(first, again))
+    assert ring.allocations == 3
+    assert ring.reuses == 3
+    # 形狀改變時才重新配置
+    ring.acquire((8, 8, 3))
+    assert ring.allocations == 4
+
+
+def test_ring_without_reuse_allocates_every_time():
+    ring = BufferRing(size=3, reuse=False)
+    buffers = [ring.acquire((4, 4, 3)) for _ in range(6)]
+    assert len({id(buffer) for buffer in buffers}) == 6
+    assert ring.allocations == 6
@@ -0,0 +1,59 @@
+import itertools
+
+import cv2
+import numpy as np
+import pytest
+
+from camera_module import CameraModule
+from frame_source import FrameSource, make_text_page
+from image_processor import ImageProcessor
+
+WIDTH, HEIGHT = 1280, 720
+
+
+@pytest.fixture(scope='module')
+def page():
+    return make_text_page(WIDTH, HEIGHT, 3)
+
+
+class StillSource(FrameSource):
+    """每次送出同一張影像、不支援數位變焦的來源（擷取端只能以軟體裁剪）"""
+
+    def __init__(self, frame):
+        super().__init__('fast')
+        self.frame = frame
+
+    def _grab(self):
+        return True, self.frame.copy()
+
+
+def _processor(zoom, pan, rotation, flip_horizontal):
+    processor = ImageProcessor()
+    processor.set_output_size(640, 360)
+    processor.set_flip(horizontal=flip_horizontal)
+    processor.set_rotation(rotation)
+    processor.zoom_factor = processor.target_zoom = zoom
+    processor.pan_x, processor.pan_y = pan
+    return processor
+
+
+@pytest.mark.parametrize('zoom, pan, rotation, flip_horizontal', list(itertools.product(
+    [2.0, 3.0, 4.0, 6.5, 8.0], [(0, 0), (120.5, -40.25), (-300, 150)], [0, 90, 180], [False, True])))
+def test_software_crop_matches_full_frame(page, zoom, pan, rotation, flip_horizontal):
+    # 擷取端裁剪只移除 ROI 以外的像素，處理結果與處理完整影格相同
+    camera = CameraModule(source=StillSource(cv2.cvtColor(page, cv2.COLOR_RGB2BGR)))
+
+    reference = _processor(zoom, pan, rotation, flip_horizontal)
+    reference.process_frame(page)
+    expected = reference.process_frame(page).copy()
+
+    processor = _processor(zoom, pan, rotation, flip_horizontal)
+    processor.process_frame(page)
+    camera.request_crop(processor.field_request())
+    camera._apply_crop()
+    assert camera.crop_mode == 'software'
+    ret, frame, _ = camera.camera.read()
+    frame, field = camera._crop_frame(frame)
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    assert frame.shape[1] < WIDTH and frame.shape[0] < HEIGHT
+    assert np.array_equal(processor.process_frame(frame, field), expected)
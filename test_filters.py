@@ -0,0 +1,72 @@
+import itertools
+
+import cv2
+import numpy as np
+import pytest
+
+from filters import HighContrastFilter
+
+SHAPES = [(240, 320, 3), (121, 203, 3)]
+
+
+def _frame(shape, seed=0):
+    """平滑的隨機影像（接近攝影機畫面，CLAHE 不會只看到雜訊）"""
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 256, shape, dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (0, 0), 3)
+
+
+def _old_high_contrast(frame, clip_limit=3.0, tile_grid_size=(8, 8)):
+    """原本每張影格重新建立 CLAHE 的 LAB 流程"""
+    lab = cv2.cvtColor(frame, cv2.COLOR_RGB2LAB)
+    l, a, b = cv2.split(lab)
+    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size)
+    enhanced = cv2.cvtColor(cv2.merge((clahe.apply(l), a, b)), cv2.COLOR_LAB2RGB)
+    kernel = np.array([[-1, -1, -1],
+                       [-1, 9, -1],
+                       [-1, -1, -1]])
+    return cv2.filter2D(enhanced, -1, kernel)
+
+
+def _luma_reference(frame, clip_limit=3.0, tile_grid_size=(8, 8)):
+    """只處理亮度：Y' - Y 加回三個通道（以整數運算逐步計算）"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size)
+    kernel = np.array([[-1, -1, -1],
+                       [-1, 9, -1],
+                       [-1, -1, -1]])
+    sharpened = cv2.filter2D(clahe.apply(gray), -1, kernel)
+    delta = sharpened.astype(np.int16) - gray.astype(np.int16)
+    return np.clip(frame.astype(np.int16) + delta[..., None], 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize('shape, seed', list(itertools.product(SHAPES, [0, 1])))
+def test_lab_path_matches_old_filter(shape, seed):
+    frame = _frame(shape, seed)
+    high_contrast = HighContrastFilter(luma_only=False)
+    # 重複使用同一個 CLAHE 物件與緩衝區，結果仍與每次重新建立相同
+    for _ in range(2):
+        assert np.array_equal(high_contrast.apply(frame), _old_high_contrast(frame))
+
+
+@pytest.mark.parametrize('shape, seed', list(itertools.product(SHAPES, [0, 1])))
+def test_default_luma_path_matches_reference(shape, seed):
+    frame = _frame(shape, seed)
+    high_contrast = HighContrastFilter()
+    for _ in range(2):
+        assert np.array_equal(high_contrast.apply(frame), _luma_reference(frame))
+
+
+def test_configure_matches_new_clahe():
+    frame = _frame(SHAPES[0])
+    high_contrast = HighContrastFilter(luma_only=False)
+    high_contrast.apply(frame)
+    high_contrast.configure(clip_limit=1.5, tile_grid_size=(4, 4))
+    expected = _old_high_contrast(frame, clip_limit=1.5, tile_grid_size=(4, 4))
+    assert np.array_equal(high_contrast.apply(frame), expected)
+
+
+def test_apply_in_place():
+    frame = _frame(SHAPES[0])
+    expected = _luma_reference(frame)
+    assert np.array_equal(HighContrastFilter().apply(frame, dst=frame), expected)
@@ -0,0 +1,150 @@
+import itertools
+
+import cv2
+import numpy as np
+import pytest
+
+from image_processor import ImageProcessor
+
+ROTATE_CODES = {90: cv2.ROTATE_90_CLOCKWISE, 180: cv2.ROTATE_180,
+                270: cv2.ROTATE_90_COUNTERCLOCKWISE}
+
+COLOR_MODES = ['normal', 'white_on_black', 'black_on_white', 'yellow_on_black',
+               'yellow_on_blue', 'green_on_black', 'blue_on_yellow']
+# 雙色模式（前景, 背景），顏色為 RGB
+TWO_COLOR = {
+    'yellow_on_black': ([255, 255, 0], [0, 0, 0]),
+    'yellow_on_blue': ([255, 255, 0], [0, 0, 255]),
+    'green_on_black': ([0, 255, 0], [0, 0, 0]),
+    'blue_on_yellow': ([0, 0, 255], [255, 255, 0]),
+}
+
+
+def _frame(width=320, height=240, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def _old_brightness(frame, brightness):
+    """原本的逐像素亮度調整"""
+    if brightness > 0:
+        return cv2.convertScaleAbs(frame, alpha=1.0, beta=brightness * 2.55)
+    if brightness < 0:
+        return cv2.convertScaleAbs(frame, alpha=1.0 + brightness / 100.0, beta=0)
+    return frame
+
+
+def _old_process(frame, zoom, pan_x, pan_y, color_mode, brightness=0):
+    """原本的處理方式：亮度、整數 ROI 以 INTER_LINEAR 縮放回原始大小、逐像素顏色模式"""
+    height, width = frame.shape[:2]
+    processed = _old_brightness(frame, brightness)
+    if zoom != 1.0 or pan_x or pan_y:
+        roi_width, roi_height = int(width / zoom), int(height / zoom)
+        max_pan_x = int(width * (1 - 1 / zoom) / 2)
+        max_pan_y = int(height * (1 - 1 / zoom) / 2)
+        pan_x = max(-max_pan_x, min(max_pan_x, pan_x))
+        pan_y = max(-max_pan_y, min(max_pan_y, pan_y))
+        roi_x = max(0, min(width - roi_width, int((width - roi_width) / 2 - pan_x)))
+        roi_y = max(0, min(height - roi_height, int((height - roi_height) / 2 - pan_y)))
+        roi = processed[roi_y:roi_y+roi_height, roi_x:roi_x+roi_width]
+        processed = cv2.resize(roi, (width, height), interpolation=cv2.INTER_LINEAR)
+    if color_mode == 'white_on_black':
+        return 255 - processed
+    if color_mode in TWO_COLOR:
+        foreground, background = TWO_COLOR[color_mode]
+        gray = cv2.cvtColor(processed, cv2.COLOR_RGB2GRAY)
+        colored = np.zeros_like(processed)
+        colored[gray > 128] = foreground
+        colored[gray <= 128] = background
+        return colored
+    return processed
+
+
+def _orient_full_frame(frame, flip_horizontal, flip_vertical, rotation):
+    """原本的轉向方式：先翻轉再旋轉整張影像"""
+    if flip_horizontal:
+        frame = cv2.flip(frame, 1)
+    if flip_vertical:
+        frame = cv2.flip(frame, 0)
+    if rotation:
+        frame = cv2.rotate(frame, ROTATE_CODES[rotation])
+    return frame
+
+
+def _processor(crop_first, zoom=1.0, pan=(0, 0), color_mode='normal', brightness=0,
+               filter_mode='normal'):
+    processor = ImageProcessor()
+    processor.crop_first = crop_first
+    processor.zoom_factor = zoom
+    processor.pan_x, processor.pan_y = pan
+    processor.color_mode = color_mode
+    processor.brightness = brightness
+    processor.filter_mode = filter_mode
+    return processor
+
+
+@pytest.mark.parametrize('zoom, pan, color_mode', list(itertools.product(
+    [1.0, 1.5, 2.0, 3.0, 4.0], [(0, 0), (17, -9), (-500, 500)], COLOR_MODES)))
+def test_legacy_order_matches_old_output(zoom, pan, color_mode):
+    frame = _frame()
+    processor = _processor(False, zoom, pan, color_mode)
+    expected = _old_process(frame, zoom, pan[0], pan[1], color_mode)
+    assert np.array_equal(processor.process_frame(frame), expected)
+
+
+@pytest.mark.parametrize('brightness, color_mode', list(itertools.product(
+    [-100, -37, 25, 100], ['normal', 'white_on_black', 'black_on_white'])))
+def test_legacy_brightness_matches_old_output(brightness, color_mode):
+    # 雙色模式的亮度改為平移灰階門檻，不與逐像素調整比較
+    frame = _frame()
+    processor = _processor(False, color_mode=color_mode, brightness=brightness)
+    expected = _old_process(frame, 1.0, 0, 0, color_mode, brightness)
+    assert np.array_equal(processor.process_frame(frame), expected)
+
+
+@pytest.mark.parametrize('color_mode, brightness, filter_mode', list(itertools.product(
+    COLOR_MODES, [0, -37, 60], ['normal', 'high_contrast', 'grayscale', 'inverse'])))
+def test_crop_first_matches_legacy_order_at_1x(color_mode, brightness, filter_mode):
+    # 1 倍時兩種順序處理相同的像素；放大時先處理再縮放，結果本來就不同
+    frame = _frame()
+    legacy = _processor(False, color_mode=color_mode, brightness=brightness,
+                        filter_mode=filter_mode).process_frame(frame)
+    crop_first = _processor(True, color_mode=color_mode, brightness=brightness,
+                            filter_mode=filter_mode).process_frame(frame)
+    assert np.array_equal(crop_first, legacy)
+
+
+@pytest.mark.parametrize('crop_first, zoom, pan, flip_horizontal, flip_vertical, rotation',
+                         list(itertools.product([True, False], [1.0, 1.5, 2.0, 3.0], [(0, 0), (23, -11)],
+                                                [False, True], [False, True], [0, 90, 180, 270])))
+def test_roi_orientation_matches_full_frame_orientation(crop_first, zoom, pan, flip_horizontal,
+                                                        flip_vertical, rotation):
+    # 只轉向裁剪後的 ROI，結果與先轉向整張影像再處理相同（平移量為顯示座標）
+    frame = _frame(321, 240)
+    processor = _processor(crop_first, zoom, pan, 'yellow_on_blue', filter_mode='high_contrast')
+    processor.set_flip(flip_horizontal, flip_vertical)
+    processor.set_rotation(rotation)
+    oriented = _orient_full_frame(frame, flip_horizontal, flip_vertical, rotation)
+    expected = _processor(crop_first, zoom, pan, 'yellow_on_blue',
+                          filter_mode='high_contrast').process_frame(np.ascontiguousarray(oriented))
+    assert np.array_equal(processor.process_frame(frame), expected)
+
+
+@pytest.mark.parametrize('color_mode', ['normal', 'yellow_on_blue'])
+def test_denoise_follows_channel_order(color_mode):
+    # 移動偵測的灰階依通道順序計算：BGR 影格的結果與 RGB 影格相同（通道順序互換）
+    frames = [_frame(seed=0)]
+    rng = np.random.default_rng(1)
+    for _ in range(4):
+        noisy = frames[-1].astype(np.int16) + rng.integers(-20, 21, frames[-1].shape)
+        frames.append(np.clip(noisy, 0, 255).astype(np.uint8))
+    outputs = {}
+    for order in ('RGB', 'BGR'):
+        processor = _processor(True, color_mode=color_mode)
+        processor.set_channel_order(order)
+        processor.denoise = True
+        for frame in frames:
+            native = frame if order == 'RGB' else np.ascontiguousarray(frame[..., ::-1])
+            output = processor.process_frame(native)
+        outputs[order] = output if order == 'RGB' else output[..., ::-1]
+    assert np.array_equal(outputs['RGB'], outputs['BGR'])
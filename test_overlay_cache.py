@@ -0,0 +1,91 @@
+import itertools
+
+import cv2
+import numpy as np
+import pytest
+
+from overlay_cache import OverlayCache
+
+SHAPES = [(240, 320, 3), (241, 319, 3)]
+
+
+def _frame(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, shape, dtype=np.uint8)
+
+
+def _old_mask(frame, mode, size, opacity):
+    """原本的遮罩：整張遮罩影像以 cv2.addWeighted 混合"""
+    height, width = frame.shape[:2]
+    mask = np.zeros((height, width), dtype=np.uint8)
+    if mode == 'horizontal':
+        mask_height = int(height * size / 100)
+        y1 = (height - mask_height) // 2
+        mask[y1:y1 + mask_height, :] = 255
+    elif mode == 'vertical':
+        mask_width = int(width * size / 100)
+        x1 = (width - mask_width) // 2
+        mask[:, x1:x1 + mask_width] = 255
+    elif mode == 'rectangle':
+        mask_height = int(height * size / 100)
+        mask_width = int(width * size / 100)
+        y1 = (height - mask_height) // 2
+        x1 = (width - mask_width) // 2
+        mask[y1:y1 + mask_height, x1:x1 + mask_width] = 255
+    elif mode == 'ellipse':
+        center = (width // 2, height // 2)
+        axes = (int(width * size / 200), int(height * size / 200))
+        cv2.ellipse(mask, center, axes, 0, 0, 360, 255, -1)
+    mask_rgb = cv2.cvtColor(mask, cv2.COLOR_GRAY2RGB)
+    return cv2.addWeighted(frame, 1, mask_rgb, opacity / 100, 0)
+
+
+def _old_guide(frame, mode, color, thickness):
+    """原本的輔助線：每張影格以 cv2.line 繪製"""
+    height, width = frame.shape[:2]
+    result = frame.copy()
+    lines = []
+    if mode == 'cross':
+        lines = [((width//2, 0), (width//2, height)), ((0, height//2), (width, height//2))]
+    elif mode == 'grid':
+        lines = [((x, 0), (x, height)) for x in range(width//3, width, width//3)]
+        lines += [((0, y), (width, y)) for y in range(height//3, height, height//3)]
+    elif mode == 'center':
+        cx, cy = width//2, height//2
+        lines = [((cx - 20, cy), (cx + 20, cy)), ((cx, cy - 20), (cx, cy + 20))]
+    elif mode == 'reading_line':
+        lines = [((0, height//2), (width, height//2))]
+    for start, end in lines:
+        cv2.line(result, start, end, color, thickness)
+    return result
+
+
+@pytest.mark.parametrize('mode, size, opacity, shape', list(itertools.product(
+    ['horizontal', 'vertical', 'rectangle', 'ellipse'], [10, 30, 77], [0, 33, 50, 100], SHAPES)))
+def test_mask_layer_matches_add_weighted(mode, size, opacity, shape):
+    frame = _frame(shape)
+    expected = _old_mask(frame, mode, size, opacity)
+    layer = OverlayCache().mask_layer(mode, size, opacity, shape)
+    assert np.array_equal(layer.apply(frame.copy()), expected)
+
+
+@pytest.mark.parametrize('mode, thickness, shape', list(itertools.product(
+    ['cross', 'grid', 'center', 'reading_line'], [1, 2, 5], SHAPES)))
+def test_guide_layer_matches_line_drawing(mode, thickness, shape):
+    frame = _frame(shape)
+    color = (0, 255, 0)
+    expected = _old_guide(frame, mode, color, thickness)
+    layer = OverlayCache().guide_layer(mode, color, thickness, shape)
+    assert np.array_equal(layer.apply(frame.copy()), expected)
+
+
+def test_layers_are_rebuilt_only_when_parameters_change():
+    cache = OverlayCache()
+    shape = SHAPES[0]
+    first = cache.mask_layer('ellipse', 30, 50, shape)
+    assert cache.mask_layer('ellipse', 30, 50, shape) is first
+    cache.guide_layer('cross', (0, 255, 0), 1, shape)
+    cache.guide_layer('cross', (0, 255, 0), 1, shape)
+    assert cache.rebuilds == 2
+    cache.mask_layer('ellipse', 40, 50, shape)
+    assert cache.rebuilds == 3
@@ -14,6 +14,7 @@ TRANSLATIONS = {
         'yellow_on_blue': '藍底黃字',
         'green_on_black': '黑底綠字',
         'blue_on_yellow': '黃底藍字',
+        'custom_contrast': '自訂對比色',
         'filter': '濾鏡',
         'high_contrast': '高對比',
         'grayscale': '黑白',
@@ -120,7 +121,47 @@ TRANSLATIONS = {
         'shortcut_settings': '快捷鍵設定',
         'rotation_angle': '旋轉角度',
         'flip_horizontal': '水平翻轉',
-        'flip_vertical': '垂直翻轉'
+        'flip_vertical': '垂直翻轉',
+        
+        # 高對比濾鏡設定
+        'high_contrast_settings': '高對比濾鏡設定',
+        'clahe_clip_limit': '對比限制：',
+        'clahe_tile_grid': '區塊數量：',
+        'capture_format': '擷取格式',
+        'video_fourcc': '影像格式：',
+        'auto_format': '自動（MJPG 優先）',
+        'capture_fps': '幀率：',
+        'buffer_size': '緩衝影格數：',
+        'bgr_pipeline': '顯示前不轉換色彩順序（較快）',
+        'refresh_cameras': '重新偵測',
+        'freeze': '凍結畫面',
+        'freeze_high_res': '凍結時以攝影機最高解析度擷取',
+        'adaptive_resolution': '依縮放倍率自動調整擷取與處理解析度',
+        'capture_crop': '放大時只擷取需要的範圍（支援時使用攝影機數位變焦）',
+        'magnification_quality': '放大品質',
+        'interpolation_mode': '放大插值方式：',
+        'interpolation_auto': '自動（依倍率）',
+        'interpolation_linear': '線性',
+        'interpolation_cubic': '雙三次',
+        'interpolation_text': '文字（銳利邊緣）',
+        'text_budget_ms': '文字放大時間預算（毫秒）：',
+        'threshold_mode': '二值化方式：',
+        'threshold_global': '固定門檻',
+        'threshold_mean': '局部平均（光線不均勻）',
+        'threshold_sauvola': 'Sauvola（白紙黑字）',
+        'temporal_settings': '畫面穩定',
+        'temporal_denoise': '降低雜訊（跨影格平均，移動的部分不受影響）',
+        'stabilization': '抵銷震動（放大時畫面不晃動）',
+        'screenshot_source': '截圖來源',
+        'raw_frame': '原始影像',
+        'processed_view': '處理後畫面',
+        'png_compression': 'PNG 壓縮等級（0-9）',
+        'jpeg_quality': 'JPEG 品質',
+        'burst_count': '連拍張數',
+        'burst_interval': '連拍間隔（毫秒）',
+        'screenshot_saved': '截圖已儲存',
+        'screenshot_failed': '截圖儲存失敗',
+        'screenshot_busy': '截圖佇列已滿，略過此張'
     },
     'en_US': {
         # Main Window
@@ -137,6 +178,7 @@ TRANSLATIONS = {
         'yellow_on_blue': 'Yellow on Blue',
         'green_on_black': 'Green on Black',
         'blue_on_yellow': 'Blue on Yellow',
+        'custom_contrast': 'Custom Contrast',
         'filter': 'Filter',
         'high_contrast': 'High Contrast',
         'grayscale': 'Grayscale',
@@ -243,7 +285,47 @@ TRANSLATIONS = {
         'shortcut_settings': 'Shortcut Settings',
         'rotation_angle': 'Rotation Angle',
         'flip_horizontal': 'Horizontal Flip',
-        'flip_vertical': 'Vertical Flip'
+        'flip_vertical': 'Vertical Flip',
+        
+        # High contrast filter settings
+        'high_contrast_settings': 'High Contrast Filter',
+        'clahe_clip_limit': 'Clip Limit:',
+        'clahe_tile_grid': 'Tile Grid Size:',
+        'capture_format': 'Capture Format',
+        'video_fourcc': 'Pixel Format:',
+        'auto_format': 'Auto (prefer MJPG)',
+        'capture_fps': 'Frame Rate:',
+        'buffer_size': 'Buffered Frames:',
+        'bgr_pipeline': 'Skip color-order conversion until display (faster)',
+        'refresh_cameras': 'Rescan',
+        'freeze': 'Freeze',
+        'freeze_high_res': 'Capture at maximum resolution when freezing',
+        'adaptive_resolution': 'Adapt capture and processing resolution to zoom',
+        'capture_crop': 'Capture only the zoomed area (camera digital zoom when supported)',
+        'magnification_quality': 'Magnification Quality',
+        'interpolation_mode': 'Interpolation:',
+        'interpolation_auto': 'Auto (by zoom)',
+        'interpolation_linear': 'Linear',
+        'interpolation_cubic': 'Bicubic',
+        'interpolation_text': 'Text (sharp edges)',
+        'text_budget_ms': 'Text Upscaling Budget (ms):',
+        'threshold_mode': 'Thresholding:',
+        'threshold_global': 'Fixed',
+        'threshold_mean': 'Local Mean (uneven lighting)',
+        'threshold_sauvola': 'Sauvola (dark text on light)',
+        'temporal_settings': 'Stabilization',
+        'temporal_denoise': 'Reduce noise (average across frames, motion preserved)',
+        'stabilization': 'Cancel shake (steady image when magnified)',
+        'screenshot_source': 'Screenshot Source',
+        'raw_frame': 'Raw Frame',
+        'processed_view': 'Processed View',
+        'png_compression': 'PNG Compression (0-9)',
+        'jpeg_quality': 'JPEG Quality',
+        'burst_count': 'Burst Count',
+        'burst_interval': 'Burst Interval (ms)',
+        'screenshot_saved': 'Screenshot saved',
+        'screenshot_failed': 'Screenshot failed',
+        'screenshot_busy': 'Screenshot queue full, skipped'
     }
 }
 
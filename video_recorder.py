@@ -0,0 +1,144 @@
+import cv2
+import numpy as np
+import queue
+import time
+from PyQt5.QtCore import QThread
+
+
+class VideoRecorder(QThread):
+    """錄影執行緒
+
+    submit() 只把影格複製進有上限的佇列，縮放、色彩轉換與 VideoWriter.write
+    都在錄影執行緒中進行，長時間錄影不會拖慢即時顯示。
+    佇列滿時依 overflow 策略處理：'drop' 直接丟棄新影格，'block' 等待佇列有空位。
+    影片以固定幀率寫入，依每張影格的實際擷取時間決定要重複或略過影格，
+    因此實際擷取幀率與影片幀率不同時，播放速度仍然正確。
+    """
+
+    def __init__(self, filename, fourcc, frame_size, fps=30.0, queue_size=32,
+                 overflow='drop', convert_code=cv2.COLOR_RGB2BGR, parent=None):
+        super().__init__(parent)
+        self.filename = filename
+        self.frame_size = tuple(frame_size)  # (寬, 高)
+        self.fps = fps
+        self.overflow = overflow
+        self.convert_code = convert_code
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writer = cv2.VideoWriter(filename, fourcc, fps, self.frame_size)
+        self.running = False
+        self._start_timestamp = None
+
+        # 統計
+        self.frames_received = 0
+        self.frames_dropped = 0      # 佇列已滿而丟棄
+        self.frames_written = 0      # 實際寫入影片的影格數（含重複）
+        self.frames_duplicated = 0   # 為補足時間間隔而重複寫入
+        self.frames_skipped = 0      # 擷取時間落在已寫入時段而略過
+        self.total_write_time = 0.0
+        self.max_write_time = 0.0
+        self.max_queue_depth = 0
+
+    def is_opened(self):
+        """錄影檔是否成功開啟"""
+        return self.writer.isOpened()
+
+    def submit(self, frame, timestamp=None):
+        """送入一張影格（可從任何執行緒呼叫）"""
+        if not self.running:
+            return
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self.frames_received += 1
+        # 處理器的輸出緩衝區會被重複使用，必須複製
+        item = (frame.copy(), timestamp)
+        try:
+            if self.overflow == 'block':
+                self.queue.put(item, timeout=1.0)
+            else:
+                self.queue.put_nowait(item)
+        except queue.Full:
+            self.frames_dropped += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+
+    def run(self):
+        """執行錄影迴圈"""
+        while self.running or not self.queue.empty():
+            try:
+                item = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            self._write(*item)
+        self.writer.release()
+
+    def start(self):
+        """開始錄影"""
+        self.running = True
+        super().start()
+
+    def _write(self, frame, timestamp):
+        """依擷取時間寫入影格"""
+        if self._start_timestamp is None:
+            self._start_timestamp = timestamp
+        # 這張影格應出現在影片中的位置
+        index = int(round((timestamp - self._start_timestamp) * self.fps))
+        if index < self.frames_written:
+            self.frames_skipped += 1
+            return
+        # 卡頓後最多補 2 秒的重複影格
+        repeats = min(index - self.frames_written + 1, int(self.fps * 2) + 1)
+
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        if (width, height) != self.frame_size:
+            frame = self._fit(frame)
+        if self.convert_code is not None:
+            frame = cv2.cvtColor(frame, self.convert_code)
+        for _ in range(repeats):
+            self.writer.write(frame)
+        elapsed = time.perf_counter() - start
+
+        self.frames_written += repeats
+        self.frames_duplicated += repeats - 1
+        self.total_write_time += elapsed
+        self.max_write_time = max(self.max_write_time, elapsed)
+
+    def _fit(self, frame):
+        """縮放到錄影大小；長寬比不同（例如錄影中旋轉畫面）時保持比例並補黑邊"""
+        width, height = self.frame_size
+        frame_height, frame_width = frame.shape[:2]
+        scale = min(width / frame_width, height / frame_height)
+        fit_width = max(1, min(width, round(frame_width * scale)))
+        fit_height = max(1, min(height, round(frame_height * scale)))
+        resized = cv2.resize(frame, (fit_width, fit_height), interpolation=cv2.INTER_AREA)
+        if (fit_width, fit_height) == (width, height):
+            return resized
+        canvas = np.zeros((height, width) + frame.shape[2:], dtype=frame.dtype)
+        x, y = (width - fit_width) // 2, (height - fit_height) // 2
+        canvas[y:y+fit_height, x:x+fit_width] = resized
+        return canvas
+
+    def stop(self):
+        """停止錄影，寫完佇列中剩餘的影格後關閉檔案"""
+        self.running = False
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self.wait()
+
+    def get_stats(self):
+        """回傳錄影統計"""
+        written_calls = self.frames_written - self.frames_duplicated
+        return {
+            'frames_received': self.frames_received,
+            'frames_dropped': self.frames_dropped,
+            'frames_written': self.frames_written,
+            'frames_duplicated': self.frames_duplicated,
+            'frames_skipped': self.frames_skipped,
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+            'avg_write_ms': self.total_write_time / written_calls * 1000 if written_calls else 0.0,
+            'max_write_ms': self.max_write_time * 1000,
+        }